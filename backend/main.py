@@ -1,12 +1,26 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import os
 import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 
 # Import utilities
-from backend.utils.database import connect_to_database, close_database_connection, create_indexes
+from backend.utils.database import connect_to_database, close_database_connection, flush_background_writes
+from backend.utils.indexes import reconcile_indexes, install_query_plan_monitor
+from backend.utils.migrations import run_migrations
+from backend.utils.helpers import CacheUtils
+from backend.utils.semantic_cache import tutor_answer_cache
+from backend.utils.security import password_hasher
+from backend.utils.job_queue import job_queue
+from backend.utils.observability import request_metrics, request_log, start_trace, SERVER_TIMING_ENABLED, UNMATCHED_ROUTE
+from backend.services.ai_service import ai_single_flight
+from backend.services.model_router import model_router
+from backend.services.question_pool_service import question_pool_service
+from backend.services.class_analytics_service import class_analytics_service
 
 # Import route modules
 from backend.routes import auth, student, practice, tutor, teacher, study_planner, notes, practice_scheduler, student_analytics, calendar
@@ -15,17 +29,38 @@ from backend.routes.student import dashboard_router
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Debug output (auth decisions, route diagnostics) is only emitted with LOG_LEVEL=DEBUG
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
+    request_log.start()
+    plan_monitor = install_query_plan_monitor()  # before the client exists
     await connect_to_database()
-    await create_indexes()
-    print("✅ Backend server started successfully")
+    await reconcile_indexes()
+    await run_migrations()
+    question_pool_service.start()
+    job_queue.start()
+    await class_analytics_service.schedule_rebuild()
+    if plan_monitor:
+        plan_monitor.start()
+    logger.info("Backend server started successfully")
     yield
     # Shutdown
+    if plan_monitor:
+        await plan_monitor.stop()
+    await question_pool_service.stop()
+    await job_queue.stop()
+    await flush_background_writes()
     await close_database_connection()
-    print("👋 Backend server shutdown complete")
+    await model_router.close()
+    password_hasher.shutdown()
+    logger.info("Backend server shutdown complete")
+    request_log.stop()
 
 # Create FastAPI app with lifespan events
 app = FastAPI(
@@ -35,19 +70,38 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Add request logging middleware
+# Request observability: latency histograms, status counts and per-stage timings for every
+# request, structured log records for a sample of them (plus all errors and slow requests)
 @app.middleware("http")
-async def log_requests(request: Request, call_next):
-    print(f"🔍 REQUEST DEBUG: {request.method} {request.url}")
-    print(f"🔍 REQUEST HEADERS: {dict(request.headers)}")
-    if "authorization" in request.headers:
-        auth_header = request.headers.get("authorization")
-        print(f"🔍 AUTH HEADER: {auth_header[:50]}...")
-    else:
-        print("❌ NO AUTHORIZATION HEADER FOUND")
+async def observe_requests(request: Request, call_next):
+    start = time.perf_counter()
+    trace = start_trace()
+    
+    def finish(status_code: int):
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", UNMATCHED_ROUTE)
+        request_metrics.observe(request.method, route_path, status_code, elapsed)
+        request_metrics.observe_stages(route_path, trace.stages, trace.fallbacks)
+        request_log.record(request.method, request.url.path, route_path, status_code, elapsed * 1000)
     
-    response = await call_next(request)
-    print(f"🔍 RESPONSE: {response.status_code}")
+    try:
+        response = await call_next(request)
+    except Exception:
+        finish(500)
+        raise
+    if SERVER_TIMING_ENABLED and trace.stages:
+        response.headers["Server-Timing"] = trace.server_timing()
+    
+    # Record once the body has been sent, so streamed responses include their stages
+    body = response.body_iterator
+    async def observed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            finish(response.status_code)
+    response.body_iterator = observed_body()
     return response
 
 # Configure CORS
@@ -91,6 +145,35 @@ async def api_health_check():
         "version": "2.0.0"
     }
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """LLM response cache hit, miss and eviction counters"""
+    return {
+        **CacheUtils.get_cache_stats(),
+        "tutor_answers": tutor_answer_cache.get_stats(),
+        "single_flight": dict(ai_single_flight.stats)
+    }
+
+@app.get("/api/jobs/stats")
+async def background_job_stats():
+    """Background job queue counters for this worker"""
+    return job_queue.get_stats()
+
+@app.get("/api/auth/hasher/stats")
+async def password_hasher_stats():
+    """Password hashing pool queue depth, rejections and latency"""
+    return password_hasher.get_stats()
+
+@app.get("/api/ai/router/stats")
+async def model_router_stats():
+    """Per-model circuit state, quota tokens, latency and failover counters"""
+    return model_router.get_stats()
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-route request counts and latency histograms in Prometheus text format"""
+    return PlainTextResponse(request_metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 async def root():
     """Root endpoint"""
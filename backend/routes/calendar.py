@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -7,6 +8,8 @@ import uuid
 from backend.utils.database import get_database, Collections, convert_objectid_to_str
 from backend.utils.security import get_current_student
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/calendar", tags=["calendar"])
 
 # Calendar Event Model
@@ -61,7 +64,7 @@ async def create_calendar_event(
         return convert_objectid_to_str(event)
         
     except Exception as e:
-        print(f"Error creating calendar event: {e}")
+        logger.error("Error creating calendar event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create calendar event")
 
 @router.get("/events")
@@ -81,7 +84,7 @@ async def get_calendar_events(
         return [convert_objectid_to_str(event) for event in events]
         
     except Exception as e:
-        print(f"Error fetching calendar events: {e}")
+        logger.error("Error fetching calendar events: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch calendar events")
 
 @router.get("/events/{event_id}")
@@ -106,7 +109,7 @@ async def get_calendar_event(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching calendar event: {e}")
+        logger.error("Error fetching calendar event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch calendar event")
 
 @router.put("/events/{event_id}")
@@ -149,7 +152,7 @@ async def update_calendar_event(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating calendar event: {e}")
+        logger.error("Error updating calendar event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update calendar event")
 
 @router.delete("/events/{event_id}")
@@ -174,7 +177,7 @@ async def delete_calendar_event(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting calendar event: {e}")
+        logger.error("Error deleting calendar event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete calendar event")
 
 @router.put("/events/{event_id}/complete")
@@ -204,5 +207,5 @@ async def mark_event_complete(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error marking event complete: {e}")
+        logger.error("Error marking event complete: %s", e)
         raise HTTPException(status_code=500, detail="Failed to mark event complete")
\ No newline at end of file
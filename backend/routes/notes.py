@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -6,9 +7,12 @@ import uuid
 
 from backend.utils.database import get_database, Collections, convert_objectid_to_str
 from backend.utils.security import get_current_student
+from backend.utils.observability import span
 from backend.services.ai_service import AIService
 from backend.models.user import Subject
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/notes", tags=["notes"])
 
 # Request/Response models
@@ -62,12 +66,13 @@ async def generate_notes(
         }
         
         # Save to database
-        await db[Collections.STUDENT_NOTES].insert_one(note_data)
+        with span("db.write"):
+            await db[Collections.STUDENT_NOTES].insert_one(note_data)
         
         return {"message": "Notes generated successfully", "note_id": note_id}
         
     except Exception as e:
-        print(f"Error generating notes: {e}")
+        logger.error("Error generating notes: %s", e)
         raise HTTPException(status_code=500, detail="Failed to generate notes")
 
 @router.get("/")
@@ -89,7 +94,7 @@ async def get_all_notes(
         return notes
         
     except Exception as e:
-        print(f"Error fetching notes: {e}")
+        logger.error("Error fetching notes: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch notes")
 
 @router.get("/{note_id}")
@@ -118,7 +123,7 @@ async def get_note(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching note: {e}")
+        logger.error("Error fetching note: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch note")
 
 @router.put("/{note_id}/favorite")
@@ -158,7 +163,7 @@ async def toggle_favorite(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error toggling favorite: {e}")
+        logger.error("Error toggling favorite: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update favorite status")
 
 @router.delete("/{note_id}/delete")
@@ -184,5 +189,5 @@ async def delete_note(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting note: {e}")
+        logger.error("Error deleting note: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete note")
\ No newline at end of file
@@ -1,68 +1,52 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Optional
 from backend.models.practice import PracticeTestRequest, PracticeAttempt, TestSubmissionRequest
 from backend.models.user import Subject
 from backend.utils.security import get_current_student
-from backend.utils.database import get_database, Collections, convert_objectid_to_str
+from backend.utils.database import get_database, Collections, convert_objectid_to_str, save_practice_questions
 from backend.services.ai_service import ai_service
+from backend.services.question_pool_service import question_pool_service
+from backend.services.student_stats_service import StudentStatsService
+from backend.services.class_analytics_service import class_analytics_service
+from backend.services.review_schedule_service import ReviewScheduleService
 from backend.utils.helpers import ScoreUtils
+from backend.utils.observability import span
 from datetime import datetime
 import uuid
 
-router = APIRouter(prefix="/api/practice", tags=["practice"])
+logger = logging.getLogger(__name__)
 
-async def fix_null_subjects_in_database(db):
-    """One-time data migration to fix NULL subjects in existing practice attempts"""
-    try:
-        # Find attempts with NULL/None subjects
-        null_attempts = await db[Collections.PRACTICE_ATTEMPTS].find({
-            "$or": [
-                {"subject": {"$exists": False}},
-                {"subject": None},
-                {"subject": ""}
-            ]
-        }).to_list(None)
-        
-        if null_attempts:
-            print(f"🔧 Data Migration: Found {len(null_attempts)} attempts with NULL subjects")
-            
-            # Update them to 'general' as fallback
-            result = await db[Collections.PRACTICE_ATTEMPTS].update_many(
-                {
-                    "$or": [
-                        {"subject": {"$exists": False}},
-                        {"subject": None},
-                        {"subject": ""}
-                    ]
-                },
-                {"$set": {"subject": "general"}}
-            )
-            
-            print(f"✅ Data Migration: Updated {result.modified_count} attempts with subject='general'")
-    except Exception as e:
-        print(f"❌ Data Migration Error: {e}")
+router = APIRouter(prefix="/api/practice", tags=["practice"])
 
 @router.post("/generate")
 async def generate_practice_test(
     test_request: PracticeTestRequest,
     current_user: dict = Depends(get_current_student)
 ):
-    """Generate a practice test using AI"""
+    """Generate a practice test, serving unseen pooled questions before calling the AI"""
     try:
-        # Generate questions using AI service
-        questions = await ai_service.generate_practice_questions(
-            subject=test_request.subject,
-            topics=test_request.topics,
-            difficulty=test_request.difficulty,
-            question_count=test_request.question_count,
-            question_types=test_request.question_types
-        )
+        # Draw from the question pool; only the shortfall is generated live
+        with span("pool.select"):
+            questions, fresh_questions = await question_pool_service.get_practice_questions(
+                student_id=current_user["sub"],
+                subject=test_request.subject,
+                topics=test_request.topics,
+                difficulty=test_request.difficulty,
+                question_count=test_request.question_count,
+                question_types=test_request.question_types
+            )
         
-        # Store questions in database for tracking
-        db = get_database()
-        for question in questions:
-            question["created_at"] = datetime.utcnow()
-            await db[Collections.PRACTICE_QUESTIONS].insert_one(question.copy())  # Insert a copy to avoid modifying original
+        with span("db.write"):
+            # Store newly generated questions in database for tracking
+            await save_practice_questions(fresh_questions)
+            
+            # Remember what this student has seen so future tests stay varied
+            await question_pool_service.record_seen(
+                current_user["sub"],
+                test_request.subject,
+                [question["id"] for question in questions]
+            )
         
         # Convert any ObjectIds to strings before returning
         return convert_objectid_to_str({
@@ -89,9 +73,10 @@ async def submit_practice_test(
     try:
         # Get questions from database
         question_ids = test_data.get("questions", [])
-        questions = await db[Collections.PRACTICE_QUESTIONS].find({
-            "id": {"$in": question_ids}
-        }).to_list(None)
+        with span("db.read"):
+            questions = await db[Collections.PRACTICE_QUESTIONS].find({
+                "id": {"$in": question_ids}
+            }).to_list(None)
         
         if not questions:
             raise HTTPException(
@@ -105,22 +90,26 @@ async def submit_practice_test(
         total_questions = len(questions)
         detailed_results = []
         
-        for question in questions:
+        # Use AI-powered evaluation for better accuracy, grading the whole test together
+        with span("grading"):
+            evaluations = await ai_service.evaluate_answers_batch([
+                {
+                    "question_text": question["question_text"],
+                    "question_type": question.get("question_type", "mcq"),
+                    "student_answer": student_answers.get(question["id"], "").strip(),
+                    "correct_answer": question["correct_answer"].strip(),
+                    "subject": question.get("subject", ""),
+                    "topic": question.get("topic", "")
+                }
+                for question in questions
+            ])
+        
+        for question, evaluation in zip(questions, evaluations):
             question_id = question["id"]
             student_answer = student_answers.get(question_id, "").strip()
             correct_answer = question["correct_answer"].strip()
             question_type = question.get("question_type", "mcq")
             
-            # Use AI-powered evaluation for better accuracy
-            evaluation = await ai_service.evaluate_answer_intelligently(
-                question_text=question["question_text"],
-                question_type=question_type,
-                student_answer=student_answer,
-                correct_answer=correct_answer,
-                subject=question.get("subject", ""),
-                topic=question.get("topic", "")
-            )
-            
             is_correct = evaluation["is_correct"]
             if is_correct:
                 correct_count += 1
@@ -171,50 +160,22 @@ async def submit_practice_test(
         }
         
         # Save attempt to database
-        await db[Collections.PRACTICE_ATTEMPTS].insert_one(attempt_doc)
+        with span("db.write"):
+            await db[Collections.PRACTICE_ATTEMPTS].insert_one(attempt_doc)
         
-        # Automatically schedule next review test based on performance
+        # Schedule the next review test in the background; submission does not wait for it
         try:
-            # Import AI service and create schedule recommendation
-            schedule_recommendation = await ai_service.generate_smart_schedule_recommendation(
-                subject=subject,
-                topics=list(set(q.get("topic", "General") for q in questions)),
-                score=score_percentage,
-                difficulty=attempt_doc["difficulty"],
-                student_id=current_user["sub"]
-            )
-            
-            # Create scheduled test record
-            scheduled_test_id = str(uuid.uuid4())
-            scheduled_test = {
-                "id": scheduled_test_id,
-                "user_id": current_user["sub"],
-                "subject": subject,
-                "topics": list(set(q.get("topic", "General") for q in questions)),
-                "difficulty": attempt_doc["difficulty"],
-                "question_count": min(total_questions, 5),  # Limit review tests to 5 questions
-                "scheduled_for": schedule_recommendation["recommended_date"],
-                "created_at": datetime.utcnow(),
-                "reason": schedule_recommendation["reason"],
-                "priority": schedule_recommendation["priority"],
-                "original_score": score_percentage,
-                "is_completed": False,
-                "study_tips": schedule_recommendation.get("study_tips", []),
-                "estimated_improvement": schedule_recommendation.get("estimated_improvement", "")
-            }
-            
-            # Save to database
-            await db[Collections.SCHEDULED_TESTS].insert_one(scheduled_test)
-            
+            with span("schedule"):
+                await ReviewScheduleService.enqueue_review(attempt_doc)
         except Exception as e:
-            print(f"Warning: Failed to schedule automatic review: {e}")
+            logger.warning("Failed to queue automatic review: %s", e)
             # Don't fail the entire test submission if scheduling fails
         
-        # Update student profile
-        await update_student_stats(current_user["sub"], score_percentage, subject)
-        
-        # Data migration: Fix any NULL subjects in existing attempts (one-time fix)
-        await fix_null_subjects_in_database(db)
+        # Update student profile and subject rollup
+        with span("db.write"):
+            await update_student_stats(current_user["sub"], score_percentage, subject)
+            await _record_subject_rollup(attempt_doc, subject, total_questions)
+            await _record_class_attempt(attempt_doc, subject, correct_count, total_questions)
         
         return {
             "attempt_id": attempt_doc["id"],
@@ -259,22 +220,25 @@ async def submit_scheduled_test(
         total_questions = len(questions)
         detailed_results = []
         
-        for question in questions:
+        # Use AI-powered evaluation for better accuracy, grading the whole test together
+        evaluations = await ai_service.evaluate_answers_batch([
+            {
+                "question_text": question.get("question_text", ""),
+                "question_type": question.get("question_type", "short_answer"),
+                "student_answer": student_answers.get(question.get("id", ""), "").strip(),
+                "correct_answer": question.get("correct_answer", "").strip(),
+                "subject": question.get("subject", subject),
+                "topic": question.get("topic", "Review")
+            }
+            for question in questions
+        ])
+        
+        for question, evaluation in zip(questions, evaluations):
             question_id = question.get("id", "")
             student_answer = student_answers.get(question_id, "").strip()
             correct_answer = question.get("correct_answer", "").strip()
             question_type = question.get("question_type", "short_answer")
             
-            # Use AI-powered evaluation for better accuracy
-            evaluation = await ai_service.evaluate_answer_intelligently(
-                question_text=question.get("question_text", ""),
-                question_type=question_type,
-                student_answer=student_answer,
-                correct_answer=correct_answer,
-                subject=question.get("subject", subject),
-                topic=question.get("topic", "Review")
-            )
-            
             is_correct = evaluation["is_correct"]
             if is_correct:
                 correct_count += 1
@@ -338,6 +302,10 @@ async def submit_scheduled_test(
         # Save attempt to database
         await db[Collections.PRACTICE_ATTEMPTS].insert_one(attempt_doc)
         
+        # Keep the subject rollup in step with the attempts collection
+        await _record_subject_rollup(attempt_doc, subject, total_questions)
+        await _record_class_attempt(attempt_doc, subject, correct_count, total_questions)
+        
         return {
             "attempt_id": attempt_doc["id"],
             "score": score_percentage,
@@ -351,7 +319,7 @@ async def submit_scheduled_test(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error submitting scheduled test: {e}")
+        logger.error("Error submitting scheduled test: %s", e)
         raise HTTPException(status_code=500, detail="Failed to submit scheduled test")
 
 @router.get("/results/{attempt_id}")
@@ -441,16 +409,11 @@ async def get_subject_stats(
     current_user: dict = Depends(get_current_student)
 ):
     """Get statistics for a specific subject"""
-    db = get_database()
-    
     try:
-        # Get attempts for the subject
-        attempts = await db[Collections.PRACTICE_ATTEMPTS].find({
-            "student_id": current_user["sub"],
-            "subject": subject
-        }).to_list(None)
+        # Read the incrementally maintained rollup instead of rescanning attempts
+        rollup = await StudentStatsService.get_subject_rollup(current_user["sub"], subject)
         
-        if not attempts:
+        if not rollup or not rollup.get("count"):
             return {
                 "subject": subject,
                 "total_tests": 0,
@@ -460,70 +423,28 @@ async def get_subject_stats(
                 "recent_tests": []
             }
         
-        # Calculate statistics with defensive programming
-        total_tests = len(attempts)
-        scores = []
-        for attempt in attempts:
-            score = attempt.get("score", 0)
-            if isinstance(score, (int, float)):
-                scores.append(score)
-        
-        average_score = sum(scores) / len(scores) if scores else 0
-        best_score = max(scores) if scores else 0
-        
-        # Calculate total questions with safe fallbacks
-        total_questions = 0
-        for attempt in attempts:
-            questions_count = attempt.get("total_questions")
-            if questions_count is not None:
-                total_questions += questions_count
-            else:
-                # Fallback to counting questions array
-                questions = attempt.get("questions", [])
-                total_questions += len(questions)
-        
-        # Recent tests (last 5) with safe sorting
-        valid_recent_tests = []
-        for test in attempts:
-            completed_at = test.get("completed_at")
-            if completed_at is not None:
-                valid_recent_tests.append(test)
-        
-        # Sort by completed_at descending (most recent first)
-        recent_tests = sorted(valid_recent_tests, 
-                            key=lambda x: x.get("completed_at", ""), 
-                            reverse=True)[:5]
-        
+        # Recent tests (last 5), most recent first
         recent_formatted = []
-        for test in recent_tests:
-            # Safe field extraction
-            total_questions_for_test = test.get("total_questions")
-            if total_questions_for_test is None:
-                questions = test.get("questions", [])
-                total_questions_for_test = len(questions)
-            
+        for test in reversed(rollup.get("recent_attempts", [])[-5:]):
             recent_formatted.append({
                 "id": test.get("id", ""),
                 "score": test.get("score", 0),
-                "total_questions": total_questions_for_test,
+                "total_questions": test.get("total_questions", 0),
                 "difficulty": test.get("difficulty", "medium"),
                 "completed_at": test.get("completed_at")
             })
         
         return {
             "subject": subject,
-            "total_tests": total_tests,
-            "average_score": round(average_score, 1),
-            "best_score": round(best_score, 1),
-            "total_questions_answered": total_questions,
+            "total_tests": rollup["count"],
+            "average_score": round(StudentStatsService.average(rollup), 1),
+            "best_score": round(rollup.get("best_score", 0), 1),
+            "total_questions_answered": rollup.get("total_questions", 0),
             "recent_tests": recent_formatted
         }
     
     except Exception as e:
-        print(f"❌ ERROR in get_subject_stats for {subject}: {str(e)}")
-        print(f"❌ ERROR TYPE: {type(e)}")
-        import traceback
-        print(f"❌ ERROR TRACEBACK: {traceback.format_exc()}")
+        logger.exception("Error in get_subject_stats for %s: %s", subject, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get stats for {subject}: {str(e)}"
@@ -534,43 +455,71 @@ async def update_student_stats(student_id: str, score: float, subject: str):
     db = get_database()
     
     try:
-        # Get current profile
-        profile = await db[Collections.STUDENT_PROFILES].find_one({"user_id": student_id})
-        if not profile:
-            return
-        
-        # Calculate new statistics
-        total_tests = profile.get("total_tests", 0) + 1
-        current_avg = profile.get("average_score", 0.0)
-        new_avg = ((current_avg * (total_tests - 1)) + score) / total_tests
-        
-        # Update recent scores (keep last 10)
-        recent_scores = profile.get("recent_scores", [])
-        recent_scores.append({
-            "score": score,
-            "subject": subject,
-            "date": datetime.utcnow()
-        })
-        recent_scores = recent_scores[-10:]  # Keep only last 10
+        total_tests = {"$ifNull": ["$total_tests", 0]}
+        subjects_studied = {"$ifNull": ["$subjects_studied", []]}
         
-        # Add subject to studied subjects if not already there
-        subjects_studied = profile.get("subjects_studied", [])
-        if subject not in subjects_studied:
-            subjects_studied.append(subject)
-        
-        # Update profile
+        # Single atomic pipeline update so concurrent submissions don't lose updates
         await db[Collections.STUDENT_PROFILES].update_one(
             {"user_id": student_id},
-            {
-                "$set": {
-                    "total_tests": total_tests,
-                    "average_score": round(new_avg, 1),
-                    "recent_scores": recent_scores,
-                    "subjects_studied": subjects_studied,
-                    "updated_at": datetime.utcnow()
-                }
-            }
+            [{"$set": {
+                "total_tests": {"$add": [total_tests, 1]},
+                "average_score": {"$round": [
+                    {"$divide": [
+                        {"$add": [{"$multiply": [{"$ifNull": ["$average_score", 0.0]}, total_tests]}, score]},
+                        {"$add": [total_tests, 1]}
+                    ]},
+                    1
+                ]},
+                # Keep only the last 10 scores
+                "recent_scores": {"$slice": [
+                    {"$concatArrays": [
+                        {"$ifNull": ["$recent_scores", []]},
+                        [{"$literal": {"score": score, "subject": subject, "date": datetime.utcnow()}}]
+                    ]},
+                    -10
+                ]},
+                # Add subject to studied subjects if not already there
+                "subjects_studied": {"$cond": [
+                    {"$in": [subject, subjects_studied]},
+                    subjects_studied,
+                    {"$concatArrays": [subjects_studied, [subject]]}
+                ]},
+                "updated_at": datetime.utcnow()
+            }}]
         )
     
     except Exception as e:
-        print(f"Error updating student stats: {e}")
\ No newline at end of file
+        logger.error("Error updating student stats: %s", e)
+
+async def _record_subject_rollup(attempt_doc: dict, subject: str, total_questions: int):
+    """Fold a saved attempt into the student's subject rollup"""
+    try:
+        await StudentStatsService.record_attempt(
+            student_id=attempt_doc["student_id"],
+            subject=subject,
+            attempt_id=attempt_doc["id"],
+            score=attempt_doc["score"],
+            total_questions=total_questions,
+            time_taken=attempt_doc.get("time_taken"),
+            difficulty=attempt_doc["difficulty"],
+            completed_at=attempt_doc.get("completed_at") or attempt_doc.get("created_at")
+        )
+    except Exception as e:
+        # The attempt is already saved; failing the request would invite a duplicate resubmission
+        logger.warning("Failed to update subject rollup: %s", e)
+
+async def _record_class_attempt(attempt_doc: dict, subject: str, correct_count: int, total_questions: int):
+    """Update the class analytics snapshots for the student's classes"""
+    try:
+        await class_analytics_service.record_attempt(
+            student_id=attempt_doc["student_id"],
+            subject=subject,
+            score=attempt_doc["score"],
+            total_questions=total_questions,
+            correct_count=correct_count,
+            detailed_results=attempt_doc.get("detailed_results", []),
+            completed_at=attempt_doc.get("completed_at") or attempt_doc.get("created_at")
+        )
+    except Exception as e:
+        # The periodic rebuild will pick this attempt up
+        logger.error("Error updating class analytics snapshots: %s", e)
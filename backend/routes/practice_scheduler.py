@@ -1,14 +1,17 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import uuid
 
-from backend.utils.database import get_database, Collections, convert_objectid_to_str
+from backend.utils.database import get_database, Collections, convert_objectid_to_str, save_practice_questions
 from backend.utils.security import get_current_student
 from backend.services.ai_service import AIService
 from backend.models.practice import CompleteTestRequest
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/practice-scheduler", tags=["practice-scheduler"])
 
 # Request/Response models
@@ -88,7 +91,7 @@ async def schedule_review_test(
         }
         
     except Exception as e:
-        print(f"Error scheduling review test: {e}")
+        logger.error("Error scheduling review test: %s", e)
         raise HTTPException(status_code=500, detail="Failed to schedule review test")
 
 @router.get("/upcoming-tests")
@@ -132,7 +135,7 @@ async def get_upcoming_tests(
         return categorized_tests
         
     except Exception as e:
-        print(f"Error fetching upcoming tests: {e}")
+        logger.error("Error fetching upcoming tests: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch upcoming tests")
 
 @router.post("/take-scheduled-test/{test_id}")
@@ -172,13 +175,16 @@ async def take_scheduled_test(
                 question_types=question_types
             )
             
+            # Store generated questions for tracking
+            await save_practice_questions(questions)
+            
             return {
                 "scheduled_test": convert_objectid_to_str(scheduled_test),
-                "questions": questions
+                "questions": convert_objectid_to_str(questions)
             }
             
         except Exception as e:
-            print(f"Error generating questions for scheduled test: {e}")
+            logger.error("Error generating questions for scheduled test: %s", e)
             # Fallback: create simple questions if AI fails
             fallback_questions = [
                 {
@@ -202,7 +208,7 @@ async def take_scheduled_test(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error starting scheduled test: {e}")
+        logger.error("Error starting scheduled test: %s", e)
         raise HTTPException(status_code=500, detail="Failed to start scheduled test")
 
 @router.post("/complete-scheduled-test/{test_id}")
@@ -250,7 +256,7 @@ async def complete_scheduled_test(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error completing scheduled test: {e}")
+        logger.error("Error completing scheduled test: %s", e)
         raise HTTPException(status_code=500, detail="Failed to complete scheduled test")
 
 @router.delete("/cancel-test/{test_id}")
@@ -274,5 +280,5 @@ async def cancel_scheduled_test(
         return {"message": "Scheduled test cancelled successfully"}
         
     except Exception as e:
-        print(f"Error cancelling scheduled test: {e}")
+        logger.error("Error cancelling scheduled test: %s", e)
         raise HTTPException(status_code=500, detail="Failed to cancel scheduled test")
\ No newline at end of file
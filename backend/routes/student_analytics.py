@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import Optional
 from datetime import datetime, timedelta
@@ -5,6 +6,9 @@ from datetime import datetime, timedelta
 from backend.utils.security import get_current_student
 from backend.utils.database import get_database, Collections, convert_objectid_to_str
 from backend.services.analytics_service import StudentAnalyticsService
+from backend.services.student_stats_service import StudentStatsService
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/student/analytics", tags=["Student Analytics"])
 
@@ -33,7 +37,7 @@ async def get_strengths_weaknesses_analysis(
         return analysis
         
     except Exception as e:
-        print(f"Error analyzing strengths/weaknesses: {str(e)}")
+        logger.error("Error analyzing strengths/weaknesses: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to analyze performance data: {str(e)}"
@@ -72,7 +76,7 @@ async def get_performance_trends(
         return trends
         
     except Exception as e:
-        print(f"Error getting performance trends: {str(e)}")
+        logger.error("Error getting performance trends: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get performance trends: {str(e)}"
@@ -84,46 +88,37 @@ async def get_subject_breakdown(
 ):
     """Get detailed breakdown by subject"""
     try:
-        db = get_database()
         student_id = current_user['sub']
         
-        # Aggregate performance by subject
-        pipeline = [
-            {"$match": {"student_id": student_id}},
-            {"$group": {
-                "_id": "$subject",
-                "total_tests": {"$sum": 1},
-                "average_score": {"$avg": "$score"},
-                "highest_score": {"$max": "$score"},
-                "lowest_score": {"$min": "$score"},
-                "total_time": {"$sum": "$time_taken"},
-                "recent_scores": {"$push": "$score"}
-            }},
-            {"$sort": {"average_score": -1}}
-        ]
-        
-        subject_stats = await db[Collections.PRACTICE_ATTEMPTS].aggregate(pipeline).to_list(100)
+        # Read per-subject rollups maintained on each submission
+        rollups = await StudentStatsService.get_all_rollups(student_id)
         
         # Format the results
         breakdown = []
-        for stat in subject_stats:
-            subject = stat["_id"] or "General"
+        for rollup in rollups:
+            if not rollup.get("count"):
+                continue
+            subject = rollup.get("subject") or "General"
+            average_score = StudentStatsService.average(rollup)
+            total_time = rollup.get("total_time", 0)
             
             breakdown.append({
                 "subject": subject,
                 "subject_display": subject.replace('_', ' ').title(),
-                "total_tests": stat["total_tests"],
-                "average_score": round(stat["average_score"], 1),
-                "highest_score": stat["highest_score"],
-                "lowest_score": stat["lowest_score"],
-                "total_time_minutes": round(stat["total_time"] / 60, 1),
-                "avg_time_per_test": round((stat["total_time"] / stat["total_tests"]) / 60, 1) if stat["total_tests"] > 0 else 0,
-                "performance_grade": "A" if stat["average_score"] >= 90 else
-                                   "B" if stat["average_score"] >= 80 else
-                                   "C" if stat["average_score"] >= 70 else
-                                   "D" if stat["average_score"] >= 60 else "F"
+                "total_tests": rollup["count"],
+                "average_score": round(average_score, 1),
+                "highest_score": rollup.get("best_score", 0),
+                "lowest_score": rollup.get("worst_score", 0),
+                "total_time_minutes": round(total_time / 60, 1),
+                "avg_time_per_test": round((total_time / rollup["count"]) / 60, 1),
+                "performance_grade": "A" if average_score >= 90 else
+                                   "B" if average_score >= 80 else
+                                   "C" if average_score >= 70 else
+                                   "D" if average_score >= 60 else "F"
             })
         
+        breakdown.sort(key=lambda item: item["average_score"], reverse=True)
+        
         return {
             "subject_breakdown": breakdown,
             "total_subjects": len(breakdown),
@@ -132,7 +127,7 @@ async def get_subject_breakdown(
         }
         
     except Exception as e:
-        print(f"Error getting subject breakdown: {str(e)}")
+        logger.error("Error getting subject breakdown: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get subject breakdown: {str(e)}"
@@ -270,7 +265,7 @@ async def get_learning_insights(
         }
         
     except Exception as e:
-        print(f"Error getting learning insights: {str(e)}")
+        logger.error("Error getting learning insights: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get learning insights: {str(e)}"
@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -7,8 +8,11 @@ import uuid
 from backend.utils.database import get_database, Collections, convert_objectid_to_str
 from backend.utils.security import get_current_student
 from backend.services.ai_service import AIService
+from backend.utils.job_queue import job_queue, job_handler
 from backend.models.user import Subject
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/study-planner", tags=["study-planner"])
 
 # Request/Response models
@@ -23,6 +27,7 @@ class StudyPlanRequest(BaseModel):
     subjects: List[StudyRequirement]
     preferred_start_time: Optional[str] = None
     break_preferences: Optional[Dict[str, Any]] = None
+    ai_commentary: bool = False  # explain the plan with AI in the background; stored on the plan when ready
 
 class PomodoroSession(BaseModel):
     id: str
@@ -42,6 +47,7 @@ class StudyPlanResponse(BaseModel):
     pomodoro_sessions: List[PomodoroSession]
     study_tips: List[str]
     created_at: datetime
+    ai_commentary_pending: bool = False
 
 class ChatMessage(BaseModel):
     message: str
@@ -57,6 +63,21 @@ class BotResponse(BaseModel):
 # Initialize AI service
 ai_service = AIService()
 
+STUDY_PLAN_COMMENTARY_JOB = "study_plan_commentary"
+
+@job_handler(STUDY_PLAN_COMMENTARY_JOB)
+async def generate_plan_commentary(payload: Dict[str, Any]):
+    """Background job: store an AI explanation of a generated study plan on the plan"""
+    db = get_database()
+    plan = await db[Collections.STUDY_PLANS].find_one({"plan_id": payload["plan_id"]})
+    if plan is None:
+        return
+    commentary = await ai_service.generate_study_plan_commentary(plan["subjects"], plan["pomodoro_sessions"])
+    await db[Collections.STUDY_PLANS].update_one(
+        {"plan_id": payload["plan_id"]},
+        {"$set": {"ai_commentary": commentary}}
+    )
+
 @router.post("/chat", response_model=BotResponse)
 async def chat_with_planner_bot(
     request: ChatMessage,
@@ -74,7 +95,7 @@ async def chat_with_planner_bot(
         return bot_response
         
     except Exception as e:
-        print(f"Error in study planner chat: {e}")
+        logger.error("Error in study planner chat: %s", e)
         raise HTTPException(status_code=500, detail="Failed to process study planner request")
 
 @router.post("/generate-plan", response_model=StudyPlanResponse)
@@ -89,7 +110,7 @@ async def generate_study_plan(
         # Create plan ID
         plan_id = str(uuid.uuid4())
         
-        # Generate optimized study plan using AI
+        # Build the optimized study plan locally
         study_plan = await ai_service.generate_pomodoro_study_plan(
             total_duration=request.total_duration_minutes,
             subjects=request.subjects,
@@ -111,6 +132,15 @@ async def generate_study_plan(
         
         await db[Collections.STUDY_PLANS].insert_one(plan_data)
         
+        # AI commentary is opt-in and never holds up the plan
+        commentary_pending = False
+        if request.ai_commentary:
+            try:
+                await job_queue.enqueue(STUDY_PLAN_COMMENTARY_JOB, {"plan_id": plan_id})
+                commentary_pending = True
+            except Exception as e:
+                logger.warning("Failed to queue study plan commentary: %s", e)
+        
         # Calculate totals
         total_work_time = sum(session["duration_minutes"] for session in study_plan["sessions"] if session["session_type"] == 'work')
         total_break_time = sum(session["duration_minutes"] for session in study_plan["sessions"] if session["session_type"] == 'break')
@@ -122,11 +152,12 @@ async def generate_study_plan(
             total_break_time=total_break_time,
             pomodoro_sessions=study_plan["sessions"],
             study_tips=study_plan["tips"],
-            created_at=datetime.utcnow()
+            created_at=datetime.utcnow(),
+            ai_commentary_pending=commentary_pending
         )
         
     except Exception as e:
-        print(f"Error generating study plan: {e}")
+        logger.error("Error generating study plan: %s", e)
         raise HTTPException(status_code=500, detail="Failed to generate study plan")
 
 @router.get("/my-plans")
@@ -147,7 +178,7 @@ async def get_my_study_plans(
         return plans
         
     except Exception as e:
-        print(f"Error fetching study plans: {e}")
+        logger.error("Error fetching study plans: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch study plans")
 
 @router.post("/start-session/{plan_id}")
@@ -227,7 +258,7 @@ async def start_study_session(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error starting study session: {e}")
+        logger.error("Error starting study session: %s", e)
         raise HTTPException(status_code=500, detail="Failed to start study session")
 
 @router.delete("/plan/{plan_id}")
@@ -252,5 +283,5 @@ async def delete_study_plan(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting study plan: {e}")
+        logger.error("Error deleting study plan: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete study plan")
\ No newline at end of file
@@ -1,13 +1,17 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel
 from typing import Optional, List
 from backend.utils.security import get_current_teacher
 from backend.utils.database import get_database, Collections
+from backend.services.class_analytics_service import class_analytics_service
 import uuid
 from datetime import datetime
 from collections import defaultdict
 import statistics
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/teacher", tags=["Teacher"])
 
 # Pydantic models
@@ -119,7 +123,7 @@ async def get_teacher_classes(
         
         # Get teacher's classes
         classes_cursor = db[Collections.CLASSROOMS].find({"teacher_id": teacher_id, "active": True})
-        classes = await classes_cursor.to_list(100)
+        classes = await classes_cursor.to_list(None)
         
         # Enhance with statistics
         enhanced_classes = []
@@ -238,9 +242,7 @@ async def get_class_strengths_weaknesses(
             all_class_ids = [class_id]
         else:
             # Get all teacher's classes
-            teacher_classes_cursor = db[Collections.CLASSROOMS].find({"teacher_id": teacher_id})
-            teacher_classes = await teacher_classes_cursor.to_list(100)
-            all_class_ids = [cls["class_id"] for cls in teacher_classes]
+            all_class_ids = await db[Collections.CLASSROOMS].distinct("class_id", {"teacher_id": teacher_id})
         
         if not all_class_ids:
             return {
@@ -252,12 +254,8 @@ async def get_class_strengths_weaknesses(
                 "total_tests": 0
             }
         
-        # Get students in these classes
-        students_cursor = db[Collections.STUDENT_PROFILES].find({
-            "joined_classes": {"$elemMatch": {"$in": all_class_ids}}
-        })
-        students = await students_cursor.to_list(1000)
-        student_ids = [student['user_id'] for student in students]
+        # Get students in these classes (ids only, no document cap)
+        student_ids = await _get_class_student_ids(db, all_class_ids)
         
         if not student_ids:
             return {
@@ -269,64 +267,47 @@ async def get_class_strengths_weaknesses(
                 "total_tests": 0
             }
         
-        # Get all practice attempts from students in the class
-        practice_attempts_cursor = db[Collections.PRACTICE_ATTEMPTS].find({
-            "student_id": {"$in": student_ids}
-        }).sort("completed_at", -1)
-        practice_attempts = await practice_attempts_cursor.to_list(2000)
-        
-        # Analyze class-wide performance by subject
-        subject_performance = defaultdict(list)
-        student_performance = defaultdict(list)  # Track per student for individual analysis
-        
-        for attempt in practice_attempts:
-            subject = attempt.get('subject', 'general')
-            score = attempt.get('score', 0)
-            student_id = attempt.get('student_id')
-            
-            subject_performance[subject].append({
-                'score': score,
-                'student_id': student_id,
-                'attempt_id': attempt.get('id'),
-                'total_questions': attempt.get('total_questions', 0),
-                'correct_count': attempt.get('correct_count', 0)
-            })
-            
-            student_performance[student_id].append({
-                'subject': subject,
-                'score': score,
-                'attempt_id': attempt.get('id')
-            })
-        
-        # Analyze each subject for class performance
+        # Read performance by subject from the precomputed snapshots; across all of the teacher's
+        # classes, teacher snapshots count students enrolled in several classes once
+        if class_id:
+            snapshots = await class_analytics_service.get_snapshots(all_class_ids)
+        else:
+            snapshots = await class_analytics_service.get_teacher_snapshots(teacher_id)
+        by_subject = defaultdict(list)
+        for snapshot in snapshots:
+            by_subject[snapshot["subject"]].append(snapshot)
+        subject_rows = {subject: class_analytics_service.combine(docs) for subject, docs in by_subject.items()}
+        total_tests = sum(row["count"] for row in subject_rows.values())
+        snapshot_updated_at = max((row["updated_at"] for row in subject_rows.values() if row["updated_at"]), default=None)
+        
+        # Classify each subject for class performance
         class_strengths = []
         class_weaknesses = []
         subject_analysis = []
         
-        for subject, attempts in subject_performance.items():
-            if len(attempts) < 3:  # Need sufficient data
+        for subject, row in subject_rows.items():
+            if row["count"] < 3:  # Need sufficient data
                 continue
-                
-            scores = [attempt['score'] for attempt in attempts]
-            unique_students = len(set(attempt['student_id'] for attempt in attempts))
             
-            avg_score = statistics.mean(scores)
-            median_score = statistics.median(scores)
-            total_questions = sum(attempt.get('total_questions', 0) for attempt in attempts)
-            total_correct = sum(attempt.get('correct_count', 0) for attempt in attempts)
+            avg_score = class_analytics_service.average(row)
+            unique_students = len(row["students"])
+            total_questions = row["total_questions"]
+            total_correct = row["total_correct"]
             
             subject_data = {
                 "subject": subject,
                 "subject_display": subject.replace('_', ' ').title(),
                 "average_score": round(avg_score, 1),
-                "median_score": round(median_score, 1),
-                "total_tests": len(attempts),
+                "median_score": round(class_analytics_service.median(row), 1),
+                "score_stdev": round(class_analytics_service.stdev(row), 1),
+                "total_tests": row["count"],
                 "students_tested": unique_students,
                 "total_questions": total_questions,
                 "total_correct": total_correct,
                 "accuracy_rate": round((total_correct / total_questions * 100), 1) if total_questions > 0 else 0,
-                "highest_score": max(scores),
-                "lowest_score": min(scores),
+                "highest_score": row["best_score"],
+                "lowest_score": row["worst_score"],
+                "struggling_topics": class_analytics_service.struggling_topics(row),
                 "grade": "A" if avg_score >= 90 else "B" if avg_score >= 80 else "C" if avg_score >= 70 else "D" if avg_score >= 60 else "F"
             }
             
@@ -401,12 +382,13 @@ async def get_class_strengths_weaknesses(
             "subject_analysis": subject_analysis,
             "recommendations": recommendations,
             "total_students": len(student_ids),
-            "total_tests": len(practice_attempts),
-            "analysis_date": datetime.utcnow().isoformat()
+            "total_tests": total_tests,
+            "analysis_date": datetime.utcnow().isoformat(),
+            "snapshot_updated_at": snapshot_updated_at.isoformat() if snapshot_updated_at else None
         }
         
     except Exception as e:
-        print(f"Error analyzing class strengths/weaknesses: {str(e)}")
+        logger.error("Error analyzing class strengths/weaknesses: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to analyze class performance: {str(e)}"
@@ -423,9 +405,7 @@ async def get_student_strengths_weaknesses(
         teacher_id = current_user['sub']
         
         # Verify student is in teacher's class
-        teacher_classes_cursor = db[Collections.CLASSROOMS].find({"teacher_id": teacher_id})
-        teacher_classes = await teacher_classes_cursor.to_list(100)
-        all_class_ids = [cls["class_id"] for cls in teacher_classes]
+        all_class_ids = await db[Collections.CLASSROOMS].distinct("class_id", {"teacher_id": teacher_id})
         
         student_profile = await db[Collections.STUDENT_PROFILES].find_one({
             "user_id": student_id,
@@ -557,7 +537,7 @@ async def get_student_strengths_weaknesses(
         return analysis
         
     except Exception as e:
-        print(f"Error analyzing student strengths/weaknesses: {str(e)}")
+        logger.error("Error analyzing student strengths/weaknesses: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to analyze student performance: {str(e)}"
@@ -582,39 +562,47 @@ async def get_teacher_analytics_overview(
             )
         
         # Get teacher's classes
-        teacher_classes_cursor = db[Collections.CLASSROOMS].find({"teacher_id": teacher_id, "active": True})
-        teacher_classes = await teacher_classes_cursor.to_list(100)
+        teacher_classes_cursor = db[Collections.CLASSROOMS].find(
+            {"teacher_id": teacher_id, "active": True},
+            {"_id": 0, "class_id": 1, "class_name": 1, "subject": 1}
+        )
+        teacher_classes = await teacher_classes_cursor.to_list(None)
         class_ids = [cls['class_id'] for cls in teacher_classes]
         
-        # Get all students in teacher's classes using joined_classes array
-        students_cursor = db[Collections.STUDENT_PROFILES].find({"joined_classes": {"$in": class_ids}})
-        students = await students_cursor.to_list(1000)
+        # Count enrolled students overall and per class on the server
+        pipeline = [
+            {"$match": {"joined_classes": {"$in": class_ids}}},
+            {"$project": {"_id": 0, "joined_classes": 1}},
+            {"$facet": {
+                "totals": [{"$count": "students"}],
+                "classes": [
+                    {"$unwind": "$joined_classes"},
+                    {"$match": {"joined_classes": {"$in": class_ids}}},
+                    {"$group": {"_id": "$joined_classes", "students": {"$sum": 1}}}
+                ]
+            }}
+        ]
+        facets = await db[Collections.STUDENT_PROFILES].aggregate(pipeline).to_list(1)
+        facets = facets[0] if facets else {"totals": [], "classes": []}
+        class_students = {row["_id"]: row["students"] for row in facets["classes"]}
+        
+        # Test counts and scores come from the precomputed snapshots: per class for the class rows,
+        # per teacher (each student counted once) for the totals and subject distribution
+        by_class = defaultdict(list)
+        for snapshot in await class_analytics_service.get_snapshots(class_ids):
+            by_class[snapshot["class_id"]].append(snapshot)
+        teacher_snapshots = await class_analytics_service.get_teacher_snapshots(teacher_id)
+        overall = class_analytics_service.combine(teacher_snapshots)
         
         total_classes = len(teacher_classes)
-        total_students = len(students)
-        
-        # Get all practice test results for these students
-        practice_results_cursor = db[Collections.PRACTICE_ATTEMPTS].find({
-            "student_id": {"$in": [student['user_id'] for student in students]}
-        })
-        practice_results = await practice_results_cursor.to_list(1000)
-        
-        total_tests = len(practice_results)
-        average_score = 0
-        if practice_results:
-            total_score = sum(result.get('score', 0) for result in practice_results)
-            average_score = total_score / total_tests
+        total_students = facets["totals"][0]["students"] if facets["totals"] else 0
+        total_tests = overall["count"]
+        average_score = class_analytics_service.average(overall)
         
         # Class summaries
         class_summary = []
         for class_data in teacher_classes:
-            class_students = [s for s in students if class_data['class_id'] in s.get('joined_classes', [])]
-            class_student_ids = [s['user_id'] for s in class_students]
-            
-            class_results = [r for r in practice_results if r['student_id'] in class_student_ids]
-            class_avg = 0
-            if class_results:
-                class_avg = sum(r.get('score', 0) for r in class_results) / len(class_results)
+            class_row = class_analytics_service.combine(by_class.get(class_data['class_id'], []))
             
             class_summary.append({
                 "class_info": {
@@ -622,28 +610,19 @@ async def get_teacher_analytics_overview(
                     "class_name": class_data['class_name'],
                     "subject": class_data['subject']
                 },
-                "student_count": len(class_students),
-                "total_tests": len(class_results),
-                "average_score": class_avg
+                "student_count": class_students.get(class_data['class_id'], 0),
+                "total_tests": class_row["count"],
+                "average_score": class_analytics_service.average(class_row),
+                "struggling_topics": class_analytics_service.struggling_topics(class_row)
             })
         
         # Subject distribution
-        subject_distribution = {}
-        for result in practice_results:
-            subject = result.get('subject', 'Unknown')
-            if subject not in subject_distribution:
-                subject_distribution[subject] = {"count": 0, "total_score": 0}
-            subject_distribution[subject]["count"] += 1
-            subject_distribution[subject]["total_score"] += result.get('score', 0)
-        
-        # Convert to list with averages
         subject_dist_list = []
-        for subject, data in subject_distribution.items():
-            avg_score = data["total_score"] / data["count"] if data["count"] > 0 else 0
+        for snapshot in teacher_snapshots:
             subject_dist_list.append({
-                "subject": subject,
-                "test_count": data["count"],
-                "average_score": avg_score
+                "subject": snapshot["subject"],
+                "test_count": snapshot.get("count", 0),
+                "average_score": class_analytics_service.average(snapshot)
             })
         
         return {
@@ -654,13 +633,14 @@ async def get_teacher_analytics_overview(
                 "average_score": average_score
             },
             "class_summary": class_summary,
-            "subject_distribution": subject_dist_list
+            "subject_distribution": subject_dist_list,
+            "snapshot_updated_at": overall["updated_at"].isoformat() if overall["updated_at"] else None
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in teacher analytics: {str(e)}")
+        logger.error("Error in teacher analytics: %s", e)
         # Return default data instead of error for better UX
         return {
             "overview_metrics": {
@@ -721,10 +701,7 @@ async def get_test_results(
                 return []
         else:
             # Get all students from all teacher's classes
-            teacher_classes_cursor = db[Collections.CLASSROOMS].find({"teacher_id": teacher_id})
-            teacher_classes = await teacher_classes_cursor.to_list(100)
-            
-            all_class_ids = [cls['class_id'] for cls in teacher_classes]
+            all_class_ids = await db[Collections.CLASSROOMS].distinct("class_id", {"teacher_id": teacher_id})
             
             if all_class_ids:
                 students_cursor = db[Collections.STUDENT_PROFILES].find({
@@ -775,7 +752,7 @@ async def get_test_results(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error getting test results: {str(e)}")
+        logger.error("Error getting test results: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get test results: {str(e)}"
@@ -802,13 +779,44 @@ async def get_class_performance(
                 detail="Class not found"
             )
         
-        # Get students in this class
-        students_cursor = db[Collections.STUDENT_PROFILES].find({
-            "joined_classes": {"$in": [class_id]}
-        })
-        students = await students_cursor.to_list(1000)
-        
-        if not students:
+        # Per-student summaries for this class, joined with names on the server
+        student_pipeline = [
+            {"$match": {"joined_classes": class_id}},
+            {"$project": {"_id": 0, "user_id": 1}},
+            # Plain equality and let/$expr joins: localField together with pipeline needs MongoDB 5.0
+            {"$lookup": {
+                "from": Collections.USERS,
+                "localField": "user_id",
+                "foreignField": "id",
+                "as": "user"
+            }},
+            {"$lookup": {
+                "from": Collections.PRACTICE_ATTEMPTS,
+                "let": {"student_id": "$user_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$student_id", "$$student_id"]}}},
+                    {"$group": {
+                        "_id": None,
+                        "total_tests": {"$sum": 1},
+                        "average_score": {"$avg": {"$ifNull": ["$score", 0]}},
+                        "best_score": {"$max": {"$ifNull": ["$score", 0]}},
+                        "recent_tests": {"$sum": {"$cond": [{"$ifNull": ["$completed_at", False]}, 1, 0]}}
+                    }}
+                ],
+                "as": "stats"
+            }},
+            {"$project": {
+                "student_id": "$user_id",
+                "student_name": {"$ifNull": [{"$arrayElemAt": ["$user.name", 0]}, "Unknown"]},
+                "total_tests": {"$ifNull": [{"$arrayElemAt": ["$stats.total_tests", 0]}, 0]},
+                "average_score": {"$ifNull": [{"$arrayElemAt": ["$stats.average_score", 0]}, 0]},
+                "best_score": {"$ifNull": [{"$arrayElemAt": ["$stats.best_score", 0]}, 0]},
+                "recent_tests": {"$ifNull": [{"$arrayElemAt": ["$stats.recent_tests", 0]}, 0]}
+            }}
+        ]
+        student_performance = await db[Collections.STUDENT_PROFILES].aggregate(student_pipeline).to_list(None)
+        
+        if not student_performance:
             return {
                 "class_info": {
                     "class_id": class_id,
@@ -828,78 +836,62 @@ async def get_class_performance(
                 "recent_activity": []
             }
         
-        student_ids = [student['user_id'] for student in students]
-        
-        # Get practice attempts for these students
-        practice_attempts_cursor = db[Collections.PRACTICE_ATTEMPTS].find({
-            "student_id": {"$in": student_ids}
-        }).sort("completed_at", -1)
-        practice_attempts = await practice_attempts_cursor.to_list(1000)
+        student_ids = [student['student_id'] for student in student_performance]
         
-        # Calculate performance metrics
-        total_tests = len(practice_attempts)
-        scores = [attempt.get("score", 0) for attempt in practice_attempts]
+        # Class-wide summary and subject breakdown come from the precomputed snapshots
+        snapshots = await class_analytics_service.get_snapshots([class_id])
+        summary = class_analytics_service.combine(snapshots)
+        total_tests = summary["count"]
         
         performance_summary = {
             "total_tests": total_tests,
-            "average_score": sum(scores) / len(scores) if scores else 0,
-            "highest_score": max(scores) if scores else 0,
-            "lowest_score": min(scores) if scores else 0,
-            "completion_rate": 100 if total_tests > 0 else 0  # Simplified completion rate
+            "average_score": class_analytics_service.average(summary),
+            "highest_score": summary["best_score"] or 0,
+            "lowest_score": summary["worst_score"] or 0,
+            "completion_rate": 100 if total_tests > 0 else 0,  # Simplified completion rate
+            "struggling_topics": class_analytics_service.struggling_topics(summary),
+            "snapshot_updated_at": summary["updated_at"].isoformat() if summary["updated_at"] else None
         }
         
-        # Student performance breakdown
-        student_performance = []
-        for student in students:
-            user = await db[Collections.USERS].find_one({"id": student['user_id']})
-            student_attempts = [a for a in practice_attempts if a['student_id'] == student['user_id']]
-            student_scores = [a.get("score", 0) for a in student_attempts]
-            
-            student_performance.append({
-                "student_id": student['user_id'],
-                "student_name": user.get("name", "Unknown") if user else "Unknown",
-                "total_tests": len(student_attempts),
-                "average_score": sum(student_scores) / len(student_scores) if student_scores else 0,
-                "best_score": max(student_scores) if student_scores else 0,
-                "recent_tests": len([a for a in student_attempts if a.get("completed_at")])
-            })
-        
-        # Subject breakdown
-        subject_breakdown = {}
-        for attempt in practice_attempts:
-            subject = attempt.get("subject", "Unknown")
-            if subject not in subject_breakdown:
-                subject_breakdown[subject] = {"tests": 0, "total_score": 0}
-            subject_breakdown[subject]["tests"] += 1
-            subject_breakdown[subject]["total_score"] += attempt.get("score", 0)
-        
-        subject_list = []
-        for subject, data in subject_breakdown.items():
-            avg_score = data["total_score"] / data["tests"] if data["tests"] > 0 else 0
-            subject_list.append({
-                "subject": subject,
-                "test_count": data["tests"],
-                "average_score": avg_score
-            })
-        
-        # Recent activity (last 10 tests)
-        recent_activity = []
-        for attempt in practice_attempts[:10]:
-            user = await db[Collections.USERS].find_one({"id": attempt["student_id"]})
-            recent_activity.append({
-                "student_name": user.get("name", "Unknown") if user else "Unknown",
-                "subject": attempt.get("subject", "Unknown"),
-                "score": attempt.get("score", 0),
-                "completed_at": attempt.get("completed_at"),
-                "difficulty": attempt.get("difficulty", "medium")
-            })
+        subject_list = [
+            {
+                "subject": snapshot["subject"],
+                "test_count": snapshot.get("count", 0),
+                "average_score": class_analytics_service.average(snapshot),
+                "score_stdev": class_analytics_service.stdev(snapshot),
+                "students_tested": len(snapshot.get("students", []))
+            }
+            for snapshot in snapshots
+        ]
+        
+        # Recent activity (last 10 tests) with student names joined on the server
+        recent_pipeline = [
+            {"$match": {"student_id": {"$in": student_ids}}},
+            {"$sort": {"completed_at": -1}},
+            {"$limit": 10},
+            {"$lookup": {
+                "from": Collections.USERS,
+                "localField": "student_id",
+                "foreignField": "id",
+                "as": "user"
+            }},
+            {"$project": {
+                "_id": 0,
+                "student_name": {"$ifNull": [{"$arrayElemAt": ["$user.name", 0]}, "Unknown"]},
+                "subject": {"$ifNull": ["$subject", "Unknown"]},
+                "score": {"$ifNull": ["$score", 0]},
+                "completed_at": 1,
+                "difficulty": {"$ifNull": ["$difficulty", "medium"]}
+            }}
+        ]
+        recent_activity = await db[Collections.PRACTICE_ATTEMPTS].aggregate(recent_pipeline).to_list(10)
         
         return {
             "class_info": {
                 "class_id": class_id,
                 "class_name": classroom.get("class_name", ""),
                 "subject": classroom.get("subject", ""),
-                "student_count": len(students)
+                "student_count": len(student_performance)
             },
             "performance_summary": performance_summary,
             "student_performance": student_performance,
@@ -910,12 +902,19 @@ async def get_class_performance(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error getting class performance: {str(e)}")
+        logger.error("Error getting class performance: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get class performance: {str(e)}"
         )
 
+async def _get_class_student_ids(db, class_ids: List[str]) -> List[str]:
+    """Get the user ids of every student enrolled in any of the given classes"""
+    return await db[Collections.STUDENT_PROFILES].distinct(
+        "user_id",
+        {"joined_classes": {"$in": class_ids}}
+    )
+
 def get_grade_from_score(score):
     """Convert numerical score to letter grade"""
     if score >= 90:
@@ -1,15 +1,22 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import json
 import uuid
 
 from backend.utils.database import get_database, Collections, convert_objectid_to_str
 from backend.utils.security import get_current_student
+from backend.utils.observability import span
 from backend.services.ai_service import AIService
+from backend.services.tutor_session_service import TutorSessionService
 from backend.models.user import Subject
 from backend.models.chat import ChatMessage, ChatSession
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/tutor", tags=["tutor"])
 
 # Request/Response models
@@ -82,9 +89,49 @@ async def create_chat_session(
         )
         
     except Exception as e:
-        print(f"Error creating chat session: {e}")
+        logger.error("Error creating chat session: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create chat session")
 
+async def _load_chat_session(db, session_id: str, user_id: str) -> Dict[str, Any]:
+    """Fetch the session, which carries the conversation state the AI context is built from"""
+    with span("db.read"):
+        # Verify session exists and belongs to user
+        session = await db[Collections.CHAT_SESSIONS].find_one({
+            "id": session_id,
+            "user_id": user_id
+        })
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return session
+
+async def _save_chat_exchange(db, session: Dict[str, Any], request: SendMessageRequest, user_id: str, ai_response: str, context: Dict[str, Any]) -> ChatMessage:
+    """Persist a question/answer pair and fold it into the session's conversation state"""
+    # Create chat message
+    chat_message = ChatMessage(
+        session_id=request.session_id,
+        user_id=user_id,
+        message=request.message,
+        response=ai_response,
+        subject=request.subject,
+        context=context
+    )
+    
+    # Save message to database
+    message_dict = chat_message.dict()
+    message_dict["timestamp"] = chat_message.timestamp
+    with span("db.write"):
+        await db[Collections.CHAT_MESSAGES].insert_one(message_dict)
+        
+        # Update session activity, message count and conversation state in one write
+        await TutorSessionService.record_exchange(session, request.message, ai_response, chat_message.timestamp)
+    
+    return chat_message
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 @router.post("/chat", response_model=ChatResponse)
 async def send_message(
     request: SendMessageRequest,
@@ -93,36 +140,8 @@ async def send_message(
     """Send a message and get AI response"""
     try:
         db = get_database()
-        
-        # Verify session exists and belongs to user
-        session = await db[Collections.CHAT_SESSIONS].find_one({
-            "id": request.session_id,
-            "user_id": current_user["sub"]
-        })
-        
-        if not session:
-            raise HTTPException(status_code=404, detail="Chat session not found")
-        
-        # Get previous messages for context (more recent messages for better context)
-        previous_messages = await db[Collections.CHAT_MESSAGES].find({
-            "session_id": request.session_id
-        }).sort("timestamp", -1).limit(10).to_list(length=10)
-        
-        # Build context from previous messages (reverse to get chronological order)
-        context = {
-            "learning_insights": [],
-            "conversation_history": []
-        }
-        
-        # Process messages in chronological order (oldest first)
-        for msg in reversed(previous_messages):
-            if msg.get("message") and msg.get("response"):
-                context["conversation_history"].append({
-                    "user": msg.get("message", ""),
-                    "assistant": msg.get("response", "")
-                })
-        
-        print(f"Context for AI: {len(context['conversation_history'])} previous exchanges")
+        session = await _load_chat_session(db, request.session_id, current_user["sub"])
+        context = TutorSessionService.build_context(session)
         
         # Generate AI response with context
         ai_response = await ai_service.generate_tutor_response(
@@ -131,29 +150,7 @@ async def send_message(
             context=context
         )
         
-        # Create chat message
-        chat_message = ChatMessage(
-            session_id=request.session_id,
-            user_id=current_user["sub"],
-            message=request.message,
-            response=ai_response,
-            subject=request.subject,
-            context=context
-        )
-        
-        # Save message to database
-        message_dict = chat_message.dict()
-        message_dict["timestamp"] = chat_message.timestamp
-        await db[Collections.CHAT_MESSAGES].insert_one(message_dict)
-        
-        # Update session last activity and message count
-        await db[Collections.CHAT_SESSIONS].update_one(
-            {"id": request.session_id},
-            {
-                "$set": {"last_activity": datetime.utcnow()},
-                "$inc": {"message_count": 1}
-            }
-        )
+        chat_message = await _save_chat_exchange(db, session, request, current_user["sub"], ai_response, context)
         
         return ChatResponse(
             message_id=chat_message.id,
@@ -165,9 +162,53 @@ async def send_message(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error sending message: {e}")
+        logger.error("Error sending message: %s", e)
         raise HTTPException(status_code=500, detail="Failed to send message")
 
+@router.post("/chat/stream")
+async def stream_message(
+    request: SendMessageRequest,
+    current_user = Depends(get_current_student)
+):
+    """Send a message and stream the AI response as Server-Sent Events
+    
+    Emits ``token`` events ({"text": ...}) as the model produces them, then a ``done``
+    event carrying the same fields as ChatResponse once the exchange has been saved,
+    or an ``error`` event if it could not be.
+    """
+    db = get_database()
+    session = await _load_chat_session(db, request.session_id, current_user["sub"])
+    context = TutorSessionService.build_context(session)
+    
+    async def events():
+        chunks = []
+        async for chunk in ai_service.stream_tutor_response(
+            message=request.message,
+            subject=request.subject,
+            context=context
+        ):
+            chunks.append(chunk)
+            yield _sse_event("token", {"text": chunk})
+        
+        try:
+            ai_response = "".join(chunks)
+            chat_message = await _save_chat_exchange(db, session, request, current_user["sub"], ai_response, context)
+            yield _sse_event("done", {
+                "message_id": chat_message.id,
+                "response": ai_response,
+                "session_id": request.session_id,
+                "timestamp": chat_message.timestamp
+            })
+        except Exception as e:
+            logger.error("Error saving streamed message: %s", e)
+            yield _sse_event("error", {"detail": "Failed to save message"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # keep proxies from buffering the stream
+    )
+
 @router.get("/sessions", response_model=List[SessionResponse])
 async def get_chat_sessions(
     current_user = Depends(get_current_student)
@@ -176,9 +217,10 @@ async def get_chat_sessions(
     try:
         db = get_database()
         
-        sessions = await db[Collections.CHAT_SESSIONS].find({
-            "user_id": current_user["sub"]
-        }).sort("last_activity", -1).to_list(length=100)
+        sessions = await db[Collections.CHAT_SESSIONS].find(
+            {"user_id": current_user["sub"]},
+            {"conversation_state": 0}  # the listing never needs the AI context
+        ).sort("last_activity", -1).to_list(length=100)
         
         result = []
         for session in sessions:
@@ -195,7 +237,7 @@ async def get_chat_sessions(
         return result
         
     except Exception as e:
-        print(f"Error getting chat sessions: {e}")
+        logger.error("Error getting chat sessions: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get chat sessions")
 
 @router.get("/session/{session_id}/messages", response_model=List[MessageResponse])
@@ -236,7 +278,7 @@ async def get_session_messages(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error getting session messages: {e}")
+        logger.error("Error getting session messages: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get session messages")
 
 @router.delete("/session/{session_id}")
@@ -272,7 +314,7 @@ async def delete_chat_session(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting chat session: {e}")
+        logger.error("Error deleting chat session: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete chat session")
 
 @router.patch("/session/{session_id}/title")
@@ -305,5 +347,5 @@ async def update_session_title(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating session title: {e}")
+        logger.error("Error updating session title: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update session title")
\ No newline at end of file
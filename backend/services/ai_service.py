@@ -1,45 +1,61 @@
-import google.generativeai as genai
+import logging
 import os
+import asyncio
+import copy
+import time
 from dotenv import load_dotenv
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime, timedelta
-from backend.utils.helpers import CacheUtils
+from backend.utils.helpers import CacheUtils, QuestionUtils
+from backend.utils.cache import SingleFlight
+from backend.utils.semantic_cache import tutor_answer_cache
+from backend.utils.observability import span, record_stage, record_fallback
+from backend.services.study_plan_optimizer import StudyPlanOptimizer
+from backend.services.question_bank import get_question_catalog, sample_without_replacement
+from backend.services.question_templates import question_templates
+from backend.services.model_router import model_router, ModelRouter, ModelError, ModelContentBlocked
+from backend.services.tutor_session_service import TutorSessionService, RECENT_EXCHANGES_LIMIT
 from backend.models.user import Subject, DifficultyLevel, QuestionType
 
 load_dotenv()
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
+
+AI_GRADING_BATCH_SIZE = int(os.getenv("AI_GRADING_BATCH_SIZE", "20"))  # answers graded per model call
+AI_GRADING_CONCURRENCY = int(os.getenv("AI_GRADING_CONCURRENCY", "4"))  # individual re-grades in flight per test
+
+# Identical cacheable generations in flight at once share one model call
+ai_single_flight = SingleFlight()
 
 class AIService:
     """Service for AI-powered educational content generation"""
     
-    def __init__(self):
-        # Try different models based on availability and quotas
-        self.models = [
-            'gemini-1.5-flash',  # Try the non-deprecated model first 
-            'gemini-2.5-flash',  # Fallback to newer model
-        ]
-        self.current_model = None
-        self._initialize_model()
+    def __init__(self, router: ModelRouter = model_router):
+        # Model choice, quotas and failover live in the shared router, never on the service
+        self.router = router
     
-    def _initialize_model(self):
-        """Initialize the best available model"""
-        for model_name in self.models:
-            try:
-                self.model = genai.GenerativeModel(model_name)
-                self.current_model = model_name
-                print(f"✅ Initialized AI model: {model_name}")
-                break
-            except Exception as e:
-                print(f"❌ Failed to initialize {model_name}: {e}")
-                continue
+    async def _generate_content(self, prompt: str, timeout: Optional[float] = None, accept=None) -> str:
+        """Run a model completion through the router and return its text"""
+        return await self.router.generate(prompt, timeout=timeout, accept=accept)
+    
+    async def generate_shared_practice_questions(
+        self,
+        subject: Subject,
+        topics: List[str],
+        difficulty: DifficultyLevel,
+        question_count: int = 5,
+        question_types: Optional[List[QuestionType]] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """generate_practice_questions, coalesced with an identical request already in flight
         
-        if not self.current_model:
-            print("⚠️ No AI model available, will use fallback questions only")
-            self.model = None
+        Returns a private copy of the questions and whether they were generated for another request.
+        """
+        key = ("questions", subject, tuple(topics), difficulty, question_count, tuple(question_types or ()))
+        questions, shared = await ai_single_flight.do(
+            key,
+            lambda: self.generate_practice_questions(subject, topics, difficulty, question_count, question_types)
+        )
+        return copy.deepcopy(questions), shared
     
     async def generate_practice_questions(
         self,
@@ -51,17 +67,11 @@ class AIService:
     ) -> List[Dict[str, Any]]:
         """Generate practice questions using AI"""
         
-        # Skip caching for practice questions to ensure variety
-        # Users should get different questions each time for better learning experience
-        cached_response = None
-        if cached_response:
-            try:
-                import json
-                return json.loads(cached_response)
-            except:
-                pass
+        # Practice questions are not response-cached; variety comes from the
+        # question pool, which excludes questions a student has already seen
         
         # Generate new questions
+        prompt_start = time.perf_counter()
         types_str = ", ".join(question_types) if question_types else "MCQ, Short Answer, Long Answer, Numerical"
         
         prompt = f"""
@@ -99,608 +109,107 @@ class AIService:
             }}
         ]
         """
+        record_stage("ai.prompt", time.perf_counter() - prompt_start)
         
         try:
-            # Check if AI model is available
-            if not self.model or not self.current_model:
-                print("⚠️ AI model not available, using fallback questions")
-                return self._generate_fallback_questions(subject, topics, question_count)
+            # Check if any AI model is available
+            if not self.router.available():
+                logger.debug("AI model not available, using fallback questions")
+                return self._generate_fallback_questions(subject, topics, question_count, difficulty)
             
-            # Try AI generation with retry logic
-            for attempt in range(2):  # Try twice with different models if needed
+            # Try AI generation with retry logic; the router already fails over between models
+            for attempt in range(2):  # A second attempt only helps when the answer did not parse
                 try:
-                    response = self.model.generate_content(prompt)
-                    content = response.text
-                    
-                    # Clean up the response to extract JSON
-                    if "```json" in content:
-                        content = content.split("```json")[1].split("```")[0]
-                    elif "```" in content:
-                        content = content.split("```")[1].split("```")[0]
+                    content = await self._generate_content(prompt)
                     
-                    # Parse and validate JSON
-                    import json
-                    questions = json.loads(content.strip())
+                    with span("ai.parse"):
+                        # Clean up the response to extract JSON
+                        if "```json" in content:
+                            content = content.split("```json")[1].split("```")[0]
+                        elif "```" in content:
+                            content = content.split("```")[1].split("```")[0]
+                        
+                        # Parse and validate JSON
+                        import json
+                        questions = json.loads(content.strip())
                     
-                    # Add IDs and metadata
-                    for i, question in enumerate(questions):
-                        question["id"] = f"q_{hash(str(question))}_{i}"
+                    # Add metadata and content-addressed IDs, dropping repeats within the batch
+                    unique_questions = {}
+                    for question in questions:
                         question["subject"] = subject
                         question["difficulty"] = difficulty
+                        question["source"] = "ai"
+                        question["id"] = QuestionUtils.content_id(question)
+                        unique_questions.setdefault(question["id"], question)
+                    questions = list(unique_questions.values())
                     
-                    # No caching for practice questions to ensure variety
-                    print(f"✅ Generated {len(questions)} AI questions for {subject} - {', '.join(topics)}")
+                    logger.debug("Generated %s AI questions for %s - %s", len(questions), subject, ', '.join(topics))
                     return questions
                 
+                except ModelContentBlocked:
+                    logger.warning("Content safety filter triggered for %s, using fallback", ', '.join(topics))
+                    break
+                
+                except ModelError as api_error:
+                    # Every model was out of quota, open-circuited or failed for this request
+                    logger.warning("%s", api_error)
+                    break
+                
                 except Exception as api_error:
-                    error_message = str(api_error).lower()
-                    
-                    # Handle specific API errors
-                    if "quota" in error_message or "429" in error_message:
-                        print(f"⚠️ API quota exceeded for {self.current_model}, trying next model or fallback")
-                        # Try next model if available
-                        if attempt == 0 and len(self.models) > 1:
-                            next_model = self.models[1] if self.current_model == self.models[0] else self.models[0]
-                            try:
-                                self.model = genai.GenerativeModel(next_model)
-                                self.current_model = next_model
-                                print(f"🔄 Switched to model: {next_model}")
-                                continue  # Retry with new model
-                            except:
-                                pass
-                        break  # Exit retry loop, use fallback
-                    
-                    elif "safety" in error_message or "block" in error_message:
-                        print(f"⚠️ Content safety filter triggered for {', '.join(topics)}, adjusting prompt")
-                        # Could implement prompt adjustment here
-                        break
-                    
-                    elif "network" in error_message or "connection" in error_message:
-                        print(f"⚠️ Network error, attempt {attempt + 1}/2")
-                        if attempt == 0:
-                            import time
-                            time.sleep(1)  # Brief delay before retry
-                            continue
-                    
-                    print(f"❌ AI generation error (attempt {attempt + 1}): {api_error}")
+                    logger.error("AI generation error (attempt %s): %s", attempt + 1, api_error)
                     if attempt == 1:  # Last attempt
                         break
             
-            print(f"🔄 AI generation failed, using NCERT-specific fallback questions for {', '.join(topics)}")
-            return self._generate_fallback_questions(subject, topics, question_count)
+            logger.debug("AI generation failed, using NCERT-specific fallback questions for %s", ', '.join(topics))
+            return self._generate_fallback_questions(subject, topics, question_count, difficulty)
         
         except Exception as e:
-            print(f"AI generation failed: {e}")
+            logger.error("AI generation failed: %s", e)
             # Always return fallback questions if AI fails
-            return self._generate_fallback_questions(subject, topics, question_count)
+            return self._generate_fallback_questions(subject, topics, question_count, difficulty)
     
-    def _generate_fallback_questions(self, subject: str, topics: List[str], question_count: int) -> List[Dict[str, Any]]:
-        """Generate high-quality NCERT unit-specific fallback questions when AI service fails"""
-        import uuid
-        import random
-        
-        # NCERT unit-specific question banks with real curriculum content
-        ncert_question_banks = {
-            "math": {
-                # Class 10 NCERT Units
-                "Real Numbers": [
-                    {
-                        "question": "Which of the following is an irrational number?",
-                        "options": ["0.25", "√2", "3/4", "22/7"],
-                        "correct": "√2",
-                        "explanation": "√2 cannot be expressed as a ratio of two integers, making it irrational."
-                    },
-                    {
-                        "question": "What is the decimal expansion of a rational number?",
-                        "options": ["Always terminating", "Always non-terminating", "Either terminating or non-terminating repeating", "Always infinite"],
-                        "correct": "Either terminating or non-terminating repeating",
-                        "explanation": "Rational numbers have decimal expansions that either terminate or repeat."
-                    },
-                    {
-                        "question": "Every rational number is a real number. This statement is:",
-                        "options": ["True", "False", "Sometimes true", "Cannot be determined"],
-                        "correct": "True",
-                        "explanation": "All rational numbers are part of the real number system."
-                    },
-                    {
-                        "question": "The number π (pi) is:",
-                        "options": ["Rational", "Irrational", "Integer", "Natural"],
-                        "correct": "Irrational",
-                        "explanation": "π is an irrational number as its decimal expansion is non-terminating and non-repeating."
-                    },
-                    {
-                        "question": "Between any two rational numbers, there are:",
-                        "options": ["No rational numbers", "Exactly one rational number", "Infinitely many rational numbers", "Only integers"],
-                        "correct": "Infinitely many rational numbers",
-                        "explanation": "The rational numbers are dense in the real numbers."
-                    },
-                    {
-                        "question": "The decimal representation of 7/8 is:",
-                        "options": ["0.875", "0.777...", "0.625", "0.888..."],
-                        "correct": "0.875",
-                        "explanation": "7 ÷ 8 = 0.875, which is a terminating decimal."
-                    },
-                    {
-                        "question": "Which of the following is a rational number?",
-                        "options": ["√3", "√5", "√16", "√7"],
-                        "correct": "√16",
-                        "explanation": "√16 = 4, which is a rational number (can be written as 4/1)."
-                    },
-                    {
-                        "question": "The sum of a rational and an irrational number is:",
-                        "options": ["Always rational", "Always irrational", "Sometimes rational", "Always an integer"],
-                        "correct": "Always irrational",
-                        "explanation": "The sum of a rational and irrational number is always irrational."
-                    }
-                ],
-                "Quadratic Equations": [
-                    {
-                        "question": "What is the discriminant of x² - 4x + 3 = 0?",
-                        "options": ["4", "16", "12", "-4"],
-                        "correct": "4",
-                        "explanation": "Discriminant = b² - 4ac = (-4)² - 4(1)(3) = 16 - 12 = 4"
-                    },
-                    {
-                        "question": "If the discriminant of a quadratic equation is zero, the roots are:",
-                        "options": ["Real and distinct", "Real and equal", "Complex", "Imaginary"],
-                        "correct": "Real and equal",
-                        "explanation": "When discriminant = 0, the quadratic has two equal real roots."
-                    },
-                    {
-                        "question": "The roots of x² - 5x + 6 = 0 are:",
-                        "options": ["2, 3", "1, 6", "-2, -3", "5, 6"],
-                        "correct": "2, 3",
-                        "explanation": "Factoring: (x-2)(x-3) = 0, so x = 2 or x = 3"
-                    },
-                    {
-                        "question": "For the quadratic equation ax² + bx + c = 0, if a > 0 and discriminant > 0:",
-                        "options": ["No real roots", "One real root", "Two real and distinct roots", "Two equal roots"],
-                        "correct": "Two real and distinct roots",
-                        "explanation": "Positive discriminant means two real and distinct roots."
-                    },
-                    {
-                        "question": "The quadratic formula is used to find:",
-                        "options": ["The vertex of parabola", "The roots of quadratic equation", "The y-intercept", "The axis of symmetry"],
-                        "correct": "The roots of quadratic equation",
-                        "explanation": "x = (-b ± √(b²-4ac))/2a gives the roots of ax² + bx + c = 0"
-                    },
-                    {
-                        "question": "If one root of x² - 7x + k = 0 is 3, then k equals:",
-                        "options": ["12", "10", "9", "4"],
-                        "correct": "12",
-                        "explanation": "Substituting x = 3: 9 - 21 + k = 0, so k = 12"
-                    },
-                    {
-                        "question": "The sum of roots of 2x² - 7x + 3 = 0 is:",
-                        "options": ["7/2", "-7/2", "3/2", "-3/2"],
-                        "correct": "7/2",
-                        "explanation": "Sum of roots = -b/a = -(-7)/2 = 7/2"
-                    },
-                    {
-                        "question": "A quadratic equation has roots 2 and -3. The equation is:",
-                        "options": ["x² + x - 6 = 0", "x² - x - 6 = 0", "x² + x + 6 = 0", "x² - x + 6 = 0"],
-                        "correct": "x² + x - 6 = 0",
-                        "explanation": "(x-2)(x+3) = x² + x - 6 = 0"
-                    }
-                ],
-                "Polynomials": [
-                    {
-                        "question": "What is the degree of the polynomial 3x³ + 2x² - x + 5?",
-                        "options": ["1", "2", "3", "5"],
-                        "correct": "3",
-                        "explanation": "The degree is the highest power of the variable, which is 3."
-                    }
-                ],
-                "Triangles": [
-                    {
-                        "question": "In triangle ABC, if AB = AC, what type of triangle is it?",
-                        "options": ["Scalene", "Isosceles", "Equilateral", "Right-angled"],
-                        "correct": "Isosceles",
-                        "explanation": "A triangle with two equal sides is called an isosceles triangle."
-                    }
-                ],
-                "Coordinate Geometry": [
-                    {
-                        "question": "What is the distance between points (0,0) and (3,4)?",
-                        "options": ["5", "7", "6", "4"],
-                        "correct": "5",
-                        "explanation": "Using distance formula: √[(3-0)² + (4-0)²] = √[9+16] = √25 = 5"
-                    }
-                ],
-                "Introduction to Trigonometry": [
-                    {
-                        "question": "What is the value of sin 30°?",
-                        "options": ["1/2", "√3/2", "1", "0"],
-                        "correct": "1/2",
-                        "explanation": "sin 30° = 1/2 is a fundamental trigonometric value."
-                    }
-                ]
-            },
-            "physics": {
-                # Class 9 NCERT Units
-                "Motion": [
-                    {
-                        "question": "What is the SI unit of velocity?",
-                        "options": ["m/s²", "m/s", "km/h", "m"],
-                        "correct": "m/s",
-                        "explanation": "Velocity is measured in meters per second (m/s) in SI units."
-                    }
-                ],
-                "Force and Laws of Motion": [
-                    {
-                        "question": "Newton's second law states that F = ?",
-                        "options": ["mv", "ma", "mv²", "m/a"],
-                        "correct": "ma",
-                        "explanation": "Newton's second law: Force equals mass times acceleration (F = ma)."
-                    }
-                ],
-                "Work and Energy": [
-                    {
-                        "question": "What is the unit of work?",
-                        "options": ["Joule", "Watt", "Newton", "Pascal"],
-                        "correct": "Joule",
-                        "explanation": "Work is measured in Joules (J) in SI units."
-                    }
-                ],
-                # Class 11 NCERT Units
-                "Laws of Motion": [
-                    {
-                        "question": "According to Newton's first law, an object at rest will:",
-                        "options": ["Always remain at rest", "Start moving automatically", "Remain at rest unless acted upon by external force", "Move with constant velocity"],
-                        "correct": "Remain at rest unless acted upon by external force",
-                        "explanation": "Newton's first law (law of inertia) states objects maintain their state unless external force acts."
-                    }
-                ],
-                "Gravitation": [
-                    {
-                        "question": "What is the value of acceleration due to gravity on Earth?",
-                        "options": ["9.8 m/s²", "10 m/s²", "8.9 m/s²", "9.0 m/s²"],
-                        "correct": "9.8 m/s²",
-                        "explanation": "The standard value of g (acceleration due to gravity) is 9.8 m/s²."
-                    }
-                ]
-            },
-            "chemistry": {
-                # Class 9 NCERT Units
-                "Matter in Our Surroundings": [
-                    {
-                        "question": "At what temperature does water boil at standard pressure?",
-                        "options": ["50°C", "100°C", "150°C", "200°C"],
-                        "correct": "100°C",
-                        "explanation": "Water boils at 100°C (373 K) at standard atmospheric pressure."
-                    }
-                ],
-                "Atoms and Molecules": [
-                    {
-                        "question": "What is Avogadro's number?",
-                        "options": ["6.022 × 10²³", "6.022 × 10²²", "6.022 × 10²⁴", "6.022 × 10²¹"],
-                        "correct": "6.022 × 10²³",
-                        "explanation": "Avogadro's number is 6.022 × 10²³ particles per mole."
-                    }
-                ],
-                # Class 10 NCERT Units
-                "Acids, Bases and Salts": [
-                    {
-                        "question": "What is the pH of pure water?",
-                        "options": ["6", "7", "8", "14"],
-                        "correct": "7",
-                        "explanation": "Pure water has a pH of 7, which is neutral."
-                    },
-                    {
-                        "question": "A solution with pH less than 7 is:",
-                        "options": ["Basic", "Acidic", "Neutral", "Alkaline"],
-                        "correct": "Acidic",
-                        "explanation": "Solutions with pH < 7 are acidic in nature."
-                    },
-                    {
-                        "question": "Which indicator turns red in acidic solution?",
-                        "options": ["Blue litmus", "Red litmus", "Phenolphthalein", "Methyl orange"],
-                        "correct": "Blue litmus",
-                        "explanation": "Blue litmus paper turns red in acidic solutions."
-                    },
-                    {
-                        "question": "The process of neutralization produces:",
-                        "options": ["Acid only", "Base only", "Salt and water", "Gas only"],
-                        "correct": "Salt and water",
-                        "explanation": "Acid + Base → Salt + Water is the neutralization reaction."
-                    },
-                    {
-                        "question": "Hydrochloric acid is secreted by:",
-                        "options": ["Liver", "Stomach", "Pancreas", "Kidney"],
-                        "correct": "Stomach",
-                        "explanation": "HCl is produced by gastric glands in the stomach for digestion."
-                    },
-                    {
-                        "question": "What happens when acid reacts with metal carbonate?",
-                        "options": ["Hydrogen gas is evolved", "Oxygen gas is evolved", "Carbon dioxide gas is evolved", "No reaction occurs"],
-                        "correct": "Carbon dioxide gas is evolved",
-                        "explanation": "Acid + Metal carbonate → Salt + Water + CO₂"
-                    },
-                    {
-                        "question": "Baking soda is chemically known as:",
-                        "options": ["Sodium carbonate", "Sodium bicarbonate", "Sodium chloride", "Sodium hydroxide"],
-                        "correct": "Sodium bicarbonate",
-                        "explanation": "Baking soda is sodium bicarbonate (NaHCO₃)."
-                    },
-                    {
-                        "question": "Which acid is present in vinegar?",
-                        "options": ["Citric acid", "Tartaric acid", "Acetic acid", "Lactic acid"],
-                        "correct": "Acetic acid",
-                        "explanation": "Vinegar contains acetic acid (CH₃COOH)."
-                    }
-                ],
-                "Metals and Non-metals": [
-                    {
-                        "question": "Which of the following is the most reactive metal?",
-                        "options": ["Iron", "Copper", "Sodium", "Gold"],
-                        "correct": "Sodium",
-                        "explanation": "Sodium is highly reactive and belongs to group 1 of the periodic table."
-                    }
-                ]
-            },
-            "biology": {
-                # Class 9 NCERT Units
-                "The Fundamental Unit of Life": [
-                    {
-                        "question": "What is the basic unit of life?",
-                        "options": ["Tissue", "Cell", "Organ", "Atom"],
-                        "correct": "Cell",
-                        "explanation": "The cell is the basic structural and functional unit of all living organisms."
-                    }
-                ],
-                "Tissues": [
-                    {
-                        "question": "Which tissue is responsible for movement in animals?",
-                        "options": ["Epithelial", "Connective", "Muscular", "Nervous"],
-                        "correct": "Muscular",
-                        "explanation": "Muscular tissue contracts and relaxes to produce movement."
-                    }
-                ],
-                # Class 10 NCERT Units
-                "Life Processes": [
-                    {
-                        "question": "What is the process by which plants make their food?",
-                        "options": ["Respiration", "Photosynthesis", "Transpiration", "Digestion"],
-                        "correct": "Photosynthesis",
-                        "explanation": "Photosynthesis is the process where plants convert sunlight, CO₂ and water into glucose."
-                    }
-                ],
-                # Class 7 NCERT Units
-                "Nutrition in Plants": [
-                    {
-                        "question": "Which part of the plant cell contains chlorophyll?",
-                        "options": ["Nucleus", "Mitochondria", "Chloroplast", "Vacuole"],
-                        "correct": "Chloroplast",
-                        "explanation": "Chloroplasts contain chlorophyll, the green pigment essential for photosynthesis."
-                    },
-                    {
-                        "question": "What is the process by which plants make their own food?",
-                        "options": ["Respiration", "Photosynthesis", "Transpiration", "Digestion"],
-                        "correct": "Photosynthesis",
-                        "explanation": "Photosynthesis is the process where plants convert sunlight, CO₂ and water into glucose."
-                    },
-                    {
-                        "question": "Which gas do plants absorb from the atmosphere during photosynthesis?",
-                        "options": ["Oxygen", "Nitrogen", "Carbon dioxide", "Hydrogen"],
-                        "correct": "Carbon dioxide",
-                        "explanation": "Plants absorb CO₂ from atmosphere and convert it into glucose during photosynthesis."
-                    },
-                    {
-                        "question": "The tiny pores on leaves through which gas exchange occurs are called:",
-                        "options": ["Stomata", "Chloroplasts", "Cells", "Tissues"],
-                        "correct": "Stomata",
-                        "explanation": "Stomata are tiny pores on leaves that allow gas exchange during photosynthesis."
-                    },
-                    {
-                        "question": "Plants that make their own food are called:",
-                        "options": ["Heterotrophs", "Autotrophs", "Parasites", "Saprophytes"],
-                        "correct": "Autotrophs",
-                        "explanation": "Autotrophs are organisms that can produce their own food through photosynthesis."
-                    },
-                    {
-                        "question": "What do plants release as a by-product of photosynthesis?",
-                        "options": ["Carbon dioxide", "Nitrogen", "Oxygen", "Water vapor"],
-                        "correct": "Oxygen",
-                        "explanation": "Oxygen is released as a by-product when plants convert CO₂ and water into glucose."
-                    },
-                    {
-                        "question": "Which mineral is essential for the formation of chlorophyll?",
-                        "options": ["Iron", "Magnesium", "Calcium", "Sodium"],
-                        "correct": "Magnesium",
-                        "explanation": "Magnesium is the central atom in the chlorophyll molecule."
-                    },
-                    {
-                        "question": "The equation for photosynthesis is:",
-                        "options": ["6CO₂ + 6H₂O + light → C₆H₁₂O₆ + 6O₂", "C₆H₁₂O₆ + 6O₂ → 6CO₂ + 6H₂O", "CO₂ + H₂O → CH₄ + O₂", "None of these"],
-                        "correct": "6CO₂ + 6H₂O + light → C₆H₁₂O₆ + 6O₂",
-                        "explanation": "This is the balanced equation for photosynthesis showing reactants and products."
-                    }
-                ]
-            },
-            "english": {
-                # General literature questions for NCERT chapters
-                "The Fun They Had": [
-                    {
-                        "question": "Who wrote 'The Fun They Had'?",
-                        "options": ["Isaac Asimov", "R.K. Narayan", "Ruskin Bond", "Mark Twain"],
-                        "correct": "Isaac Asimov",
-                        "explanation": "'The Fun They Had' is a science fiction story by Isaac Asimov."
-                    }
-                ]
-            }
-        }
-        
-        # Find matching questions for the specific topics/units
-        matched_questions = []
+    def _generate_fallback_questions(self, subject: str, topics: List[str], question_count: int, difficulty: DifficultyLevel = DifficultyLevel.MEDIUM) -> List[Dict[str, Any]]:
+        """Serve offline questions when AI generation fails: fresh template questions, then the question bank catalog"""
+        record_fallback("questions")
         
+        # Topics with parametric templates get freshly generated questions; the rest use the static banks
+        template_units: Dict[str, str] = {}
+        static_topics = []
         for topic in topics:
-            if subject in ncert_question_banks and topic in ncert_question_banks[subject]:
-                unit_questions = ncert_question_banks[subject][topic]
-                matched_questions.extend(unit_questions)
+            unit = question_templates.resolve_unit(subject, topic)
+            if unit is None:
+                static_topics.append(topic)
+            else:
+                template_units.setdefault(unit, topic)
         
-        # If no specific unit matches found, use generic fallback for subject
-        if not matched_questions:
-            # Use original fallback logic for unrecognized units
-            generic_questions = self._get_generic_subject_questions(subject)
-            matched_questions.extend(generic_questions)
+        # Unit banks matching the remaining topics, or the subject's generic bank when nothing matches at all
+        matched_questions = get_question_catalog().questions_for(subject, static_topics, generic=not template_units)
+        static_count = question_count * len(static_topics) // len(topics) if template_units else question_count
         
-        # Randomly select questions up to question_count
-        selected_questions = random.sample(matched_questions, min(question_count, len(matched_questions)))
+        # Randomly select static questions for their share, then fill the rest from templates
+        default_topic = (static_topics or topics or [subject])[0]  # Use the first topic
+        selected = [(q, default_topic, "fallback", "medium") for q in sample_without_replacement(matched_questions, static_count)]
+        for unit, q in question_templates.generate(subject, list(template_units), question_count - len(selected), difficulty):
+            selected.append((q, template_units[unit], "template", difficulty))
         
         # Format questions properly
         formatted_questions = []
-        for i, q in enumerate(selected_questions):
-            question_id = str(uuid.uuid4())[:8]
+        for q, topic, source, question_difficulty in selected:
             formatted_question = {
-                "id": question_id,
-                "question_text": q["question"],
+                "question_text": q.question,
                 "question_type": "mcq",
-                "options": q["options"],
-                "correct_answer": q["correct"],
-                "explanation": q["explanation"],
-                "topic": topics[0] if topics else subject,  # Use the first topic
+                "options": list(q.options),
+                "correct_answer": q.correct,
+                "explanation": q.explanation,
+                "topic": topic,
                 "subject": subject,
-                "difficulty": "medium"
+                "difficulty": question_difficulty,
+                "source": source
             }
+            formatted_question["id"] = QuestionUtils.content_id(formatted_question)
             formatted_questions.append(formatted_question)
         
         return formatted_questions
-    def _get_generic_subject_questions(self, subject: str) -> List[Dict[str, str]]:
-        """Generate generic subject questions as fallback"""
-        question_banks = {
-            "math": {
-                "algebra": [
-                    {
-                        "question": "Solve for x: 2x + 5 = 17",
-                        "options": ["x = 6", "x = 12", "x = 11", "x = 7"],
-                        "correct": "x = 6",
-                        "explanation": "Subtract 5 from both sides: 2x = 12, then divide by 2: x = 6"
-                    },
-                    {
-                        "question": "What is the slope of the line y = 3x - 4?",
-                        "options": ["3", "-4", "4", "1/3"],
-                        "correct": "3",
-                        "explanation": "In y = mx + b form, m is the slope. Here m = 3."
-                    },
-                    {
-                        "question": "Factor: x² - 9",
-                        "options": ["(x + 3)(x - 3)", "(x + 9)(x - 1)", "(x - 3)²", "Cannot be factored"],
-                        "correct": "(x + 3)(x - 3)",
-                        "explanation": "This is a difference of squares: a² - b² = (a + b)(a - b)"
-                    }
-                ],
-                "geometry": [
-                    {
-                        "question": "What is the area of a circle with radius 4?",
-                        "options": ["16π", "8π", "4π", "32π"],
-                        "correct": "16π",
-                        "explanation": "Area = πr². With r = 4, Area = π(4)² = 16π"
-                    },
-                    {
-                        "question": "In a right triangle, if one angle is 30°, what is the third angle?",
-                        "options": ["60°", "90°", "45°", "120°"],
-                        "correct": "60°",
-                        "explanation": "Sum of angles in triangle = 180°. 90° + 30° + ? = 180°, so ? = 60°"
-                    }
-                ]
-            },
-            "physics": {
-                "mechanics": [
-                    {
-                        "question": "What is Newton's first law of motion?",
-                        "options": ["F = ma", "Objects in motion stay in motion unless acted upon by a force", "For every action there's an equal and opposite reaction", "E = mc²"],
-                        "correct": "Objects in motion stay in motion unless acted upon by a force",
-                        "explanation": "Newton's first law states that objects at rest stay at rest and objects in motion stay in motion unless acted upon by an unbalanced force."
-                    },
-                    {
-                        "question": "If a car accelerates at 2 m/s² for 5 seconds, what is its change in velocity?",
-                        "options": ["10 m/s", "2.5 m/s", "7 m/s", "0.4 m/s"],
-                        "correct": "10 m/s",
-                        "explanation": "Change in velocity = acceleration × time = 2 m/s² × 5 s = 10 m/s"
-                    }
-                ],
-                "thermodynamics": [
-                    {
-                        "question": "What happens to the kinetic energy of gas molecules when temperature increases?",
-                        "options": ["Increases", "Decreases", "Stays the same", "Becomes zero"],
-                        "correct": "Increases",
-                        "explanation": "Temperature is a measure of average kinetic energy of molecules. Higher temperature means higher kinetic energy."
-                    }
-                ]
-            },
-            "chemistry": {
-                "organic": [
-                    {
-                        "question": "What is the molecular formula for methane?",
-                        "options": ["CH₄", "C₂H₆", "CH₃OH", "CO₂"],
-                        "correct": "CH₄",
-                        "explanation": "Methane is the simplest hydrocarbon with one carbon atom bonded to four hydrogen atoms."
-                    }
-                ],
-                "inorganic": [
-                    {
-                        "question": "What is the chemical symbol for gold?",
-                        "options": ["Go", "Gd", "Au", "Ag"],
-                        "correct": "Au",
-                        "explanation": "Gold's symbol Au comes from its Latin name 'aurum'."
-                    }
-                ]
-            },
-            "biology": {
-                "cell": [
-                    {
-                        "question": "What is the powerhouse of the cell?",
-                        "options": ["Nucleus", "Mitochondria", "Ribosome", "Endoplasmic reticulum"],
-                        "correct": "Mitochondria",
-                        "explanation": "Mitochondria produce ATP (energy) for cellular processes, earning the nickname 'powerhouse of the cell'."
-                    }
-                ],
-                "genetics": [
-                    {
-                        "question": "What does DNA stand for?",
-                        "options": ["Deoxyribonucleic acid", "Deoxyribose nucleic acid", "Dinitrogen nucleic acid", "Dynamic nucleic acid"],
-                        "correct": "Deoxyribonucleic acid",
-                        "explanation": "DNA stands for Deoxyribonucleic acid, the molecule that carries genetic information."
-                    }
-                ]
-            },
-            "english": {
-                "grammar": [
-                    {
-                        "question": "Which sentence is grammatically correct?",
-                        "options": ["She don't like pizza", "She doesn't like pizza", "She didn't liked pizza", "She don't likes pizza"],
-                        "correct": "She doesn't like pizza",
-                        "explanation": "With singular third person subjects like 'she', use 'doesn't' not 'don't'."
-                    }
-                ],
-                "literature": [
-                    {
-                        "question": "Who wrote 'Romeo and Juliet'?",
-                        "options": ["Charles Dickens", "William Shakespeare", "Jane Austen", "Mark Twain"],
-                        "correct": "William Shakespeare",
-                        "explanation": "Romeo and Juliet is one of Shakespeare's most famous tragedies, written in the early part of his career."
-                    }
-                ]
-            }
-        }
-        
-        import uuid
-        import random
-        
-        fallback_questions = []
-        subject_lower = subject.lower()
-        
-        # Get subject-specific questions
-        subject_bank = question_banks.get(subject_lower, {})
-        
-        # Use all questions from subject
-        relevant_questions = []
-        if subject_bank:
-            for questions in subject_bank.values():
-                relevant_questions.extend(questions)
-        
-        # Return the relevant questions
-        return relevant_questions if relevant_questions else []
     
     async def generate_tutor_response(
         self,
@@ -711,21 +220,111 @@ class AIService:
     ) -> str:
         """Generate an educational tutor response with step-by-step guidance"""
         
-        # Only cache non-contextual responses
-        if use_cache and not context:
-            cache_key = CacheUtils.get_cache_key(f"tutor_{message[:50]}", subject)
-            cached_response = CacheUtils.get_cached_response(cache_key)
+        # Only cache answers to questions asked without conversation history
+        cache_key = tutor_answer_cache.key(message, subject) if use_cache and not self._has_conversation(context) else None
+        if cache_key:
+            with span("cache.read"):
+                cached_response = await tutor_answer_cache.get(message, subject)
             if cached_response:
                 return cached_response
+            
+            # Students asking the same question at once share one generation
+            response, _ = await ai_single_flight.do(
+                ("tutor", cache_key),
+                lambda: self._generate_tutor_answer(message, subject, context, cache=True)
+            )
+            return response
+        
+        return await self._generate_tutor_answer(message, subject, context, cache=False)
+    
+    async def _generate_tutor_answer(self, message: str, subject: Subject, context: Optional[Dict], cache: bool) -> str:
+        """Ask the routed models, then use the canned reply"""
+        with span("ai.prompt"):
+            prompt = self._build_tutor_prompt(message, subject, context)
+        
+        try:
+            # An answer too short to be useful is rejected so the router tries the next model
+            content = (await self._generate_content(prompt, accept=lambda text: len(text.strip()) > 20)).strip()
+        except Exception as e:
+            logger.error("AI tutor response failed: %s", e)
+            
+            # Generate a subject-specific educational response as last resort
+            fallback_response = self._tutor_fallback_response(subject)
+            logger.debug("Using educational fallback response for %s", subject.value)
+            record_fallback("tutor_response")
+            return fallback_response
+        
+        # Only cache responses without conversation history
+        if cache:
+            await tutor_answer_cache.set(message, subject, content)
+        logger.debug("Generated AI tutor response")
+        return content
+
+    async def stream_tutor_response(
+        self,
+        message: str,
+        subject: Subject,
+        context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """Stream a tutor response chunk by chunk as the model produces it
+        
+        The router fails over between models until the first chunk is sent. Once text has
+        been sent a failure ends the stream; if no model produced anything the
+        subject-specific canned response is sent instead.
+        """
+        cache_key = tutor_answer_cache.key(message, subject) if not self._has_conversation(context) else None
+        cacheable = cache_key is not None
+        if cacheable:
+            with span("cache.read"):
+                cached_response = await tutor_answer_cache.get(message, subject)
+            if not cached_response:
+                # Someone may already be generating this answer; wait for it rather than asking again
+                cached_response = await ai_single_flight.join(("tutor", cache_key))
+            if cached_response:
+                yield cached_response
+                return
+        
+        with span("ai.prompt"):
+            prompt = self._build_tutor_prompt(message, subject, context)
         
+        chunks = []
+        try:
+            async for chunk in self.router.stream(prompt):
+                chunks.append(chunk)
+                yield chunk
+            if chunks:
+                content = "".join(chunks).strip()
+                if cacheable and len(content) > 20:
+                    await tutor_answer_cache.set(message, subject, content)
+                return
+            logger.warning("AI model streamed no content for tutor response")
+        except Exception as e:
+            logger.error("AI model failed while streaming tutor response: %s", e)
+            if chunks:
+                return
+        
+        logger.debug("Using educational fallback response for %s", subject.value)
+        record_fallback("tutor_response")
+        yield self._tutor_fallback_response(subject)
+    
+    @staticmethod
+    def _has_conversation(context: Optional[Dict]) -> bool:
+        """Whether the tutor context carries earlier exchanges that shape the answer"""
+        return bool(context and (context.get('conversation_history') or context.get('summary_points')))
+    
+    def _build_tutor_prompt(self, message: str, subject: Subject, context: Optional[Dict]) -> str:
+        """Tutor prompt with the learning pattern, recent exchanges and teaching approach"""
         # Analyze student's learning pattern from conversation history
         learning_analysis = self._analyze_learning_pattern(context)
         
         # Build conversation context with learning insights
         conversation_context = ""
+        if context and context.get('summary_points'):
+            conversation_context += "\n\nEarlier in this session the student asked about:\n"
+            conversation_context += "".join(f"- {point}\n" for point in context['summary_points'])
         if context and context.get('conversation_history'):
-            conversation_context = "\n\nPrevious conversation context:\n"
-            for i, exchange in enumerate(context['conversation_history'][-3:]):
+            conversation_context += "\n\nPrevious conversation context:\n"
+            for i, exchange in enumerate(context['conversation_history'][-RECENT_EXCHANGES_LIMIT:]):
                 conversation_context += f"Student: {exchange.get('user', '')}\n"
                 conversation_context += f"Teacher: {exchange.get('assistant', '')}\n\n"
         
@@ -768,87 +367,50 @@ FORBIDDEN:
 - Don't move too fast without checking understanding
 
 Remember: You're a teacher who wants students to LEARN and UNDERSTAND, not just get the right answer."""
+        return prompt
+    
+    def _tutor_fallback_response(self, subject: Subject) -> str:
+        """Subject-specific canned reply used when no model can answer"""
+        educational_responses = {
+            Subject.MATH: "I'd be happy to help you with mathematics! Let's start with what specific topic you're working on - algebra, geometry, calculus, or something else? I can explain concepts step-by-step and work through examples with you.",
+            Subject.PHYSICS: "Physics is fascinating! What area would you like to explore - mechanics, electricity, thermodynamics, or optics? I can help break down complex concepts into understandable pieces.",
+            Subject.CHEMISTRY: "Chemistry connects so many everyday phenomena! Are you looking at atomic structure, chemical reactions, organic chemistry, or something else? Let's dive into the molecular world together.",
+            Subject.BIOLOGY: "Biology is the study of life itself! What interests you - cellular biology, genetics, ecology, or human anatomy? I can help you understand living systems.",
+            Subject.ENGLISH: "English opens up worlds of communication and literature! Are you working on grammar, writing, literature analysis, or reading comprehension? Let's improve your language skills.",
+            Subject.HISTORY: "History helps us understand our world today! What period or topic are you studying? I can help you analyze events, causes, and their lasting impacts.",
+            Subject.GEOGRAPHY: "Geography shows us how our world works! Are you studying physical geography, human geography, or specific regions? Let's explore our planet together."
+        }
         
-        # Try with primary model first
-        try:
-            response = self.model.generate_content(prompt)
-            content = response.text.strip()
-            
-            if content and len(content) > 20:  # Ensure we have substantial content
-                # Only cache responses without context
-                if use_cache and not context:
-                    CacheUtils.cache_response(cache_key, content)
-                print(f"✅ Generated AI tutor response with primary model")
-                return content
-            else:
-                print(f"⚠️ Primary model returned insufficient content, trying fallback")
-                raise Exception("Insufficient content from primary model")
-                
-        except Exception as e:
-            print(f"❌ Primary model failed for tutor response: {e}")
-            
-            # Try with fallback model (gemini-1.5-flash)
-            try:
-                import google.generativeai as genai
-                fallback_model = genai.GenerativeModel('gemini-1.5-flash')
-                
-                response = fallback_model.generate_content(prompt)
-                content = response.text.strip()
-                
-                if content and len(content) > 20:
-                    print(f"✅ Generated AI tutor response with fallback model")
-                    return content
-                else:
-                    print(f"⚠️ Fallback model also returned insufficient content")
-                    raise Exception("Insufficient content from fallback model")
-                    
-            except Exception as fallback_error:
-                print(f"❌ Fallback model also failed: {fallback_error}")
-                
-                # Generate a subject-specific educational response as last resort
-                educational_responses = {
-                    Subject.MATH: "I'd be happy to help you with mathematics! Let's start with what specific topic you're working on - algebra, geometry, calculus, or something else? I can explain concepts step-by-step and work through examples with you.",
-                    Subject.PHYSICS: "Physics is fascinating! What area would you like to explore - mechanics, electricity, thermodynamics, or optics? I can help break down complex concepts into understandable pieces.",
-                    Subject.CHEMISTRY: "Chemistry connects so many everyday phenomena! Are you looking at atomic structure, chemical reactions, organic chemistry, or something else? Let's dive into the molecular world together.",
-                    Subject.BIOLOGY: "Biology is the study of life itself! What interests you - cellular biology, genetics, ecology, or human anatomy? I can help you understand living systems.",
-                    Subject.ENGLISH: "English opens up worlds of communication and literature! Are you working on grammar, writing, literature analysis, or reading comprehension? Let's improve your language skills.",
-                    Subject.HISTORY: "History helps us understand our world today! What period or topic are you studying? I can help you analyze events, causes, and their lasting impacts.",
-                    Subject.GEOGRAPHY: "Geography shows us how our world works! Are you studying physical geography, human geography, or specific regions? Let's explore our planet together."
-                }
-                
-                fallback_response = educational_responses.get(
-                    subject, 
-                    f"I'm here to help you learn {subject.value}! What specific topic or question do you have? I'll do my best to explain it clearly and help you understand."
-                )
-                
-                print(f"✅ Using educational fallback response for {subject.value}")
-                return fallback_response
+        return educational_responses.get(
+            subject, 
+            f"I'm here to help you learn {subject.value}! What specific topic or question do you have? I'll do my best to explain it clearly and help you understand."
+        )
 
     def _analyze_learning_pattern(self, context: Optional[Dict]) -> str:
-        """Analyze student's learning pattern from conversation history"""
+        """Analyze student's learning pattern from the session's counters and recent exchanges"""
         if not context or not context.get('conversation_history'):
             return "New student - no learning pattern data available yet."
         
         history = context['conversation_history']
-        if len(history) < 2:
+        # Sessions keep running counters; a bare history is counted on the spot
+        stats = context.get('learning_stats') or TutorSessionService.state_from_messages(
+            [{"message": exchange.get('user', ''), "response": exchange.get('assistant', '')} for exchange in history]
+        )
+        exchanges = stats.get('exchanges', 0)
+        if exchanges < 2:
             return "Early in conversation - observing learning style."
         
         # Analyze patterns
         patterns = []
         
         # Check if student asks for direct answers vs shows work
-        direct_answer_requests = sum(1 for exchange in history 
-                                   if any(phrase in exchange.get('user', '').lower() 
-                                         for phrase in ['what is', 'give me', 'tell me', 'answer is']))
-        
-        if direct_answer_requests > len(history) * 0.6:
+        if stats.get('direct_answer_requests', 0) > exchanges * 0.6:
             patterns.append("tends to seek direct answers rather than understanding process")
         else:
             patterns.append("shows interest in understanding the process")
         
         # Check question complexity
-        question_lengths = [len(exchange.get('user', '')) for exchange in history]
-        avg_length = sum(question_lengths) / len(question_lengths)
+        avg_length = stats.get('question_chars', 0) / exchanges
         
         if avg_length > 100:
             patterns.append("asks detailed, thoughtful questions")
@@ -856,9 +418,8 @@ Remember: You're a teacher who wants students to LEARN and UNDERSTAND, not just
             patterns.append("asks brief questions - may need encouragement to elaborate")
         
         # Check if they build on previous responses
-        if len(history) > 2:
-            last_exchanges = history[-2:]
-            if any(ref in last_exchanges[-1].get('user', '').lower() 
+        if exchanges > 2:
+            if any(ref in history[-1].get('user', '').lower() 
                    for ref in ['but', 'however', 'also', 'what about', 'then']):
                 patterns.append("builds on previous discussions - good critical thinking")
         
@@ -943,45 +504,6 @@ Remember: You're a teacher who wants students to LEARN and UNDERSTAND, not just
         
         return approaches.get(question_type, approaches["general"])
     
-    async def generate_study_notes(
-        self,
-        subject: Subject,
-        topic: str,
-        grade_level: str
-    ) -> str:
-        """Generate comprehensive study notes"""
-        
-        cache_key = CacheUtils.get_cache_key(f"notes_{topic}_{grade_level}", subject)
-        cached_response = CacheUtils.get_cached_response(cache_key)
-        if cached_response:
-            return cached_response
-        
-        prompt = f"""
-        Create comprehensive study notes for {grade_level} grade students on the topic "{topic}" in {subject}.
-        
-        Structure the notes with:
-        1. Introduction/Overview
-        2. Key Concepts (with clear explanations)
-        3. Important Formulas/Facts (if applicable)
-        4. Examples
-        5. Summary/Key Points to Remember
-        
-        Make the content appropriate for {grade_level} grade level, clear, and easy to understand.
-        Use markdown formatting for better readability.
-        """
-        
-        try:
-            response = self.model.generate_content(prompt)
-            content = response.text
-            
-            # Cache the response
-            CacheUtils.cache_response(cache_key, content)
-            
-            return content
-        
-        except Exception as e:
-            return f"# Study Notes: {topic}\n\nI apologize, but I'm unable to generate notes at the moment. Please try again later."
-    
     async def generate_study_planner_response(
         self,
         message: str,
@@ -1318,26 +840,15 @@ What's your study goal for today?"""
         preferred_start_time: Optional[str] = None,
         break_preferences: Optional[Dict] = None
     ) -> Dict[str, Any]:
-        """Generate an optimized Pomodoro study plan"""
+        """Generate an optimized Pomodoro study plan with the local plan optimizer (no model call)"""
         from datetime import datetime
         
-        # Standard Pomodoro timings
-        WORK_SESSION_DURATION = 25  # minutes
-        SHORT_BREAK_DURATION = 5    # minutes
-        LONG_BREAK_DURATION = 15    # minutes
-        LONG_BREAK_INTERVAL = 4     # sessions
-        
-        sessions = []
-        study_tips = []
-        
-        # Calculate total work time and available time
-        total_work_time = sum(subj.duration_minutes for subj in subjects)
-        
         # Convert Pydantic objects to dictionaries for processing
         subjects_dict = [subj.dict() for subj in subjects]
         
-        # Optimize subject ordering using AI
-        optimized_subjects = await self._optimize_subject_order(subjects_dict)
+        # Order sessions and place breaks by the optimizer's cost model
+        optimizer = StudyPlanOptimizer.from_preferences(break_preferences)
+        plan_items = optimizer.optimize(subjects_dict)
         
         # Create Pomodoro sessions - use current time if no preferred time specified
         if preferred_start_time:
@@ -1347,61 +858,42 @@ What's your study goal for today?"""
             now = datetime.now()
             current_time = now.strftime("%H:%M")
         
+        sessions = []
         session_count = 0
         
-        for subject_info in optimized_subjects:
-            subject = subject_info["subject"]
-            duration = subject_info["duration_minutes"]
-            
-            # Break subject time into 25-minute Pomodoro sessions
-            remaining_time = duration
-            
-            while remaining_time > 0:
-                # Create work session
-                work_duration = min(WORK_SESSION_DURATION, remaining_time)
+        for item in plan_items:
+            end_time = self._add_minutes_to_time(current_time, item.minutes)
+            if item.session_type == "work":
                 session_count += 1
-                
-                work_session = {
+                sessions.append({
                     "id": f"work_{session_count}",
                     "session_type": "work",
-                    "subject": subject,
-                    "duration_minutes": work_duration,
+                    "subject": item.subject,
+                    "duration_minutes": item.minutes,
                     "start_time": current_time,
-                    "end_time": self._add_minutes_to_time(current_time, work_duration),
-                    "description": f"Focus on {subject} - Pomodoro #{session_count}",
+                    "end_time": end_time,
+                    "description": f"Focus on {item.subject} - Pomodoro #{session_count}",
                     "break_activity": None
-                }
-                sessions.append(work_session)
-                
-                current_time = work_session["end_time"]
-                remaining_time -= work_duration
-                
-                # Add break if not the last session
-                if remaining_time > 0 or session_count < sum(subj["duration_minutes"] // WORK_SESSION_DURATION + (1 if subj["duration_minutes"] % WORK_SESSION_DURATION > 0 else 0) for subj in optimized_subjects):
-                    # Determine break type
-                    if session_count % LONG_BREAK_INTERVAL == 0:
-                        break_duration = LONG_BREAK_DURATION
-                        break_activity = self._get_long_break_activity()
-                    else:
-                        break_duration = SHORT_BREAK_DURATION
-                        break_activity = self._get_short_break_activity()
-                    
-                    break_session = {
-                        "id": f"break_{session_count}",
-                        "session_type": "break",
-                        "subject": None,
-                        "duration_minutes": break_duration,
-                        "start_time": current_time,
-                        "end_time": self._add_minutes_to_time(current_time, break_duration),
-                        "description": f"Break time - {break_activity}",
-                        "break_activity": break_activity
-                    }
-                    sessions.append(break_session)
-                    
-                    current_time = break_session["end_time"]
+                })
+            else:
+                if item.session_type == "long_break":
+                    break_activity = self._get_long_break_activity()
+                else:
+                    break_activity = self._get_short_break_activity()
+                sessions.append({
+                    "id": f"break_{session_count}",
+                    "session_type": "break",
+                    "subject": None,
+                    "duration_minutes": item.minutes,
+                    "start_time": current_time,
+                    "end_time": end_time,
+                    "description": f"Break time - {break_activity}",
+                    "break_activity": break_activity
+                })
+            current_time = end_time
         
         # Generate study tips
-        study_tips = self._generate_study_tips(optimized_subjects)
+        study_tips = self._generate_study_tips(subjects_dict)
         
         return {
             "sessions": sessions,
@@ -1410,52 +902,19 @@ What's your study goal for today?"""
             "estimated_completion": current_time
         }
 
-    async def _optimize_subject_order(self, subjects: List[Dict]) -> List[Dict]:
-        """Optimize the order of subjects for maximum learning efficiency"""
-        
-        # Use AI to determine optimal subject ordering
+    async def generate_study_plan_commentary(self, subjects: List[Dict], sessions: List[Dict]) -> str:
+        """Short AI explanation of why a study plan is ordered the way it is"""
+        work_order = [session["subject"] for session in sessions if session.get("session_type") == "work"]
         prompt = f"""
-        As an educational expert, optimize the order of these subjects for maximum learning efficiency:
+        As an educational expert, explain to a student in 3-4 short sentences why this study plan
+        works well and how to get the most out of it.
         
-        Subjects: {', '.join([f"{subj['subject']} ({subj['duration_minutes']} minutes)" for subj in subjects])}
+        Subjects requested: {', '.join(f"{subj['subject']} ({subj['duration_minutes']} minutes, {subj.get('priority', 'medium')} priority)" for subj in subjects)}
+        Session order: {' -> '.join(work_order)}
         
-        Consider these factors:
-        1. Cognitive load and mental fatigue
-        2. Subject difficulty and complexity
-        3. Memory retention and spaced learning
-        4. Alternating between different types of thinking (analytical vs creative)
-        
-        Return the subjects in optimal order with a brief explanation for each ordering choice.
-        Focus on maximizing learning outcomes and minimizing mental fatigue.
+        Mention cognitive load, alternating kinds of thinking and the breaks. Plain text, no lists.
         """
-        
-        try:
-            response = self.model.generate_content(prompt)
-            content = response.text
-            
-            # For now, use a simple heuristic while AI provides guidance
-            # Alternate between different types of subjects
-            analytical_subjects = ["math", "mathematics", "physics", "chemistry"]
-            creative_subjects = ["english", "history", "geography", "biology"]
-            
-            analytical = [s for s in subjects if s["subject"].lower() in analytical_subjects]
-            creative = [s for s in subjects if s["subject"].lower() in creative_subjects]
-            
-            # Alternate between analytical and creative
-            optimized = []
-            max_len = max(len(analytical), len(creative))
-            
-            for i in range(max_len):
-                if i < len(analytical):
-                    optimized.append(analytical[i])
-                if i < len(creative):
-                    optimized.append(creative[i])
-            
-            return optimized
-            
-        except Exception as e:
-            print(f"Error optimizing subject order: {e}")
-            return subjects
+        return (await self._generate_content(prompt)).strip()
 
     def _add_minutes_to_time(self, time_str: str, minutes: int) -> str:
         """Add minutes to a time string (HH:MM format)"""
@@ -1504,6 +963,21 @@ What's your study goal for today?"""
     ) -> str:
         """Generate comprehensive study notes for a given subject and topic"""
         
+        cache_key = CacheUtils.get_cache_key(f"notes_{topic}_{grade_level}", subject)
+        with span("cache.read"):
+            cached_response = await CacheUtils.get_cached_response(cache_key)
+        if cached_response:
+            return cached_response
+        
+        # A class generating notes on the same topic at once shares one generation
+        notes, _ = await ai_single_flight.do(
+            ("notes", cache_key),
+            lambda: self._generate_study_notes(subject, topic, grade_level, cache_key)
+        )
+        return notes
+    
+    async def _generate_study_notes(self, subject: str, topic: str, grade_level: str, cache_key: str) -> str:
+        """Call the model for study notes and cache real output"""
         prompt = f"""
         Generate comprehensive study notes for the following:
         
@@ -1540,8 +1014,7 @@ What's your study goal for today?"""
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            content = response.text
+            content = await self._generate_content(prompt)
             
             # Clean up the content
             content = content.strip()
@@ -1557,7 +1030,11 @@ What's your study goal for today?"""
             content = content.strip()
             
             # Ensure we have substantive content
-            if len(content) < 100:
+            if len(content) >= 100:
+                # Only cache real model output, never the placeholder guide
+                await CacheUtils.cache_response(cache_key, content)
+            else:
+                record_fallback("study_notes")
                 content = f"""# {topic}
 
 ## Overview
@@ -1588,7 +1065,8 @@ This is a comprehensive study guide for **{topic}** in {subject} for {grade_leve
             return content
             
         except Exception as e:
-            print(f"Error generating study notes: {e}")
+            logger.error("Error generating study notes: %s", e)
+            record_fallback("study_notes")
             # Return a fallback response
             return f"""# {topic}
 
@@ -1673,38 +1151,151 @@ This is a comprehensive study guide for **{topic}** in {subject} for {grade_leve
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            content = response.text.strip()
+            content = (await self._generate_content(prompt)).strip()
             
             # Try to extract JSON from the response
             import json
             import re
             
             # Look for JSON in the response
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                evaluation = json.loads(json_str)
-                
-                return {
-                    "is_correct": evaluation.get("is_correct", False),
-                    "explanation": evaluation.get("feedback", "Answer evaluated by AI"),
-                    "feedback": evaluation.get("feedback", "Good effort!"),
-                    "partial_credit": evaluation.get("score_percentage", 0) / 100.0,
-                    "score_percentage": evaluation.get("score_percentage", 0),
-                    "key_concepts_identified": evaluation.get("key_concepts_identified", []),
-                    "areas_for_improvement": evaluation.get("areas_for_improvement", [])
-                }
+            with span("ai.parse"):
+                json_match = re.search(r'\{.*\}', content, re.DOTALL)
+                evaluation = json.loads(json_match.group()) if json_match else None
+            if evaluation is not None:
+                return self._format_ai_evaluation(evaluation)
             else:
                 # Fallback if JSON parsing fails
                 return self._fallback_answer_evaluation(student_answer, correct_answer)
                 
         except Exception as e:
-            print(f"Error in AI answer evaluation: {e}")
+            logger.error("Error in AI answer evaluation: %s", e)
             return self._fallback_answer_evaluation(student_answer, correct_answer)
     
+    def _format_ai_evaluation(self, evaluation: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a raw model evaluation into the result shape used by the practice routes"""
+        return {
+            "is_correct": evaluation.get("is_correct", False),
+            "explanation": evaluation.get("feedback", "Answer evaluated by AI"),
+            "feedback": evaluation.get("feedback", "Good effort!"),
+            "partial_credit": evaluation.get("score_percentage", 0) / 100.0,
+            "score_percentage": evaluation.get("score_percentage", 0),
+            "key_concepts_identified": evaluation.get("key_concepts_identified", []),
+            "areas_for_improvement": evaluation.get("areas_for_improvement", [])
+        }
+    
+    async def evaluate_answers_batch(self, answers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Evaluate all answers of one test, returning results in the same order as the input
+        
+        Each item carries the keyword arguments of evaluate_answer_intelligently. MCQs are
+        matched locally, the remaining answers are graded together in one model call per
+        batch, and any answer the batch could not grade is re-evaluated individually with
+        bounded concurrency (which itself falls back to _fallback_answer_evaluation).
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(answers)
+        pending = []
+        
+        for index, item in enumerate(answers):
+            if item.get("question_type", "mcq") == "mcq":
+                results[index] = await self.evaluate_answer_intelligently(**item)
+            else:
+                pending.append(index)
+        
+        # Grade open-ended answers in as few model calls as possible
+        if pending and self.router.available():
+            batches = [pending[i:i + AI_GRADING_BATCH_SIZE] for i in range(0, len(pending), AI_GRADING_BATCH_SIZE)]
+            graded = await asyncio.gather(
+                *(self._grade_answer_batch([answers[i] for i in batch]) for batch in batches),
+                return_exceptions=True
+            )
+            for batch, batch_results in zip(batches, graded):
+                if isinstance(batch_results, Exception):
+                    logger.error("Error in AI batch answer evaluation: %s", batch_results)
+                    continue
+                for index, evaluation in zip(batch, batch_results):
+                    if evaluation is not None:
+                        results[index] = evaluation
+        
+        # Fan out whatever the batch call did not grade
+        remaining = [i for i in pending if results[i] is None]
+        if remaining:
+            semaphore = asyncio.Semaphore(AI_GRADING_CONCURRENCY)
+            
+            async def evaluate_one(index: int) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.evaluate_answer_intelligently(**answers[index])
+            
+            individual = await asyncio.gather(*(evaluate_one(i) for i in remaining), return_exceptions=True)
+            for index, evaluation in zip(remaining, individual):
+                if isinstance(evaluation, Exception):
+                    logger.error("Error in AI answer evaluation: %s", evaluation)
+                    item = answers[index]
+                    evaluation = self._fallback_answer_evaluation(item.get("student_answer", ""), item.get("correct_answer", ""))
+                results[index] = evaluation
+        
+        return results
+    
+    async def _grade_answer_batch(self, answers: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Grade several open-ended answers with a single model call
+        
+        Returns one entry per answer; entries the model did not return are None.
+        """
+        import json
+        import re
+        
+        answers_block = ""
+        for index, item in enumerate(answers):
+            answers_block += f"""
+        Answer #{index}
+        Question: {item.get("question_text", "")}
+        Subject: {item.get("subject", "")}
+        Topic: {item.get("topic", "")}
+        Correct/Expected Answer: {item.get("correct_answer", "")}
+        Student's Answer: {item.get("student_answer", "")}
+        """
+        
+        prompt = f"""
+        You are an expert teacher evaluating a student's answers to a practice test. Please analyze each response and determine if it demonstrates understanding of the concept.
+        {answers_block}
+        Evaluation Criteria:
+        - Focus on conceptual understanding rather than exact wording
+        - Consider key concepts, main ideas, and critical details
+        - Be fair but thorough in your assessment
+        - For mathematical answers, check if the approach and final answer are correct
+        - For written answers, evaluate if core concepts are demonstrated
+        - Evaluate every answer independently
+        
+        Respond with a JSON array containing one object per answer, in this exact format:
+        [
+            {{
+                "index": 0,
+                "is_correct": true/false,
+                "score_percentage": 0-100,
+                "feedback": "Detailed feedback for the student",
+                "key_concepts_identified": ["concept1", "concept2"],
+                "areas_for_improvement": ["area1", "area2"]
+            }}
+        ]
+        """
+        
+        content = (await self._generate_content(prompt)).strip()
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(answers)
+        with span("ai.parse"):
+            json_match = re.search(r'\[.*\]', content, re.DOTALL)
+            evaluations = json.loads(json_match.group()) if json_match else []
+        
+        for evaluation in evaluations:
+            if not isinstance(evaluation, dict):
+                continue
+            index = evaluation.get("index")
+            if isinstance(index, int) and 0 <= index < len(answers) and "is_correct" in evaluation:
+                results[index] = self._format_ai_evaluation(evaluation)
+        
+        return results
+    
     def _fallback_answer_evaluation(self, student_answer: str, correct_answer: str) -> Dict[str, Any]:
         """Fallback evaluation when AI fails"""
+        record_fallback("answer_evaluation")
         student_lower = student_answer.lower().strip()
         correct_lower = correct_answer.lower().strip()
         
@@ -1818,8 +1409,7 @@ This is a comprehensive study guide for **{topic}** in {subject} for {grade_leve
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            content = response.text.strip()
+            content = (await self._generate_content(prompt)).strip()
             
             # Try to extract JSON from the response
             import json
@@ -1848,7 +1438,7 @@ This is a comprehensive study guide for **{topic}** in {subject} for {grade_leve
                 return self._get_default_schedule_recommendation(now, days_to_add, priority, reason, estimated_improvement, score)
                 
         except Exception as e:
-            print(f"Error in AI schedule recommendation: {e}")
+            logger.error("Error in AI schedule recommendation: %s", e)
             return self._get_default_schedule_recommendation(now, days_to_add, priority, reason, estimated_improvement, score)
 
     def _get_default_schedule_recommendation(self, now, days_to_add, priority, reason, estimated_improvement, score):
@@ -1,11 +1,46 @@
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-import statistics
-from collections import defaultdict
+import numpy as np
+import pandas as pd
 
 class StudentAnalyticsService:
     """Service for analyzing student performance and generating insights"""
     
+    @staticmethod
+    def build_attempts_frame(practice_attempts: List[Dict]) -> pd.DataFrame:
+        """Build one columnar frame of the fields analytics needs from raw attempts"""
+        raw = pd.DataFrame(
+            practice_attempts,
+            columns=["subject", "score", "time_taken", "completed_at", "created_at"]
+        )
+        
+        # Missing fields come through as NaN while explicit nulls stay None
+        score_is_null = np.equal(raw["score"].to_numpy(dtype=object), None)
+        score = pd.to_numeric(raw["score"], errors="coerce")
+        time_taken = pd.to_numeric(raw["time_taken"], errors="coerce")
+        completed_at = StudentAnalyticsService._parse_dates(raw["completed_at"])
+        
+        return pd.DataFrame({
+            "subject": raw["subject"].where(raw["subject"].notna() & (raw["subject"] != ""), "general"),
+            # Missing scores count as 0 in subject analysis but are skipped in trends
+            "score": score.where(score.notna() | score_is_null, 0.0),
+            "trend_score": score,
+            "time_taken": time_taken.where(raw["time_taken"].notna(), 0.0),
+            "date": completed_at.fillna(StudentAnalyticsService._parse_dates(raw["created_at"])),
+            "completed_at": completed_at
+        })
+    
+    @staticmethod
+    def _parse_dates(values: pd.Series) -> pd.Series:
+        """Parse datetimes and ISO strings in one pass into naive UTC timestamps"""
+        if values.dtype == object:
+            values = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+        elif not pd.api.types.is_datetime64_any_dtype(values):
+            values = pd.to_datetime(values, errors="coerce", utc=True)  # All-missing column
+        if values.dt.tz is not None:
+            values = values.dt.tz_convert(None)
+        return values
+    
     @staticmethod
     def analyze_strengths_weaknesses(practice_attempts: List[Dict]) -> Dict[str, Any]:
         """
@@ -31,30 +66,16 @@ class StudentAnalyticsService:
                 "recommendations": []
             }
         
-        # Group attempts by subject
-        subject_performance = defaultdict(list)
-        for attempt in practice_attempts:
-            subject = attempt.get('subject', 'general')
-            score = attempt.get('score', 0)
-            date = attempt.get('completed_at') or attempt.get('created_at')
-            
-            subject_performance[subject].append({
-                'score': score,
-                'date': date,
-                'attempt_id': attempt.get('id'),
-                'questions_count': attempt.get('questions_count', 0),
-                'time_taken': attempt.get('time_taken', 0)
-            })
+        frame = StudentAnalyticsService.build_attempts_frame(practice_attempts)
+        subject_summaries = StudentAnalyticsService._summarize_subjects(frame)
         
-        # Analyze each subject
+        # Classify each subject
         strengths = []
         weaknesses = []
         improving_areas = []
         declining_areas = []
         
-        for subject, attempts in subject_performance.items():
-            analysis = StudentAnalyticsService._analyze_subject_performance(subject, attempts)
-            
+        for analysis in subject_summaries:
             # Classify as strength or weakness
             if analysis['classification'] == 'strength':
                 strengths.append(analysis)
@@ -68,13 +89,15 @@ class StudentAnalyticsService:
                 declining_areas.append(analysis)
         
         # Calculate overall performance
-        all_scores = [attempt.get('score', 0) for attempt in practice_attempts]
+        all_scores = frame["score"].dropna()
+        # Distinct stored subjects: null and empty subjects are counted apart from "general"
+        subjects_tested = len({attempt.get("subject", "general") for attempt in practice_attempts})
         overall_performance = {
-            "average_score": round(statistics.mean(all_scores), 1) if all_scores else 0,
+            "average_score": round(float(all_scores.mean()), 1) if len(all_scores) else 0,
             "total_tests": len(practice_attempts),
-            "subjects_tested": len(subject_performance),
-            "highest_score": max(all_scores) if all_scores else 0,
-            "lowest_score": min(all_scores) if all_scores else 0
+            "subjects_tested": subjects_tested,
+            "highest_score": float(all_scores.max()) if len(all_scores) else 0,
+            "lowest_score": float(all_scores.min()) if len(all_scores) else 0
         }
         
         # Generate recommendations
@@ -93,86 +116,64 @@ class StudentAnalyticsService:
         }
     
     @staticmethod
-    def _analyze_subject_performance(subject: str, attempts: List[Dict]) -> Dict[str, Any]:
-        """Analyze performance for a specific subject"""
-        if not attempts:
-            return {}
-        
-        # Sort attempts by date with safe access
-        attempts.sort(key=lambda x: x.get('date') or datetime.min)
-        
-        # Extract scores safely
-        scores = []
-        for attempt in attempts:
-            score = attempt.get('score', 0)
-            if isinstance(score, (int, float)):
-                scores.append(score)
-        
-        if not scores:
-            return {}
-        
-        avg_score = statistics.mean(scores)
-        attempt_count = len(scores)
-        
-        # Determine classification
-        classification = 'neutral'
-        if attempt_count >= 3:  # Need sufficient data
-            if avg_score >= 80:
-                classification = 'strength'
-            elif avg_score <= 60:
-                classification = 'weakness'
+    def _summarize_subjects(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Analyze performance for every subject at once, in first-seen subject order"""
+        subject_order = pd.unique(frame["subject"])
+        total_time = frame.groupby("subject", sort=False)["time_taken"].sum()
         
-        # Analyze trend (last 5 attempts vs first 5)
-        trend = 'stable'
-        if attempt_count >= 6:
-            recent_scores = scores[-3:]  # Last 3 attempts
-            earlier_scores = scores[:3]  # First 3 attempts
-            
-            recent_avg = statistics.mean(recent_scores)
-            earlier_avg = statistics.mean(earlier_scores)
-            
-            improvement = recent_avg - earlier_avg
-            
-            if improvement >= 10:
-                trend = 'improving'
-            elif improvement <= -10:
-                trend = 'declining'
+        # Chronological order within each subject; undated attempts sort first
+        scored = frame[frame["score"].notna()].copy()
+        scored["date"] = scored["date"].fillna(pd.Timestamp.min)
+        scored = scored.sort_values("date", kind="stable")
+        groups = scored.groupby("subject", sort=False)["score"]
         
-        # Calculate consistency with error handling
-        consistency = 'stable'
-        if len(scores) >= 3:
-            try:
-                std_dev = statistics.stdev(scores)
-                if std_dev <= 5:
-                    consistency = 'very_consistent'
-                elif std_dev <= 15:
-                    consistency = 'consistent'
-                else:
-                    consistency = 'inconsistent'
-            except statistics.StatisticsError:
-                consistency = 'stable'
+        stats = groups.agg(["mean", "count", "max", "min", "std"])
+        earlier_avg = scored.groupby("subject", sort=False).head(3).groupby("subject", sort=False)["score"].mean()
+        recent = scored.groupby("subject", sort=False).tail(3).groupby("subject", sort=False)["score"]
+        recent_avg = recent.mean()
+        recent_scores = recent.agg(list)
         
-        # Calculate time-related statistics safely
-        total_time = 0
-        for attempt in attempts:
-            time_taken = attempt.get('time_taken', 0)
-            if isinstance(time_taken, (int, float)):
-                total_time += time_taken
+        # Classification, trend and consistency as column operations
+        stats["classification"] = np.select(
+            [(stats["count"] >= 3) & (stats["mean"] >= 80), (stats["count"] >= 3) & (stats["mean"] <= 60)],
+            ["strength", "weakness"],
+            "neutral"
+        )
+        # Trend compares the last 3 attempts with the first 3
+        improvement = (recent_avg - earlier_avg).reindex(stats.index)
+        stats["trend"] = np.select(
+            [(stats["count"] >= 6) & (improvement >= 10), (stats["count"] >= 6) & (improvement <= -10)],
+            ["improving", "declining"],
+            "stable"
+        )
+        stats["consistency"] = np.select(
+            [stats["count"] < 3, stats["std"] <= 5, stats["std"] <= 15],
+            ["stable", "very_consistent", "consistent"],
+            "inconsistent"
+        )
         
-        return {
-            "subject": subject,
-            "subject_display": subject.replace('_', ' ').title(),
-            "average_score": round(avg_score, 1),
-            "attempt_count": attempt_count,
-            "classification": classification,
-            "trend": trend,
-            "consistency": consistency,
-            "highest_score": max(scores) if scores else 0,
-            "lowest_score": min(scores) if scores else 0,
-            "recent_scores": scores[-3:] if len(scores) >= 3 else scores,  # Last 3 scores
-            "total_time": total_time,
-            "avg_time_per_test": round(total_time / attempt_count, 1) if attempt_count > 0 and total_time > 0 else 0
-        }
+        summaries = []
+        for subject in subject_order:
+            if subject not in stats.index:
+                continue  # No numeric scores for this subject
+            row = stats.loc[subject]
+            attempt_count = int(row["count"])
+            subject_time = float(total_time[subject])
+            summaries.append({
+                "subject": subject,
+                "subject_display": subject.replace('_', ' ').title(),
+                "average_score": round(float(row["mean"]), 1),
+                "attempt_count": attempt_count,
+                "classification": row["classification"],
+                "trend": row["trend"],
+                "consistency": row["consistency"],
+                "highest_score": float(row["max"]),
+                "lowest_score": float(row["min"]),
+                "recent_scores": [float(score) for score in recent_scores[subject]],  # Last 3 scores
+                "total_time": subject_time,
+                "avg_time_per_test": round(subject_time / attempt_count, 1) if attempt_count > 0 and subject_time > 0 else 0
+            })
+        return summaries
     
     @staticmethod
     def _generate_recommendations(strengths: List, weaknesses: List, 
@@ -271,94 +272,43 @@ class StudentAnalyticsService:
     @staticmethod
     def get_performance_trends(practice_attempts: List[Dict], days: int = 30) -> Dict[str, Any]:
         """Get performance trends over specified time period"""
-        print(f"🔍 ANALYTICS DEBUG: get_performance_trends called with days={days}, type={type(days)}")
-        
         # Ensure days is an integer (defensive programming)
         if isinstance(days, str):
-            print(f"🔍 ANALYTICS DEBUG: Converting string '{days}' to int")
             days = int(days)
         if days is None:
             days = 30
-            
-        print(f"🔍 ANALYTICS DEBUG: Final days value = {days}, type = {type(days)}")
-        print(f"🔍 ANALYTICS DEBUG: About to create timedelta with days={days}")
+        
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        print(f"🔍 ANALYTICS DEBUG: Successfully created cutoff_date = {cutoff_date}")
         
-        # Filter recent attempts with defensive programming
-        recent_attempts = []
-        for attempt in practice_attempts:
-            completed_at = attempt.get('completed_at')
-            if completed_at:
-                try:
-                    print(f"🔍 ANALYTICS DEBUG: Processing completed_at={completed_at}, type={type(completed_at)}")
-                    
-                    # Handle both string and datetime objects
-                    if isinstance(completed_at, str):
-                        date = datetime.fromisoformat(completed_at.replace('Z', '+00:00'))
-                    elif isinstance(completed_at, datetime):
-                        date = completed_at
-                    else:
-                        print(f"🔍 ANALYTICS DEBUG: Unexpected completed_at type: {type(completed_at)}")
-                        continue
-                        
-                    if date >= cutoff_date:
-                        recent_attempts.append(attempt)
-                except (ValueError, AttributeError) as e:
-                    print(f"🔍 ANALYTICS DEBUG: Error in first date parsing: {e}")
-                    # Skip attempts with invalid date formats
-                    continue
+        # Keep attempts completed within the period; unparseable dates are skipped
+        frame = StudentAnalyticsService.build_attempts_frame(practice_attempts) if practice_attempts else None
+        if frame is not None:
+            frame = frame[frame["completed_at"] >= cutoff_date]
         
-        if not recent_attempts:
+        if frame is None or frame.empty:
             return {"trend_data": [], "summary": "No recent test data available"}
         
-        # Group by week with safe field access
-        weekly_performance = defaultdict(list)
-        for attempt in recent_attempts:
-            completed_at = attempt.get('completed_at')
-            score = attempt.get('score')
-            
-            if completed_at is not None and score is not None:
-                try:
-                    print(f"🔍 ANALYTICS DEBUG: Processing attempt with completed_at={completed_at}, type={type(completed_at)}")
-                    
-                    # Handle both string and datetime objects
-                    if isinstance(completed_at, str):
-                        date = datetime.fromisoformat(completed_at.replace('Z', '+00:00'))
-                    elif isinstance(completed_at, datetime):
-                        date = completed_at
-                    else:
-                        print(f"🔍 ANALYTICS DEBUG: Unexpected completed_at type: {type(completed_at)}")
-                        continue
-                        
-                    print(f"🔍 ANALYTICS DEBUG: Parsed date={date}, weekday={date.weekday()}, type={type(date.weekday())}")
-                    week_start = date - timedelta(days=date.weekday())
-                    week_key = week_start.strftime('%Y-%m-%d')
-                    
-                    # Only add numeric scores
-                    if isinstance(score, (int, float)):
-                        weekly_performance[week_key].append(score)
-                except (ValueError, AttributeError) as e:
-                    print(f"🔍 ANALYTICS DEBUG: Error processing attempt: {e}")
-                    # Skip attempts with invalid dates or scores
-                    continue
+        # Bucket numeric scores by the Monday of their week
+        scored = frame[frame["trend_score"].notna()]
+        completed_at = scored["completed_at"]
+        week_start = completed_at.dt.normalize() - pd.to_timedelta(completed_at.dt.weekday, unit="D")
+        weekly = scored["trend_score"].groupby(week_start).agg(["mean", "count", "max", "min"])
         
-        # Calculate weekly averages with error handling
-        trend_data = []
-        for week, scores in sorted(weekly_performance.items()):
-            if scores:  # Only add weeks with valid scores
-                trend_data.append({
-                    "week": week,
-                    "average_score": round(statistics.mean(scores), 1),
-                    "test_count": len(scores),
-                    "highest_score": max(scores),
-                    "lowest_score": min(scores)
-                })
+        trend_data = [
+            {
+                "week": week.strftime('%Y-%m-%d'),
+                "average_score": round(float(row["mean"]), 1),
+                "test_count": int(row["count"]),
+                "highest_score": float(row["max"]),
+                "lowest_score": float(row["min"])
+            }
+            for week, row in weekly.sort_index().iterrows()
+        ]
         
-        # Calculate overall trend with safe access
+        # Calculate overall trend from the first and last two weeks
         if len(trend_data) >= 2:
-            recent_avg = statistics.mean([data['average_score'] for data in trend_data[-2:]])
-            earlier_avg = statistics.mean([data['average_score'] for data in trend_data[:2]])
+            recent_avg = np.mean([data['average_score'] for data in trend_data[-2:]])
+            earlier_avg = np.mean([data['average_score'] for data in trend_data[:2]])
             trend_direction = "improving" if recent_avg > earlier_avg + 5 else \
                             "declining" if recent_avg < earlier_avg - 5 else "stable"
         else:
@@ -367,6 +317,6 @@ class StudentAnalyticsService:
         return {
             "trend_data": trend_data,
             "trend_direction": trend_direction,
-            "total_tests_period": len(recent_attempts),
+            "total_tests_period": len(frame),
             "period_days": days
-        }
\ No newline at end of file
+        }
@@ -1,7 +1,7 @@
 from typing import Optional, Dict, Any
 from backend.models.user import User, UserCreate, UserLogin, StudentProfile, TeacherProfile, UserType
 from backend.utils.database import get_database, Collections, convert_objectid_to_str
-from backend.utils.security import SecurityUtils, generate_join_code
+from backend.utils.security import SecurityUtils, password_hasher, generate_join_code
 from backend.utils.helpers import ValidationUtils
 from fastapi import HTTPException, status
 from datetime import datetime
@@ -45,8 +45,8 @@ class AuthService:
                 detail="Email already registered"
             )
         
-        # Hash password
-        hashed_password = SecurityUtils.hash_password(user_data.password)
+        # Hash password on the bounded bcrypt pool
+        hashed_password = await password_hasher.hash(user_data.password)
         
         # Create user document
         user_doc = {
@@ -101,8 +101,8 @@ class AuthService:
                 detail="Invalid credentials"
             )
         
-        # Verify password
-        if not SecurityUtils.verify_password(login_data.password, user["password"]):
+        # Verify password on the bounded bcrypt pool
+        if not await password_hasher.verify(login_data.password, user["password"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
@@ -0,0 +1,322 @@
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from pymongo import ReplaceOne, UpdateOne
+
+from backend.utils.database import get_database, Collections
+from backend.utils.job_queue import job_queue, job_handler
+from backend.services.student_stats_service import StudentStatsService
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Snapshot configuration
+SNAPSHOT_REBUILD_ENABLED = os.getenv("CLASS_SNAPSHOT_REBUILD_ENABLED", "true").lower() == "true"
+SNAPSHOT_REBUILD_INTERVAL = int(os.getenv("CLASS_SNAPSHOT_REBUILD_MINUTES", "60")) * 60
+STRUGGLING_TOPIC_MIN_ATTEMPTS = 3  # questions answered before a topic can be flagged
+STRUGGLING_TOPIC_ACCURACY = 60  # topic accuracy (%) below which a topic is struggling
+
+# Background jobs: one sweep fans out a rebuild job per class and per teacher
+REBUILD_SWEEP_JOB = "rebuild_analytics_snapshots"
+REBUILD_SCOPE_JOB = "rebuild_analytics_snapshot"
+REBUILD_SWEEP_KEY = "analytics_snapshots:sweep"
+
+# Snapshot scopes: collection and key field. Teacher snapshots count each student once
+# even when they are enrolled in several of the teacher's classes.
+SCOPES = {
+    "class": (Collections.CLASS_ANALYTICS_SNAPSHOTS, "class_id"),
+    "teacher": (Collections.TEACHER_ANALYTICS_SNAPSHOTS, "teacher_id"),
+}
+
+def _topic_key(topic: str) -> str:
+    """Make a topic name safe to use as a MongoDB field name"""
+    return (topic or "General").replace(".", "_").lstrip("$") or "General"
+
+class ClassAnalyticsService:
+    """Per-(class, subject) and per-(teacher, subject) aggregates kept current on each attempt and rebuilt periodically"""
+
+    async def schedule_rebuild(self):
+        """Queue the periodic rebuild sweep unless one is already queued"""
+        if not SNAPSHOT_REBUILD_ENABLED:
+            return
+        db = get_database()
+        if await db[Collections.BACKGROUND_JOBS].find_one({"dedupe_key": REBUILD_SWEEP_KEY}, {"_id": 1}):
+            return
+        await job_queue.enqueue(REBUILD_SWEEP_JOB, {}, dedupe_key=REBUILD_SWEEP_KEY)
+
+    async def record_attempt(
+        self,
+        student_id: str,
+        subject: str,
+        score: float,
+        total_questions: int,
+        correct_count: int,
+        detailed_results: List[Dict[str, Any]],
+        completed_at: Optional[datetime] = None
+    ):
+        """Fold one attempt into the snapshots of the student's classes and of their teachers"""
+        db = get_database()
+        profile = await db[Collections.STUDENT_PROFILES].find_one(
+            {"user_id": student_id},
+            {"joined_classes": 1, "_id": 0}
+        )
+        class_ids = (profile or {}).get("joined_classes", [])
+        if not class_ids:
+            return
+        teacher_ids = await db[Collections.CLASSROOMS].distinct("teacher_id", {"class_id": {"$in": class_ids}})
+
+        now = datetime.utcnow()
+        increments = {
+            "count": 1,
+            "score_sum": score,
+            "score_sum_sq": score * score,
+            "total_questions": total_questions or 0,
+            "total_correct": correct_count or 0,
+            f"score_histogram.{int(round(score))}": 1
+        }
+        topic_names = {}
+        for result in detailed_results:
+            key = _topic_key(result.get("topic"))
+            topic_names[f"topics.{key}.name"] = result.get("topic") or "General"
+            increments[f"topics.{key}.attempted"] = increments.get(f"topics.{key}.attempted", 0) + 1
+            increments[f"topics.{key}.correct"] = increments.get(f"topics.{key}.correct", 0) + (1 if result.get("is_correct") else 0)
+
+        update = {
+            "$inc": increments,
+            "$max": {"best_score": score, "last_attempt_at": completed_at or now},
+            "$min": {"worst_score": score},
+            "$addToSet": {"students": student_id},
+            "$set": {**topic_names, "updated_at": now}
+        }
+        for scope, scope_ids in (("class", class_ids), ("teacher", teacher_ids)):
+            collection, field = SCOPES[scope]
+            operations = [
+                UpdateOne({field: scope_id, "subject": subject}, update, upsert=True)
+                for scope_id in scope_ids
+            ]
+            if operations:
+                await db[collection].bulk_write(operations, ordered=False)
+
+    async def sweep(self):
+        """Queue a rebuild of every class and teacher snapshot and drop snapshots of removed scopes"""
+        db = get_database()
+        class_ids = await db[Collections.CLASSROOMS].distinct("class_id")
+        teacher_ids = await db[Collections.CLASSROOMS].distinct("teacher_id")
+        for scope, scope_ids in (("class", class_ids), ("teacher", teacher_ids)):
+            collection, field = SCOPES[scope]
+            for scope_id in scope_ids:
+                await job_queue.enqueue(
+                    REBUILD_SCOPE_JOB,
+                    {"scope": scope, "id": scope_id},
+                    dedupe_key=f"analytics_snapshots:{scope}:{scope_id}"
+                )
+            await db[collection].delete_many({field: {"$nin": scope_ids}})
+        logger.info("Queued analytics snapshot rebuilds for %s classes and %s teachers", len(class_ids), len(teacher_ids))
+
+    async def rebuild(self, scope: str, scope_id: str):
+        """Recompute one class's or teacher's snapshots from raw attempts to correct any drift"""
+        db = get_database()
+        collection, field = SCOPES[scope]
+        if scope == "class":
+            class_filter = scope_id
+        else:
+            class_filter = {"$in": await db[Collections.CLASSROOMS].distinct("class_id", {"teacher_id": scope_id})}
+        student_ids = await db[Collections.STUDENT_PROFILES].distinct("user_id", {"joined_classes": class_filter})
+
+        now = datetime.utcnow()
+        snapshots = await self._aggregate(student_ids) if student_ids else {}
+        operations = [
+            ReplaceOne(
+                {field: scope_id, "subject": subject},
+                {field: scope_id, "subject": subject, **snapshot, "updated_at": now, "rebuilt_at": now},
+                upsert=True
+            )
+            for subject, snapshot in snapshots.items()
+        ]
+        if operations:
+            await db[collection].bulk_write(operations, ordered=False)
+        # Drop subjects that no longer have any attempts
+        await db[collection].delete_many({field: scope_id, "subject": {"$nin": list(snapshots)}})
+
+    async def _aggregate(self, student_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Snapshot fields per subject over the given students' attempts
+
+        Histogram buckets and topics are grouped in the pipeline, so the result stays
+        small however many attempts the students have.
+        """
+        db = get_database()
+        pipeline = [
+            {"$match": {"student_id": {"$in": student_ids}}},
+            {"$project": {
+                "_id": 0,
+                "student_id": 1,
+                "subject": {"$ifNull": ["$subject", "general"]},
+                "score": {"$ifNull": ["$score", 0]},
+                "total_questions": {"$ifNull": ["$total_questions", {"$ifNull": ["$questions_count", 0]}]},
+                "correct_count": {"$ifNull": ["$correct_count", {"$ifNull": ["$correct_answers", 0]}]},
+                "completed_at": {"$ifNull": ["$completed_at", "$created_at"]},
+                "detailed_results": {"$ifNull": ["$detailed_results", []]}
+            }},
+            {"$facet": {
+                "subjects": [
+                    {"$group": {
+                        "_id": "$subject",
+                        "count": {"$sum": 1},
+                        "score_sum": {"$sum": "$score"},
+                        "score_sum_sq": {"$sum": {"$multiply": ["$score", "$score"]}},
+                        "total_questions": {"$sum": "$total_questions"},
+                        "total_correct": {"$sum": "$correct_count"},
+                        "best_score": {"$max": "$score"},
+                        "worst_score": {"$min": "$score"},
+                        "last_attempt_at": {"$max": "$completed_at"},
+                        "students": {"$addToSet": "$student_id"}
+                    }}
+                ],
+                "histogram": [
+                    {"$group": {
+                        "_id": {"subject": "$subject", "bucket": {"$toInt": {"$round": ["$score", 0]}}},
+                        "count": {"$sum": 1}
+                    }}
+                ],
+                "topics": [
+                    {"$unwind": "$detailed_results"},
+                    {"$group": {
+                        "_id": {"subject": "$subject", "name": {"$ifNull": ["$detailed_results.topic", "General"]}},
+                        "attempted": {"$sum": 1},
+                        "correct": {"$sum": {"$cond": ["$detailed_results.is_correct", 1, 0]}}
+                    }}
+                ]
+            }}
+        ]
+        facets = await db[Collections.PRACTICE_ATTEMPTS].aggregate(pipeline, allowDiskUse=True).to_list(1)
+        facets = facets[0] if facets else {"subjects": [], "histogram": [], "topics": []}
+
+        snapshots = {}
+        for row in facets["subjects"]:
+            subject = row.pop("_id")
+            snapshots[subject] = {**row, "score_histogram": {}, "topics": {}}
+        for row in facets["histogram"]:
+            snapshot = snapshots.get(row["_id"]["subject"])
+            if snapshot is not None:
+                snapshot["score_histogram"][str(row["_id"]["bucket"])] = row["count"]
+        for row in facets["topics"]:
+            snapshot = snapshots.get(row["_id"]["subject"])
+            if snapshot is None:
+                continue
+            name = row["_id"]["name"]
+            topic = snapshot["topics"].setdefault(_topic_key(name), {"name": name, "attempted": 0, "correct": 0})
+            topic["attempted"] += row["attempted"]
+            topic["correct"] += row["correct"]
+        return snapshots
+
+    async def get_snapshots(self, class_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get the snapshot documents for the given classes"""
+        db = get_database()
+        return await db[Collections.CLASS_ANALYTICS_SNAPSHOTS].find(
+            {"class_id": {"$in": class_ids}},
+            {"_id": 0}
+        ).to_list(None)
+
+    async def get_teacher_snapshots(self, teacher_id: str) -> List[Dict[str, Any]]:
+        """Get the teacher's snapshot documents, one per subject over their distinct students"""
+        db = get_database()
+        return await db[Collections.TEACHER_ANALYTICS_SNAPSHOTS].find(
+            {"teacher_id": teacher_id},
+            {"_id": 0}
+        ).to_list(None)
+
+    @staticmethod
+    def combine(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge snapshots over disjoint attempts (e.g. several subjects of one class) into one aggregate"""
+        combined = {
+            "count": 0,
+            "score_sum": 0,
+            "score_sum_sq": 0,
+            "total_questions": 0,
+            "total_correct": 0,
+            "best_score": None,
+            "worst_score": None,
+            "students": set(),
+            "score_histogram": {},
+            "topics": {},
+            "updated_at": None
+        }
+        for snapshot in snapshots:
+            for field in ("count", "score_sum", "score_sum_sq", "total_questions", "total_correct"):
+                combined[field] += snapshot.get(field, 0)
+            if snapshot.get("best_score") is not None:
+                combined["best_score"] = max(combined["best_score"] if combined["best_score"] is not None else snapshot["best_score"], snapshot["best_score"])
+            if snapshot.get("worst_score") is not None:
+                combined["worst_score"] = min(combined["worst_score"] if combined["worst_score"] is not None else snapshot["worst_score"], snapshot["worst_score"])
+            combined["students"].update(snapshot.get("students", []))
+            for bucket, count in snapshot.get("score_histogram", {}).items():
+                combined["score_histogram"][bucket] = combined["score_histogram"].get(bucket, 0) + count
+            for key, topic in snapshot.get("topics", {}).items():
+                merged = combined["topics"].setdefault(key, {"name": topic.get("name", key), "attempted": 0, "correct": 0})
+                merged["attempted"] += topic.get("attempted", 0)
+                merged["correct"] += topic.get("correct", 0)
+            if snapshot.get("updated_at") and (combined["updated_at"] is None or snapshot["updated_at"] > combined["updated_at"]):
+                combined["updated_at"] = snapshot["updated_at"]
+        return combined
+
+    @staticmethod
+    def average(aggregate: Dict[str, Any]) -> float:
+        """Mean score of a snapshot"""
+        return StudentStatsService.average(aggregate)
+
+    @staticmethod
+    def stdev(aggregate: Dict[str, Any]) -> float:
+        """Sample standard deviation of a snapshot's scores"""
+        return StudentStatsService.stdev(aggregate)
+
+    @staticmethod
+    def median(aggregate: Dict[str, Any]) -> float:
+        """Median score read off the snapshot's whole-point score histogram"""
+        histogram = sorted((int(bucket), count) for bucket, count in aggregate.get("score_histogram", {}).items())
+        total = sum(count for _, count in histogram)
+        if not total:
+            return 0.0
+
+        def nth(n: int) -> int:
+            seen = 0
+            for bucket, count in histogram:
+                seen += count
+                if seen > n:
+                    return bucket
+            return histogram[-1][0]
+
+        return (nth((total - 1) // 2) + nth(total // 2)) / 2
+
+    @staticmethod
+    def struggling_topics(aggregate: Dict[str, Any], limit: int = 5) -> List[Dict[str, Any]]:
+        """Topics answered often enough with accuracy below the struggling threshold"""
+        topics = []
+        for topic in aggregate.get("topics", {}).values():
+            attempted = topic.get("attempted", 0)
+            if attempted < STRUGGLING_TOPIC_MIN_ATTEMPTS:
+                continue
+            accuracy = topic.get("correct", 0) / attempted * 100
+            if accuracy < STRUGGLING_TOPIC_ACCURACY:
+                topics.append({
+                    "topic": topic.get("name"),
+                    "questions_attempted": attempted,
+                    "accuracy_rate": round(accuracy, 1)
+                })
+        topics.sort(key=lambda t: t["accuracy_rate"])
+        return topics[:limit]
+
+# Global class analytics service instance
+class_analytics_service = ClassAnalyticsService()
+
+@job_handler(REBUILD_SWEEP_JOB)
+async def run_rebuild_sweep(payload: Dict[str, Any]):
+    """Fan out snapshot rebuilds, then schedule the next sweep"""
+    await class_analytics_service.sweep()
+    await job_queue.enqueue(REBUILD_SWEEP_JOB, {}, dedupe_key=REBUILD_SWEEP_KEY, delay_seconds=SNAPSHOT_REBUILD_INTERVAL)
+
+@job_handler(REBUILD_SCOPE_JOB)
+async def run_scope_rebuild(payload: Dict[str, Any]):
+    await class_analytics_service.rebuild(payload["scope"], payload["id"])
@@ -0,0 +1,525 @@
+import logging
+import asyncio
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from backend.utils.observability import span, record_stage, record_model_call
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+# Models in preference order with their requests-per-minute quota, e.g. "gemini-1.5-flash:15,gemini-2.5-flash:10"
+AI_MODELS = os.getenv("AI_MODELS", "gemini-1.5-flash:15,gemini-2.5-flash:10")
+AI_REQUEST_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "30"))  # seconds per model call
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))  # concurrent model calls per worker
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "5"))  # consecutive failures that open a model's circuit
+AI_BREAKER_RESET_SECONDS = float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))  # open time before a half-open probe
+AI_QUOTA_COOLDOWN_SECONDS = float(os.getenv("AI_QUOTA_COOLDOWN_SECONDS", "30"))  # pause after a 429 without Retry-After
+AI_RATE_LIMIT_MAX_WAIT = float(os.getenv("AI_RATE_LIMIT_MAX_WAIT", "5"))  # longest wait for a rate-limit token
+# Gemini REST endpoint; set to a local fake model server in tests and load runs to use the REST client
+MODEL_API_BASE_URL = os.getenv("MODEL_API_BASE_URL")
+
+# Weight of the newest call in each model's latency moving average
+LATENCY_SMOOTHING = 0.2
+
+# Shared across all AIService instances so the bound applies per worker process
+_llm_executor = ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENCY, thread_name_prefix="gemini")
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """Lazily create the semaphore inside the running event loop"""
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+    return _llm_semaphore
+
+class ModelError(Exception):
+    """A model call failed"""
+
+class ModelRateLimited(ModelError):
+    """The provider rejected the call for quota (HTTP 429)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ModelContentBlocked(ModelError):
+    """The provider refused the prompt or response on safety grounds; other models will too"""
+
+class ModelUnavailableError(ModelError):
+    """No model could serve the request: every circuit is open, out of quota or failed"""
+
+class TokenBucket:
+    """Per-model request budget refilled continuously at the model's requests-per-minute quota"""
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = requests_per_minute / 60.0
+        # A quarter-minute burst keeps a sliding one-minute quota from being overrun right after a refill
+        self.capacity = float(burst or max(1, int(requests_per_minute // 4)))
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        if now < self.paused_until:
+            self.updated = now
+            return
+        start = max(self.updated, self.paused_until)
+        self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available"""
+        now = self.clock()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self):
+        """Return a token that was taken but not spent on a call"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available"""
+        now = self.clock()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now + 1 / self.rate
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds: float):
+        """Empty the bucket and stop refilling for a while after the provider reports quota exhaustion"""
+        now = self.clock()
+        self.tokens = 0.0
+        self.updated = now
+        self.paused_until = max(self.paused_until, now + seconds)
+
+class CircuitBreaker:
+    """Stops routing to a failing model and lets a single probe through once the reset timeout passes"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = AI_BREAKER_FAILURES, reset_timeout: float = AI_BREAKER_RESET_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def can_attempt(self) -> bool:
+        """Whether a call could be let through now, without claiming the half-open probe"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return self.clock() - self.opened_at >= self.reset_timeout
+        return not self.probing
+
+    def allow(self) -> bool:
+        """Let a call through; in half-open state only one probe at a time"""
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.probing = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def release(self):
+        """Give back a half-open probe that ended without a verdict on the model's health"""
+        self.probing = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Circuit opened after %s consecutive failures", self.failures)
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+
+def _classify_sdk_error(error: Exception) -> Exception:
+    """Map SDK exceptions onto the router's rate-limit and content-blocked errors"""
+    if isinstance(error, (ModelError, asyncio.TimeoutError)):
+        return error
+    message = str(error).lower()
+    if "429" in message or "quota" in message or "resource exhausted" in message or "resourceexhausted" in message:
+        return ModelRateLimited(str(error))
+    if isinstance(error, ValueError) and ("block" in message or "safety" in message):
+        # response.text raises ValueError when the candidate was blocked
+        return ModelContentBlocked(str(error))
+    return error
+
+class GeminiClient:
+    """google-generativeai SDK client for one model"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.model = genai.GenerativeModel(name)
+
+    async def generate(self, prompt: str, timeout: float) -> str:
+        try:
+            if hasattr(self.model, "generate_content_async"):
+                # Native async generation
+                call = self.model.generate_content_async(prompt)
+            else:
+                # Older SDKs only expose the blocking client
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(_llm_executor, self.model.generate_content, prompt)
+            response = await asyncio.wait_for(call, timeout=timeout)
+            return response.text
+        except Exception as e:
+            classified = _classify_sdk_error(e)
+            if classified is e:
+                raise
+            raise classified from e
+
+    async def stream(self, prompt: str, timeout: float) -> AsyncIterator[str]:
+        """Yield chunks as they arrive; ``timeout`` bounds the wait for each chunk"""
+        if not hasattr(self.model, "generate_content_async"):
+            yield await self.generate(prompt, timeout)
+            return
+        try:
+            response = await asyncio.wait_for(self.model.generate_content_async(prompt, stream=True), timeout=timeout)
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                if chunk.text:
+                    yield chunk.text
+        except (GeneratorExit, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            classified = _classify_sdk_error(e)
+            if classified is e:
+                raise
+            raise classified from e
+
+class GeminiRestClient:
+    """Gemini REST API client for one model; pointed at a local fake model server in tests"""
+
+    def __init__(self, name: str, base_url: str, api_key: Optional[str] = GEMINI_API_KEY):
+        import httpx
+
+        self.name = name
+        self.url = f"{base_url.rstrip('/')}/v1beta/models/{name}"
+        self.params = {"key": api_key} if api_key else {}
+        self._client = httpx.AsyncClient()
+
+    @staticmethod
+    def _body(prompt: str) -> Dict[str, Any]:
+        return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+    @staticmethod
+    def _raise_for_status(response):
+        if response.status_code == 429:
+            retry_after = response.headers.get("retry-after")
+            raise ModelRateLimited("HTTP 429 quota exceeded", float(retry_after) if retry_after else None)
+        if response.status_code >= 400:
+            raise ModelError(f"HTTP {response.status_code}")
+
+    @staticmethod
+    def _text(payload: Dict[str, Any]) -> str:
+        """Text of the first candidate, raising ModelContentBlocked for blocked prompts or answers"""
+        block_reason = (payload.get("promptFeedback") or {}).get("blockReason")
+        if block_reason:
+            raise ModelContentBlocked(f"Prompt blocked: {block_reason}")
+        candidates = payload.get("candidates") or []
+        if not candidates:
+            return ""
+        if candidates[0].get("finishReason") == "SAFETY":
+            raise ModelContentBlocked("Response blocked: SAFETY")
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    async def generate(self, prompt: str, timeout: float) -> str:
+        import httpx
+
+        try:
+            response = await self._client.post(f"{self.url}:generateContent", params=self.params,
+                                               json=self._body(prompt), timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError() from e
+        self._raise_for_status(response)
+        return self._text(response.json())
+
+    async def stream(self, prompt: str, timeout: float) -> AsyncIterator[str]:
+        """Yield chunks from the server-sent events of streamGenerateContent"""
+        import httpx
+
+        try:
+            async with self._client.stream("POST", f"{self.url}:streamGenerateContent",
+                                           params={**self.params, "alt": "sse"},
+                                           json=self._body(prompt), timeout=timeout) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    self._raise_for_status(response)
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        text = self._text(json.loads(line[5:]))
+                        if text:
+                            yield text
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError() from e
+
+    async def close(self):
+        await self._client.aclose()
+
+class ModelEndpoint:
+    """A model with its own quota bucket, circuit breaker and latency estimate"""
+
+    def __init__(self, name: str, client, bucket: TokenBucket, breaker: CircuitBreaker):
+        self.name = name
+        self.client = client
+        self.bucket = bucket
+        self.breaker = breaker
+        self.latency: Optional[float] = None  # moving average of successful call seconds
+        self.stats = {"calls": 0, "errors": 0, "rate_limited": 0, "skipped": 0}
+
+    def record_latency(self, seconds: float):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "state": self.breaker.state,
+            "tokens": round(self.bucket.tokens, 2),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None
+        }
+
+class ModelRouter:
+    """Picks a model per request by quota, circuit state and observed latency
+
+    Each request walks its own candidate order, so a failing or throttled model is
+    skipped for that request without changing what concurrent requests use.
+    Candidates are drawn at random weighted by inverse latency: faster models take
+    most of the traffic while slower ones keep enough to refresh their estimate.
+    """
+
+    def __init__(self, endpoints: List[ModelEndpoint], rng: Optional[random.Random] = None,
+                 max_wait: float = AI_RATE_LIMIT_MAX_WAIT, timeout: float = AI_REQUEST_TIMEOUT):
+        self.endpoints = endpoints
+        self.rng = rng or random.Random()
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.stats = {"requests": 0, "failovers": 0, "unavailable": 0}
+
+    def available(self) -> bool:
+        """Whether any model could currently take a call"""
+        return any(endpoint.breaker.can_attempt() for endpoint in self.endpoints)
+
+    def _ranked(self, endpoints: List[ModelEndpoint]) -> List[ModelEndpoint]:
+        """Latency-weighted random order; models without a latency estimate rank as the fastest known"""
+        known = [endpoint.latency for endpoint in endpoints if endpoint.latency]
+        default = min(known) if known else 1.0
+        remaining = list(endpoints)
+        ranked = []
+        while remaining:
+            weights = [1.0 / (endpoint.latency or default) for endpoint in remaining]
+            chosen = self.rng.choices(range(len(remaining)), weights=weights)[0]
+            ranked.append(remaining.pop(chosen))
+        return ranked
+
+    async def _candidates(self) -> AsyncIterator[ModelEndpoint]:
+        """Yield models cleared to take this request, waiting briefly when all are out of tokens"""
+        pending = [endpoint for endpoint in self.endpoints if endpoint.breaker.can_attempt()]
+        tried = 0
+        while pending:
+            throttled = []
+            for endpoint in self._ranked(pending):
+                if not endpoint.bucket.try_acquire():
+                    throttled.append(endpoint)
+                    continue
+                if not endpoint.breaker.allow():
+                    # Another request holds the half-open probe
+                    endpoint.bucket.refund()
+                    endpoint.stats["skipped"] += 1
+                    continue
+                if tried:
+                    self.stats["failovers"] += 1
+                tried += 1
+                yield endpoint
+            wait = min((endpoint.bucket.wait_time() for endpoint in throttled), default=None)
+            if wait is None or wait > self.max_wait:
+                for endpoint in throttled:
+                    endpoint.stats["skipped"] += 1
+                return
+            with span("ai.rate_limit"):
+                await asyncio.sleep(wait)
+            pending = [endpoint for endpoint in throttled if endpoint.breaker.can_attempt()]
+
+    async def _call(self, endpoint: ModelEndpoint, prompt: str, timeout: float) -> str:
+        with span("ai.queue"):
+            await _get_llm_semaphore().acquire()
+        start = time.perf_counter()
+        try:
+            with span("ai.model"):
+                text = await endpoint.client.generate(prompt, timeout)
+        except asyncio.TimeoutError:
+            record_model_call(endpoint.name, prompt, None, outcome="timeout")
+            raise
+        except Exception:
+            record_model_call(endpoint.name, prompt, None, outcome="error")
+            raise
+        finally:
+            _get_llm_semaphore().release()
+        endpoint.record_latency(time.perf_counter() - start)
+        record_model_call(endpoint.name, prompt, text)
+        return text
+
+    def _record_error(self, endpoint: ModelEndpoint, error: Exception):
+        """Charge a failed call to the model's quota bucket or circuit breaker"""
+        endpoint.stats["errors"] += 1
+        if isinstance(error, ModelRateLimited):
+            # Quota says nothing about the model's health: cool the bucket, leave the breaker alone
+            endpoint.stats["rate_limited"] += 1
+            endpoint.bucket.pause(error.retry_after or AI_QUOTA_COOLDOWN_SECONDS)
+            endpoint.breaker.release()
+        else:
+            endpoint.breaker.record_failure()
+        logger.warning("Model %s failed: %s: %s", endpoint.name, type(error).__name__, error)
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None,
+                       accept: Optional[Callable[[str], bool]] = None) -> str:
+        """Text from the first model that answers; ``accept`` can reject an answer to try the next model
+
+        Raises ModelContentBlocked straight away (every model applies the same safety
+        filters) and ModelUnavailableError when no model produced an answer.
+        """
+        self.stats["requests"] += 1
+        errors = []
+        async for endpoint in self._candidates():
+            endpoint.stats["calls"] += 1
+            try:
+                text = await self._call(endpoint, prompt, timeout or self.timeout)
+            except ModelContentBlocked:
+                endpoint.breaker.record_success()
+                raise
+            except Exception as e:
+                self._record_error(endpoint, e)
+                errors.append(f"{endpoint.name}: {type(e).__name__}")
+                continue
+            endpoint.breaker.record_success()
+            if accept is not None and not accept(text):
+                errors.append(f"{endpoint.name}: rejected")
+                continue
+            return text
+        self.stats["unavailable"] += 1
+        raise ModelUnavailableError("No model available (" + ", ".join(errors or ["all circuits open or out of quota"]) + ")")
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield a completion in chunks, failing over to the next model until the first chunk is sent
+
+        Holds a concurrency slot for the whole stream; ``timeout`` bounds the wait for
+        each chunk rather than the full completion.
+        """
+        self.stats["requests"] += 1
+        timeout = timeout or self.timeout
+        errors = []
+        async for endpoint in self._candidates():
+            endpoint.stats["calls"] += 1
+            with span("ai.queue"):
+                await _get_llm_semaphore().acquire()
+            received = []
+            outcome = "error"
+            start = time.perf_counter()
+            try:
+                async for text in endpoint.client.stream(prompt, timeout):
+                    if not received:
+                        record_stage("ai.first_token", time.perf_counter() - start)
+                    received.append(text)
+                    yield text
+                outcome = "ok"
+            except ModelContentBlocked:
+                endpoint.breaker.record_success()
+                raise
+            except (GeneratorExit, asyncio.CancelledError):
+                outcome = "cancelled"  # the client went away mid-stream
+                endpoint.breaker.release()
+                raise
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    outcome = "timeout"
+                self._record_error(endpoint, e)
+                if received:
+                    raise  # part of the answer is already with the client
+                errors.append(f"{endpoint.name}: {type(e).__name__}")
+                continue
+            finally:
+                _get_llm_semaphore().release()
+                record_stage("ai.model", time.perf_counter() - start)
+                record_model_call(endpoint.name, prompt, "".join(received), outcome=outcome)
+            endpoint.record_latency(time.perf_counter() - start)
+            endpoint.breaker.record_success()
+            return
+        self.stats["unavailable"] += 1
+        raise ModelUnavailableError("No model available (" + ", ".join(errors or ["all circuits open or out of quota"]) + ")")
+
+    async def close(self):
+        """Close the HTTP connections of clients that keep them"""
+        for endpoint in self.endpoints:
+            close = getattr(endpoint.client, "close", None)
+            if close:
+                await close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "models": {endpoint.name: endpoint.get_stats() for endpoint in self.endpoints}}
+
+def parse_model_quotas(spec: str) -> List[Tuple[str, float]]:
+    """Parse "name:rpm,name:rpm" into (name, requests per minute) pairs; rpm defaults to 15"""
+    quotas = []
+    for item in spec.split(","):
+        name, _, rpm = item.strip().partition(":")
+        if name:
+            quotas.append((name, float(rpm) if rpm else 15.0))
+    return quotas
+
+def create_model_router(spec: str = AI_MODELS, base_url: Optional[str] = MODEL_API_BASE_URL) -> ModelRouter:
+    """Router over the configured models, using the REST client when a base URL is set"""
+    endpoints = []
+    for name, rpm in parse_model_quotas(spec):
+        try:
+            client = GeminiRestClient(name, base_url) if base_url else GeminiClient(name)
+        except Exception as e:
+            logger.error("Failed to initialize %s: %s", name, e)
+            continue
+        endpoints.append(ModelEndpoint(name, client, TokenBucket(rpm), CircuitBreaker()))
+        logger.info("Initialized AI model: %s (%g requests/min)", name, rpm)
+    if not endpoints:
+        logger.warning("No AI model available, will use fallback questions only")
+    return ModelRouter(endpoints)
+
+# Global model router instance shared by every AIService
+model_router = create_model_router()
@@ -0,0 +1,138 @@
+import difflib
+import json
+import os
+import random
+import re
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Versioned fallback question banks served when AI generation is unavailable
+QUESTION_BANK_PATH = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "question_banks.json")
+)
+QUESTION_BANK_VERSION = 1  # data file version this loader understands
+UNIT_MATCH_CUTOFF = 0.8  # similarity a requested topic needs to match a unit name
+
+_UNIT_NOISE = re.compile(r"\b(?:chapter|unit|class|grade|lesson|ch)\s*\d*\b|\d+|[^a-z ]")
+
+class BankQuestion(NamedTuple):
+    question: str
+    options: Tuple[str, ...]
+    correct: str
+    explanation: str
+
+CatalogKey = Tuple[str, str, str, str]  # (subject, unit, question type, difficulty)
+
+def normalize_unit(name: str) -> str:
+    """Unit name without case, punctuation, numbering or "chapter"/"class" prefixes"""
+    return " ".join(_UNIT_NOISE.sub(" ", name.lower().replace("&", " and ")).split())
+
+def match_unit(topic: str, units: Mapping[str, str]) -> Optional[str]:
+    """Unit name for a requested topic from ``units`` (normalized name -> name), or None
+
+    Exact normalized match first, then the unit whose name contains every word of the
+    topic with the fewest extra words, then a close spelling.
+    """
+    normalized = normalize_unit(topic)
+    if not normalized:
+        return None
+    unit = units.get(normalized)
+    if unit is None:
+        # "Trigonometry" for "Introduction to Trigonometry"
+        words = set(normalized.split())
+        containing = sorted((len(name.split()), name) for name in units if words <= set(name.split()))
+        if containing and (len(containing) == 1 or containing[0][0] < containing[1][0]):
+            unit = units[containing[0][1]]
+    if unit is None:
+        close = difflib.get_close_matches(normalized, list(units), n=1, cutoff=UNIT_MATCH_CUTOFF)
+        unit = units[close[0]] if close else None
+    return unit
+
+def sample_without_replacement(population: Sequence, k: int, rng=random) -> List:
+    """Up to ``k`` distinct items in O(1) per draw, without copying the population
+
+    A partial Fisher-Yates shuffle whose swaps live in a small dict instead of a copy.
+    """
+    n = len(population)
+    swapped: Dict[int, int] = {}
+    picked = []
+    for i in range(min(k, n)):
+        j = rng.randrange(i, n)
+        picked.append(population[swapped.get(j, j)])
+        swapped[j] = swapped.get(i, i)
+    return picked
+
+class QuestionBankCatalog:
+    """Immutable fallback questions indexed by (subject, unit, question type, difficulty)
+
+    NCERT unit banks are looked up by unit name, tolerating case, punctuation and
+    small spelling differences; generic banks cover a subject when no unit matches.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        if data.get("version") != QUESTION_BANK_VERSION:
+            raise ValueError(f"Unsupported question bank version {data.get('version')}")
+        index: Dict[CatalogKey, Tuple[BankQuestion, ...]] = {}
+        units: Dict[str, Dict[str, str]] = {}
+        generic: Dict[str, List[BankQuestion]] = {}
+        for bank in data["banks"]:
+            subject = bank["subject"].lower()
+            questions = tuple(
+                BankQuestion(q["question"], tuple(q["options"]), q["correct"], q["explanation"])
+                for q in bank["questions"]
+            )
+            if bank.get("tier") == "generic":
+                generic.setdefault(subject, []).extend(questions)
+                continue
+            key = (subject, bank["unit"], bank.get("question_type", "mcq"), bank.get("difficulty", "medium"))
+            index[key] = index.get(key, ()) + questions
+            units.setdefault(subject, {})[normalize_unit(bank["unit"])] = bank["unit"]
+
+        self.version = data["version"]
+        self._index: Mapping[CatalogKey, Tuple[BankQuestion, ...]] = MappingProxyType(index)
+        self._units: Mapping[str, Mapping[str, str]] = MappingProxyType({s: MappingProxyType(u) for s, u in units.items()})
+        self._generic: Mapping[str, Tuple[BankQuestion, ...]] = MappingProxyType({s: tuple(q) for s, q in generic.items()})
+        self._resolved: Dict[Tuple[str, str], Optional[str]] = {}
+
+    @classmethod
+    def load(cls, path: str = QUESTION_BANK_PATH) -> "QuestionBankCatalog":
+        with open(path, encoding="utf-8") as bank_file:
+            return cls(json.load(bank_file))
+
+    def resolve_unit(self, subject: str, topic: str) -> Optional[str]:
+        """Catalog unit name for a requested topic, or None when no unit is close enough"""
+        key = (subject, topic)
+        if key in self._resolved:
+            return self._resolved[key]
+        unit = match_unit(topic, self._units.get(subject, {}))
+        if len(self._resolved) < 10_000:  # topics come from requests; keep the memo bounded
+            self._resolved[key] = unit
+        return unit
+
+    def unit_questions(self, subject: str, unit: str, question_type: str = "mcq", difficulty: str = "medium") -> Tuple[BankQuestion, ...]:
+        return self._index.get((subject, unit, question_type, difficulty), ())
+
+    def generic_questions(self, subject: str) -> Tuple[BankQuestion, ...]:
+        return self._generic.get(subject, ())
+
+    def questions_for(self, subject: str, topics: List[str], generic: bool = True) -> Tuple[BankQuestion, ...]:
+        """Questions of the units matching the topics, else (with ``generic``) the subject's generic bank"""
+        subject = subject.lower()
+        matched: Tuple[BankQuestion, ...] = ()
+        seen = set()
+        for topic in topics:
+            unit = self.resolve_unit(subject, topic)
+            if unit is not None and unit not in seen:
+                seen.add(unit)
+                matched += self.unit_questions(subject, unit)
+        return matched or (self.generic_questions(subject) if generic else ())
+
+_catalog: Optional[QuestionBankCatalog] = None
+
+def get_question_catalog() -> QuestionBankCatalog:
+    """Load the fallback question banks on first use"""
+    global _catalog
+    if _catalog is None:
+        _catalog = QuestionBankCatalog.load()
+    return _catalog
@@ -0,0 +1,225 @@
+import logging
+import asyncio
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+from backend.utils.database import get_database, Collections, save_practice_questions
+from backend.services.ai_service import ai_service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Question pool configuration
+QUESTION_POOL_ENABLED = os.getenv("QUESTION_POOL_ENABLED", "true").lower() == "true"
+POOL_TARGET_SIZE = int(os.getenv("QUESTION_POOL_TARGET_SIZE", "30"))  # questions kept per pool key
+POOL_REFILL_BATCH = int(os.getenv("QUESTION_POOL_REFILL_BATCH", "10"))  # questions generated per refill call
+SEEN_HISTORY_LIMIT = 5000  # most recent seen questions excluded per student and subject
+
+PoolKey = Tuple[str, str, str, Optional[str]]  # (subject, NCERT unit, difficulty, question type)
+
+def _value(item: Any) -> Any:
+    """Unwrap str enums so keys and queries use plain strings"""
+    return getattr(item, "value", item)
+
+class QuestionPoolService:
+    """Serves practice questions from pre-generated pools and tops them up in the background"""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[PoolKey] = set()
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background replenishment worker"""
+        if not QUESTION_POOL_ENABLED or self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Question pool replenishment worker started")
+
+    async def stop(self):
+        """Stop the background replenishment worker"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        self._queue = None
+        self._pending.clear()
+
+    def _pool_filter(self, subject: str, topics: List[str], difficulty: str, question_types: Optional[List[str]]) -> Dict[str, Any]:
+        """Build the PRACTICE_QUESTIONS filter for the pools behind a request"""
+        query = {
+            "subject": subject,
+            "topic": {"$in": topics},
+            "difficulty": difficulty,
+            "source": {"$nin": ["fallback", "template"]}  # Offline bank and template questions are not pooled
+        }
+        if question_types:
+            query["question_type"] = {"$in": question_types}
+        return query
+
+    async def get_practice_questions(
+        self,
+        student_id: str,
+        subject,
+        topics: List[str],
+        difficulty,
+        question_count: int = 5,
+        question_types: Optional[List] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Get questions for a practice test, preferring unseen pooled questions
+
+        Returns the questions to serve and the subset that was generated live
+        (for this request or an identical one in flight) and still needs to be persisted.
+        """
+        subject_value = _value(subject)
+        difficulty_value = _value(difficulty)
+        type_values = [_value(t) for t in question_types] if question_types else None
+
+        questions: List[Dict[str, Any]] = []
+        if QUESTION_POOL_ENABLED:
+            try:
+                questions = await self._draw_from_pool(student_id, subject_value, topics, difficulty_value, question_count, type_values)
+            except Exception as e:
+                logger.warning("Question pool lookup failed: %s", e)
+                questions = []
+
+        fresh_questions: List[Dict[str, Any]] = []
+        shortfall = question_count - len(questions)
+        if shortfall > 0:
+            # Pool is cold or exhausted for this student - generate the rest live,
+            # sharing the generation with identical requests already in flight
+            generated, _ = await ai_service.generate_shared_practice_questions(
+                subject=subject,
+                topics=topics,
+                difficulty=difficulty,
+                question_count=shortfall,
+                question_types=question_types
+            )
+            questions.extend(generated)
+            # Every request persists what it serves: the leader may be cancelled before saving,
+            # and saves are idempotent upserts on content-addressed IDs
+            fresh_questions = generated
+
+        if QUESTION_POOL_ENABLED:
+            for topic in topics:
+                for question_type in (type_values or [None]):
+                    self.request_replenish(subject_value, topic, difficulty_value, question_type)
+
+        return questions, fresh_questions
+
+    async def _draw_from_pool(
+        self,
+        student_id: str,
+        subject: str,
+        topics: List[str],
+        difficulty: str,
+        question_count: int,
+        question_types: Optional[List[str]]
+    ) -> List[Dict[str, Any]]:
+        """Randomly sample pooled questions the student has not seen yet"""
+        db = get_database()
+
+        seen = await db[Collections.STUDENT_QUESTION_HISTORY].find(
+            {"student_id": student_id, "subject": subject},
+            {"question_id": 1, "_id": 0}
+        ).sort("last_seen", -1).to_list(SEEN_HISTORY_LIMIT)
+        seen_ids = [item["question_id"] for item in seen]
+
+        query = self._pool_filter(subject, topics, difficulty, question_types)
+        if seen_ids:
+            query["id"] = {"$nin": seen_ids}
+
+        pipeline = [
+            {"$match": query},
+            {"$sample": {"size": question_count}},
+            {"$project": {"_id": 0}}
+        ]
+        return await db[Collections.PRACTICE_QUESTIONS].aggregate(pipeline).to_list(question_count)
+
+    async def record_seen(self, student_id: str, subject, question_ids: List[str]):
+        """Record served questions in the student's question history"""
+        if not question_ids:
+            return
+
+        db = get_database()
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"student_id": student_id, "question_id": question_id},
+                {
+                    "$inc": {"seen_count": 1},
+                    "$set": {"last_seen": now, "subject": _value(subject)},
+                    "$setOnInsert": {"id": str(uuid.uuid4())}
+                },
+                upsert=True
+            )
+            for question_id in question_ids
+        ]
+        try:
+            await db[Collections.STUDENT_QUESTION_HISTORY].bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning("Failed to record question history: %s", e)
+
+    def request_replenish(self, subject: str, topic: str, difficulty: str, question_type: Optional[str] = None):
+        """Queue a pool for a background top-up check (deduplicated per key)"""
+        if self._queue is None:
+            return
+        key = (subject, topic, difficulty, question_type)
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        self._queue.put_nowait(key)
+
+    async def _run(self):
+        """Background loop that refills pools one key at a time"""
+        while True:
+            key = await self._queue.get()
+            try:
+                await self._replenish(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Question pool refill failed for %s: %s", key, e)
+            finally:
+                self._pending.discard(key)
+                self._queue.task_done()
+
+    async def _replenish(self, key: PoolKey):
+        """Generate questions for a pool that is below its target size"""
+        subject, topic, difficulty, question_type = key
+        db = get_database()
+
+        pool_size = await db[Collections.PRACTICE_QUESTIONS].count_documents(
+            self._pool_filter(subject, [topic], difficulty, [question_type] if question_type else None)
+        )
+        if pool_size >= POOL_TARGET_SIZE:
+            return
+
+        questions = await ai_service.generate_practice_questions(
+            subject=subject,
+            topics=[topic],
+            difficulty=difficulty,
+            question_count=min(POOL_REFILL_BATCH, POOL_TARGET_SIZE - pool_size),
+            question_types=[question_type] if question_type else None
+        )
+
+        # Only model output is pooled; bank questions would just repeat and templates are free to regenerate
+        questions = [q for q in questions if q.get("source") == "ai"]
+        if not questions:
+            return
+
+        await save_practice_questions(questions, write_behind=False)
+        logger.debug("Question pool refilled with %s questions for %s - %s (%s)", len(questions), subject, topic, difficulty)
+
+# Global question pool service instance
+question_pool_service = QuestionPoolService()
@@ -0,0 +1,394 @@
+import random
+from fractions import Fraction
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.services.question_bank import BankQuestion, match_unit, normalize_unit
+
+# Number ranges grow with difficulty
+DIFFICULTY_SCALE = {"easy": 1, "medium": 2, "hard": 3, "mixed": 2}
+OPTION_COUNT = 4
+
+TemplateFn = Callable[[random.Random, int], BankQuestion]
+
+# Registered templates: subject -> unit -> templates
+TEMPLATES: Dict[str, Dict[str, List[TemplateFn]]] = {}
+
+def question_template(subject: str, *units: str):
+    """Register ``template(rng, scale) -> BankQuestion`` for one or more units of a subject"""
+    def decorator(func):
+        for unit in units:
+            TEMPLATES.setdefault(subject, {}).setdefault(unit, []).append(func)
+        return func
+    return decorator
+
+def _num(value) -> str:
+    """Number without trailing zeros: 12, 2.5, 0.25"""
+    if isinstance(value, Fraction):
+        value = float(value)
+    if float(value).is_integer():
+        return str(int(value))
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+def _frac(value: Fraction) -> str:
+    return str(value.numerator) if value.denominator == 1 else f"{value.numerator}/{value.denominator}"
+
+def _options(correct: str, distractors: Iterable[str], rng: random.Random) -> Tuple[str, ...]:
+    """Correct answer plus the first distinct distractors, shuffled"""
+    options = [correct]
+    for distractor in distractors:
+        if distractor not in options:
+            options.append(distractor)
+            if len(options) == OPTION_COUNT:
+                break
+    rng.shuffle(options)
+    return tuple(options)
+
+def _numeric_distractors(answer: float, candidates: Iterable[float], unit: str = "") -> List[str]:
+    """Plausible wrong answers (common mistakes first), padded with near misses"""
+    suffix = f" {unit}" if unit else ""
+    values = [value for value in candidates if value != answer]
+    values += [answer + step for step in (1, -1, 2, 10) if answer + step >= 0 or answer < 0]
+    return [f"{_num(value)}{suffix}" for value in values]
+
+def _term(coefficient: int, variable: str, first: bool) -> str:
+    if coefficient == 0:
+        return ""
+    sign = "-" if coefficient < 0 else ("" if first else "+")
+    magnitude = abs(coefficient)
+    body = f"{'' if magnitude == 1 and variable else magnitude}{variable}"
+    return f"{sign}{body}" if first else f" {sign} {body}"
+
+def _quadratic(a: int, b: int, c: int) -> str:
+    return _term(a, "x²", True) + _term(b, "x", False) + _term(c, "", False)
+
+def _nonzero(rng: random.Random, low: int, high: int) -> int:
+    value = 0
+    while value == 0:
+        value = rng.randint(low, high)
+    return value
+
+PYTHAGOREAN_TRIPLES = [(3, 4, 5), (5, 12, 13), (8, 15, 17), (7, 24, 25), (6, 8, 10), (9, 12, 15)]
+
+# ---- Mathematics ----
+
+@question_template("math", "Quadratic Equations")
+def discriminant(rng: random.Random, scale: int) -> BankQuestion:
+    a = rng.randint(1, 3 * scale)
+    b = _nonzero(rng, -6 * scale, 6 * scale)
+    c = _nonzero(rng, -6 * scale, 6 * scale)
+    d = b * b - 4 * a * c
+    nature = "two distinct real roots" if d > 0 else ("two equal real roots" if d == 0 else "no real roots")
+    return BankQuestion(
+        f"What is the discriminant of the quadratic equation {_quadratic(a, b, c)} = 0?",
+        _options(_num(d), _numeric_distractors(d, [b * b + 4 * a * c, 4 * a * c - b * b, b * b - 2 * a * c, b - 4 * a * c]), rng),
+        _num(d),
+        f"D = b² - 4ac = ({b})² - 4({a})({c}) = {d}, so the equation has {nature}."
+    )
+
+@question_template("math", "Quadratic Equations")
+def quadratic_roots(rng: random.Random, scale: int) -> BankQuestion:
+    r1 = _nonzero(rng, -5 * scale, 5 * scale)
+    r2 = _nonzero(rng, -5 * scale, 5 * scale)
+    r1, r2 = min(r1, r2), max(r1, r2)
+    roots = lambda x, y: f"x = {min(x, y)}, x = {max(x, y)}"
+    return BankQuestion(
+        f"What are the roots of {_quadratic(1, -(r1 + r2), r1 * r2)} = 0?",
+        _options(roots(r1, r2), [roots(-r1, -r2), roots(r1, -r2), roots(-r1, r2), roots(r1 + r2, r1 * r2)], rng),
+        roots(r1, r2),
+        f"The equation factors as (x {'-' if r1 > 0 else '+'} {abs(r1)})(x {'-' if r2 > 0 else '+'} {abs(r2)}) = 0, "
+        f"so x = {r1} or x = {r2}. Check: the roots add to {r1 + r2} and multiply to {r1 * r2}."
+    )
+
+@question_template("math", "Coordinate Geometry")
+def point_distance(rng: random.Random, scale: int) -> BankQuestion:
+    dx, dy, d = rng.choice(PYTHAGOREAN_TRIPLES[:2 + 2 * scale])
+    if rng.random() < 0.5:
+        dx, dy = dy, dx
+    x1, y1 = rng.randint(-5 * scale, 5 * scale), rng.randint(-5 * scale, 5 * scale)
+    x2, y2 = x1 + rng.choice((-1, 1)) * dx, y1 + rng.choice((-1, 1)) * dy
+    return BankQuestion(
+        f"What is the distance between the points ({x1}, {y1}) and ({x2}, {y2})?",
+        _options(f"{d} units", _numeric_distractors(d, [dx + dy, d * d, abs(dx - dy), d + 2], "units"), rng),
+        f"{d} units",
+        f"Distance = √[({x2} - {x1})² + ({y2} - {y1})²] = √({dx * dx} + {dy * dy}) = √{d * d} = {d} units."
+    )
+
+@question_template("math", "Coordinate Geometry")
+def midpoint(rng: random.Random, scale: int) -> BankQuestion:
+    x1, y1 = rng.randint(-6 * scale, 6 * scale), rng.randint(-6 * scale, 6 * scale)
+    x2 = x1 + 2 * rng.randint(1, 4 * scale) * rng.choice((-1, 1))
+    y2 = y1 + 2 * rng.randint(1, 4 * scale) * rng.choice((-1, 1))
+    mx, my = (x1 + x2) // 2, (y1 + y2) // 2
+    point = lambda x, y: f"({x}, {y})"
+    return BankQuestion(
+        f"What is the midpoint of the line segment joining ({x1}, {y1}) and ({x2}, {y2})?",
+        _options(point(mx, my), [point(my, mx), point(x1 + x2, y1 + y2), point((x2 - x1) // 2, (y2 - y1) // 2), point(mx + 1, my - 1), point(mx - 1, my + 2), point(mx + 2, my)], rng),
+        point(mx, my),
+        f"Midpoint = ((x₁ + x₂)/2, (y₁ + y₂)/2) = (({x1} + {x2})/2, ({y1} + {y2})/2) = ({mx}, {my})."
+    )
+
+@question_template("math", "Real Numbers")
+def hcf_lcm(rng: random.Random, scale: int) -> BankQuestion:
+    hcf = rng.randint(2, 6 * scale)
+    p, q = rng.sample([2, 3, 5, 7, 11, 13][:3 + scale], 2)
+    a, b = hcf * p, hcf * q
+    lcm = hcf * p * q
+    if rng.random() < 0.5:
+        return BankQuestion(
+            f"What is the HCF of {a} and {b}?",
+            _options(_num(hcf), _numeric_distractors(hcf, [lcm, hcf * min(p, q), 1, hcf * 2]), rng),
+            _num(hcf),
+            f"{a} = {hcf} × {p} and {b} = {hcf} × {q}; since {p} and {q} share no factor, HCF = {hcf}."
+        )
+    return BankQuestion(
+        f"The HCF of {a} and {b} is {hcf}. What is their LCM?",
+        _options(_num(lcm), _numeric_distractors(lcm, [a * b, a * b // 2, lcm * 2, hcf * (p + q)]), rng),
+        _num(lcm),
+        f"HCF × LCM = product of the numbers, so LCM = ({a} × {b}) / {hcf} = {lcm}."
+    )
+
+@question_template("math", "Polynomials")
+def sum_product_of_zeroes(rng: random.Random, scale: int) -> BankQuestion:
+    a = rng.randint(1, 2 * scale)
+    b = a * _nonzero(rng, -5 * scale, 5 * scale)
+    c = a * _nonzero(rng, -5 * scale, 5 * scale)
+    polynomial = _quadratic(a, b, c)
+    if rng.random() < 0.5:
+        answer = Fraction(-b, a)
+        return BankQuestion(
+            f"What is the sum of the zeroes of the polynomial p(x) = {polynomial}?",
+            _options(_frac(answer), [_frac(value) for value in (Fraction(b, a), Fraction(c, a), Fraction(-c, a), Fraction(-b), answer + 1, answer - 1)], rng),
+            _frac(answer),
+            f"For ax² + bx + c the sum of zeroes is -b/a = -({b})/{a} = {_frac(answer)}."
+        )
+    answer = Fraction(c, a)
+    return BankQuestion(
+        f"What is the product of the zeroes of the polynomial p(x) = {polynomial}?",
+        _options(_frac(answer), [_frac(value) for value in (Fraction(-c, a), Fraction(-b, a), Fraction(b, a), Fraction(c), answer + 1, answer - 1)], rng),
+        _frac(answer),
+        f"For ax² + bx + c the product of zeroes is c/a = {c}/{a} = {_frac(answer)}."
+    )
+
+@question_template("math", "Introduction to Trigonometry")
+def right_triangle_ratio(rng: random.Random, scale: int) -> BankQuestion:
+    ab, bc, ac = rng.choice(PYTHAGOREAN_TRIPLES[:2 + 2 * scale])
+    if rng.random() < 0.5:
+        ab, bc = bc, ab
+    k = rng.randint(1, scale)
+    ab, bc, ac = ab * k, bc * k, ac * k
+    sides = {"sin A": ("BC/AC", bc, ac), "cos A": ("AB/AC", ab, ac), "tan A": ("BC/AB", bc, ab)}
+    ratios = {name: Fraction(top, bottom) for name, (_, top, bottom) in sides.items()}
+    asked = rng.choice(list(ratios))
+    answer = ratios[asked]
+    definition, top, bottom = sides[asked]
+    wrong = [Fraction(ab, bc), Fraction(ac, ab), Fraction(ac, bc)] + [value for name, value in ratios.items() if name != asked]
+    return BankQuestion(
+        f"In triangle ABC, right-angled at B, AB = {ab} cm, BC = {bc} cm and AC = {ac} cm. What is {asked}?",
+        _options(_frac(answer), [_frac(value) for value in wrong if value != answer], rng),
+        _frac(answer),
+        f"{asked} = {definition} = {top}/{bottom} = {_frac(answer)}."
+    )
+
+@question_template("math", "Arithmetic Progressions")
+def ap_nth_term(rng: random.Random, scale: int) -> BankQuestion:
+    a = rng.randint(-10 * scale, 10 * scale)
+    d = _nonzero(rng, -4 * scale, 4 * scale)
+    n = rng.randint(5, 10 * scale + 5)
+    answer = a + (n - 1) * d
+    terms = ", ".join(str(a + i * d) for i in range(3))
+    return BankQuestion(
+        f"What is the {n}th term of the AP {terms}, ...?",
+        _options(_num(answer), _numeric_distractors(answer, [a + n * d, a + (n - 2) * d, n * d, a - (n - 1) * d]), rng),
+        _num(answer),
+        f"aₙ = a + (n - 1)d = {a} + ({n} - 1)({d}) = {answer}."
+    )
+
+# ---- Physics ----
+
+@question_template("physics", "Force and Laws of Motion", "Laws of Motion")
+def newtons_second_law(rng: random.Random, scale: int) -> BankQuestion:
+    m = rng.randint(1, 10 * scale)
+    a = rng.randint(1, 5 * scale)
+    force = m * a
+    if rng.random() < 0.5:
+        return BankQuestion(
+            f"A net force acts on a body of mass {m} kg and gives it an acceleration of {a} m/s². What is the force?",
+            _options(f"{force} N", _numeric_distractors(force, [m + a, force * 2, force / 2, m * a * a], "N"), rng),
+            f"{force} N",
+            f"By Newton's second law, F = ma = {m} kg × {a} m/s² = {force} N."
+        )
+    return BankQuestion(
+        f"A force of {force} N acts on a body of mass {m} kg. What acceleration does it produce?",
+        _options(f"{a} m/s²", _numeric_distractors(a, [force * m, force - m, a * 2, force], "m/s²"), rng),
+        f"{a} m/s²",
+        f"a = F/m = {force} N / {m} kg = {a} m/s²."
+    )
+
+@question_template("physics", "Motion")
+def final_velocity(rng: random.Random, scale: int) -> BankQuestion:
+    u = rng.randint(0, 10 * scale)
+    a = rng.randint(1, 3 * scale)
+    t = rng.randint(2, 5 * scale)
+    v = u + a * t
+    return BankQuestion(
+        f"A car moving at {u} m/s accelerates uniformly at {a} m/s² for {t} s. What is its final velocity?",
+        _options(f"{v} m/s", _numeric_distractors(v, [a * t, u + a, u + 2 * a * t, u * t + a], "m/s"), rng),
+        f"{v} m/s",
+        f"v = u + at = {u} + {a} × {t} = {v} m/s."
+    )
+
+@question_template("physics", "Motion")
+def displacement(rng: random.Random, scale: int) -> BankQuestion:
+    u = rng.randint(0, 5 * scale)
+    a = 2 * rng.randint(1, 2 * scale)  # even, so the distance is a whole number
+    t = rng.randint(2, 4 * scale)
+    s = u * t + a * t * t // 2
+    return BankQuestion(
+        f"A body starts with a velocity of {u} m/s and moves with a uniform acceleration of {a} m/s². How far does it travel in {t} s?",
+        _options(f"{s} m", _numeric_distractors(s, [u * t + a * t * t, a * t * t // 2, u * t + a * t, u + a * t], "m"), rng),
+        f"{s} m",
+        f"s = ut + ½at² = {u} × {t} + ½ × {a} × {t}² = {s} m."
+    )
+
+@question_template("physics", "Work and Energy")
+def kinetic_energy(rng: random.Random, scale: int) -> BankQuestion:
+    m = 2 * rng.randint(1, 5 * scale)
+    v = rng.randint(1, 5 * scale)
+    energy = m * v * v // 2
+    return BankQuestion(
+        f"What is the kinetic energy of an object of mass {m} kg moving at {v} m/s?",
+        _options(f"{energy} J", _numeric_distractors(energy, [m * v * v, m * v // 2, m * v, energy * 4], "J"), rng),
+        f"{energy} J",
+        f"KE = ½mv² = ½ × {m} × {v}² = {energy} J."
+    )
+
+@question_template("physics", "Work and Energy")
+def work_done(rng: random.Random, scale: int) -> BankQuestion:
+    force = rng.randint(2, 20 * scale)
+    distance = rng.randint(2, 10 * scale)
+    work = force * distance
+    return BankQuestion(
+        f"A force of {force} N moves a box {distance} m in the direction of the force. How much work is done?",
+        _options(f"{work} J", _numeric_distractors(work, [force + distance, work / 2, work * 2, force * distance * distance], "J"), rng),
+        f"{work} J",
+        f"W = F × s = {force} N × {distance} m = {work} J."
+    )
+
+@question_template("physics", "Gravitation")
+def weight(rng: random.Random, scale: int) -> BankQuestion:
+    m = rng.randint(1, 30 * scale)
+    w = round(m * 9.8, 1)
+    return BankQuestion(
+        f"What is the weight of an object of mass {m} kg on the Earth? (g = 9.8 m/s²)",
+        _options(f"{_num(w)} N", _numeric_distractors(w, [m, round(m / 9.8, 2), round(w / 6, 1), round(m * 9.8 * 2, 1)], "N"), rng),
+        f"{_num(w)} N",
+        f"W = mg = {m} kg × 9.8 m/s² = {_num(w)} N. Mass stays {m} kg everywhere; weight depends on g."
+    )
+
+# ---- Chemistry ----
+
+ATOMIC_MASSES = {"H": 1, "C": 12, "N": 14, "O": 16, "Na": 23, "Mg": 24, "S": 32, "Cl": 35.5, "Ca": 40}
+COMPOUNDS = [
+    ("water", (("H", 2), ("O", 1))),
+    ("carbon dioxide", (("C", 1), ("O", 2))),
+    ("methane", (("C", 1), ("H", 4))),
+    ("ammonia", (("N", 1), ("H", 3))),
+    ("sodium chloride", (("Na", 1), ("Cl", 1))),
+    ("sulphuric acid", (("H", 2), ("S", 1), ("O", 4))),
+    ("calcium carbonate", (("Ca", 1), ("C", 1), ("O", 3))),
+    ("magnesium oxide", (("Mg", 1), ("O", 1))),
+    ("hydrochloric acid", (("H", 1), ("Cl", 1))),
+    ("sodium hydroxide", (("Na", 1), ("O", 1), ("H", 1))),
+    ("nitric acid", (("H", 1), ("N", 1), ("O", 3))),
+    ("calcium oxide", (("Ca", 1), ("O", 1))),
+    ("sulphur dioxide", (("S", 1), ("O", 2))),
+    ("ethane", (("C", 2), ("H", 6))),
+    ("glucose", (("C", 6), ("H", 12), ("O", 6))),
+    ("magnesium chloride", (("Mg", 1), ("Cl", 2))),
+]
+_SUBSCRIPTS = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+
+def _formula(atoms) -> str:
+    return "".join(symbol + (str(count).translate(_SUBSCRIPTS) if count > 1 else "") for symbol, count in atoms)
+
+def _atomic_masses(atoms) -> str:
+    return ", ".join(f"{symbol} = {_num(ATOMIC_MASSES[symbol])} u" for symbol, _ in atoms)
+
+@question_template("chemistry", "Atoms and Molecules")
+def molar_mass(rng: random.Random, scale: int) -> BankQuestion:
+    name, atoms = rng.choice(COMPOUNDS[:6 * scale])
+    mass = sum(ATOMIC_MASSES[symbol] * count for symbol, count in atoms)
+    unsubscripted = sum(ATOMIC_MASSES[symbol] for symbol, _ in atoms)
+    return BankQuestion(
+        f"What is the molecular mass of {name} ({_formula(atoms)})? ({_atomic_masses(atoms)})",
+        _options(f"{_num(mass)} u", _numeric_distractors(mass, [unsubscripted, mass + 16, mass - 1, mass * 2], "u"), rng),
+        f"{_num(mass)} u",
+        "Molecular mass = " + " + ".join(f"{count} × {_num(ATOMIC_MASSES[symbol])}" for symbol, count in atoms) + f" = {_num(mass)} u."
+    )
+
+@question_template("chemistry", "Atoms and Molecules")
+def moles_from_mass(rng: random.Random, scale: int) -> BankQuestion:
+    name, atoms = rng.choice(COMPOUNDS[:6 * scale])
+    molar = sum(ATOMIC_MASSES[symbol] * count for symbol, count in atoms)
+    moles = rng.randint(1, 4 * scale) / 2
+    mass = molar * moles
+    return BankQuestion(
+        f"How many moles are present in {_num(mass)} g of {name} ({_formula(atoms)})? ({_atomic_masses(atoms)})",
+        _options(f"{_num(moles)} mol", _numeric_distractors(moles, [moles * 2, moles / 2, round(molar / mass, 2), moles + 0.5], "mol"), rng),
+        f"{_num(moles)} mol",
+        f"Molar mass of {_formula(atoms)} = {_num(molar)} g/mol, so moles = {_num(mass)} g ÷ {_num(molar)} g/mol = {_num(moles)} mol."
+    )
+
+@question_template("chemistry", "Acids, Bases and Salts")
+def ph_from_concentration(rng: random.Random, scale: int) -> BankQuestion:
+    ph = rng.choice([value for value in range(1, 14) if value != 7] if scale > 1 else [1, 2, 3, 4, 10, 11, 12, 13])
+    nature = "acidic" if ph < 7 else "basic"
+    other = "basic" if nature == "acidic" else "acidic"
+    answer = f"pH = {ph}, {nature}"
+    exponent = str(-ph).replace("-", "⁻").translate(str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹"))
+    return BankQuestion(
+        f"A solution has a hydrogen ion concentration [H⁺] = 1 × 10{exponent} mol/L. What is its pH and nature?",
+        _options(answer, [f"pH = {ph}, {other}", f"pH = {14 - ph}, {nature}", f"pH = {14 - ph}, {other}", f"pH = {ph}, neutral"], rng),
+        answer,
+        f"pH = -log[H⁺] = {ph}. A pH below 7 is acidic and above 7 is basic, so the solution is {nature}."
+    )
+
+class QuestionTemplateEngine:
+    """Unlimited offline MCQs from parametric templates, ahead of the static fallback banks"""
+
+    def __init__(self, templates: Dict[str, Dict[str, List[TemplateFn]]] = TEMPLATES):
+        self.templates = templates
+        self._units = {
+            subject: {normalize_unit(unit): unit for unit in units}
+            for subject, units in templates.items()
+        }
+
+    def resolve_unit(self, subject: str, topic: str) -> Optional[str]:
+        """Template unit for a requested topic, or None when no template covers it"""
+        return match_unit(topic, self._units.get(subject.lower(), {}))
+
+    def generate(self, subject: str, units: List[str], count: int, difficulty: str = "medium",
+                 rng: Optional[random.Random] = None) -> List[Tuple[str, BankQuestion]]:
+        """Up to ``count`` distinct (unit, question) pairs, cycling through the units' templates"""
+        rng = rng or random.Random()
+        subject = subject.lower()
+        scale = DIFFICULTY_SCALE.get(getattr(difficulty, "value", difficulty), 2)
+        pool = [(unit, template) for unit in units for template in self.templates.get(subject, {}).get(unit, [])]
+        if not pool or count <= 0:
+            return []
+
+        questions, seen = [], set()
+        start = rng.randrange(len(pool))
+        for attempt in range(count * 20):  # small parameter spaces can repeat; give up eventually
+            unit, template = pool[(start + attempt) % len(pool)]
+            question = template(rng, scale)
+            if question.question in seen:
+                continue
+            seen.add(question.question)
+            questions.append((unit, question))
+            if len(questions) == count:
+                break
+        return questions
+
+# Global question template engine instance
+question_templates = QuestionTemplateEngine()
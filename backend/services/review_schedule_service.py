@@ -0,0 +1,109 @@
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List
+from pymongo.errors import DuplicateKeyError
+
+from backend.utils.database import get_database, Collections
+from backend.utils.job_queue import job_queue, job_handler
+from backend.services.ai_service import ai_service
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_REVIEW_JOB = "schedule_review"
+REVIEW_QUESTION_LIMIT = 5  # review tests are capped at this many questions
+
+class ReviewScheduleService:
+    """Spaced-repetition review tests scheduled in the background after each practice attempt
+
+    Submission only enqueues a job; the worker computes the review date, asks the AI
+    for study tips and keeps a single pending review per student, subject and topics.
+    """
+
+    @staticmethod
+    def attempt_topics(attempt: Dict[str, Any]) -> List[str]:
+        """Distinct topics covered by an attempt, in a stable order"""
+        return sorted({result.get("topic") or "General" for result in attempt.get("detailed_results", [])}) or ["General"]
+
+    @staticmethod
+    def review_key(subject: str, topics: List[str]) -> str:
+        return f"{subject}:{'|'.join(sorted(topics))}"
+
+    @staticmethod
+    async def enqueue_review(attempt: Dict[str, Any]):
+        """Queue "schedule review for this attempt"; a newer attempt on the same topics supersedes a queued one"""
+        topics = ReviewScheduleService.attempt_topics(attempt)
+        review_key = ReviewScheduleService.review_key(attempt["subject"], topics)
+        await job_queue.enqueue(
+            SCHEDULE_REVIEW_JOB,
+            {"attempt_id": attempt["id"]},
+            dedupe_key=f"{SCHEDULE_REVIEW_JOB}:{attempt['student_id']}:{review_key}"
+        )
+
+    @staticmethod
+    async def schedule_review(attempt: Dict[str, Any]) -> Dict[str, Any]:
+        """Create or replace the student's pending review for the attempt's subject and topics
+
+        A pending review scheduled from a newer attempt is left alone, so a slow job
+        for an older attempt cannot overwrite it.
+        """
+        db = get_database()
+        subject = attempt["subject"]
+        topics = ReviewScheduleService.attempt_topics(attempt)
+        recommendation = await ai_service.generate_smart_schedule_recommendation(
+            subject=subject,
+            topics=topics,
+            score=attempt["score"],
+            difficulty=attempt["difficulty"],
+            student_id=attempt["student_id"]
+        )
+
+        review_key = ReviewScheduleService.review_key(subject, topics)
+        attempt_at = attempt.get("completed_at") or attempt.get("created_at") or datetime.utcnow()
+        review_filter = {
+            "user_id": attempt["student_id"],
+            "review_key": review_key,
+            "is_completed": False,
+            "$or": [
+                {"source_attempt_at": {"$lte": attempt_at}},
+                {"source_attempt_at": {"$exists": False}}
+            ]
+        }
+        update = {
+            "$set": {
+                "subject": subject,
+                "topics": topics,
+                "difficulty": attempt["difficulty"],
+                "question_count": min(attempt["total_questions"], REVIEW_QUESTION_LIMIT),
+                "scheduled_for": recommendation["recommended_date"],
+                "reason": recommendation["reason"],
+                "priority": recommendation["priority"],
+                "original_score": attempt["score"],
+                "study_tips": recommendation.get("study_tips", []),
+                "estimated_improvement": recommendation.get("estimated_improvement", ""),
+                "source_attempt_id": attempt["id"],
+                "source_attempt_at": attempt_at
+            },
+            "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": datetime.utcnow()}
+        }
+        for _ in range(2):
+            try:
+                await db[Collections.SCHEDULED_TESTS].update_one(review_filter, update, upsert=True)
+                break
+            except DuplicateKeyError:
+                # Lost an insert race (the retry updates the winner's review), or the pending
+                # review comes from a newer attempt and the filter cannot match it
+                continue
+        else:
+            logger.debug("Newer review already pending for %s %s, skipping attempt %s", attempt['student_id'], review_key, attempt['id'])
+        return recommendation
+
+@job_handler(SCHEDULE_REVIEW_JOB)
+async def run_schedule_review(payload: Dict[str, Any]):
+    """Background job: schedule the review test for one practice attempt"""
+    db = get_database()
+    attempt = await db[Collections.PRACTICE_ATTEMPTS].find_one({"id": payload["attempt_id"]})
+    if attempt is None:
+        logger.warning("Practice attempt %s not found, skipping review scheduling", payload['attempt_id'])
+        return
+    await ReviewScheduleService.schedule_review(attempt)
@@ -0,0 +1,91 @@
+import logging
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from backend.utils.database import get_database, Collections
+
+logger = logging.getLogger(__name__)
+
+RECENT_ATTEMPTS_LIMIT = 10  # last-N attempts kept on each rollup
+
+class StudentStatsService:
+    """Per-(student, subject) practice statistics maintained incrementally on each submission"""
+
+    @staticmethod
+    async def record_attempt(
+        student_id: str,
+        subject: str,
+        attempt_id: str,
+        score: float,
+        total_questions: int,
+        time_taken: float,
+        difficulty: str,
+        completed_at: Optional[datetime] = None
+    ):
+        """Fold one attempt into the student's subject rollup with a single atomic update"""
+        db = get_database()
+        completed_at = completed_at or datetime.utcnow()
+
+        await db[Collections.STUDENT_SUBJECT_STATS].update_one(
+            {"student_id": student_id, "subject": subject},
+            {
+                "$inc": {
+                    "count": 1,
+                    "score_sum": score,
+                    "score_sum_sq": score * score,
+                    "total_questions": total_questions or 0,
+                    "total_time": time_taken or 0
+                },
+                "$max": {"best_score": score, "last_attempt_at": completed_at},
+                "$min": {"worst_score": score, "first_attempt_at": completed_at},
+                "$push": {
+                    "recent_attempts": {
+                        "$each": [{
+                            "id": attempt_id,
+                            "score": score,
+                            "total_questions": total_questions or 0,
+                            "difficulty": difficulty,
+                            "completed_at": completed_at
+                        }],
+                        "$slice": -RECENT_ATTEMPTS_LIMIT
+                    }
+                },
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    async def get_subject_rollup(student_id: str, subject: str) -> Optional[Dict[str, Any]]:
+        """Get the rollup document for one subject"""
+        db = get_database()
+        return await db[Collections.STUDENT_SUBJECT_STATS].find_one(
+            {"student_id": student_id, "subject": subject},
+            {"_id": 0}
+        )
+
+    @staticmethod
+    async def get_all_rollups(student_id: str) -> List[Dict[str, Any]]:
+        """Get rollup documents for every subject the student has practiced"""
+        db = get_database()
+        return await db[Collections.STUDENT_SUBJECT_STATS].find(
+            {"student_id": student_id},
+            {"_id": 0}
+        ).to_list(100)
+
+    @staticmethod
+    def average(rollup: Dict[str, Any]) -> float:
+        """Mean score of a rollup"""
+        count = rollup.get("count", 0)
+        return rollup.get("score_sum", 0) / count if count else 0.0
+
+    @staticmethod
+    def stdev(rollup: Dict[str, Any]) -> float:
+        """Sample standard deviation of a rollup's scores"""
+        count = rollup.get("count", 0)
+        if count < 2:
+            return 0.0
+        mean = StudentStatsService.average(rollup)
+        variance = (rollup.get("score_sum_sq", 0) - count * mean * mean) / (count - 1)
+        return math.sqrt(max(variance, 0.0))
@@ -0,0 +1,190 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Standard Pomodoro timings (minutes); break_preferences can override them per plan
+WORK_SESSION_MINUTES = 25
+MIN_WORK_SESSION_MINUTES = 10  # shorter leftovers are merged by splitting a subject evenly
+SHORT_BREAK_MINUTES = 5
+LONG_BREAK_MINUTES = 15
+LONG_BREAK_INTERVAL = 4  # work sessions between long breaks at most
+
+# Cost model weights, in units of "one full session of the heaviest subject"
+FATIGUE_PER_SESSION = 0.15  # load multiplier growth per session since the last long break
+LONG_BREAK_LOAD = 3.0  # accumulated load that earns a long break before the interval is up
+SWITCH_PENALTY = 0.1  # any change of subject
+SAME_KIND_PENALTY = 0.5  # switching between two subjects that use the same kind of thinking
+MONOTONY_PENALTY = 0.6  # each session beyond MAX_SUBJECT_RUN in a row on one subject
+MAX_SUBJECT_RUN = 2
+PRIORITY_DELAY = {"high": 0.1, "medium": 0.05, "low": 0.02}  # cost per session a subject waits
+
+# (kind of thinking, cognitive load) per subject; unknown subjects are treated as moderate
+SUBJECT_PROFILES: Dict[str, Tuple[str, float]] = {
+    "math": ("analytical", 1.0),
+    "mathematics": ("analytical", 1.0),
+    "physics": ("analytical", 0.95),
+    "chemistry": ("analytical", 0.85),
+    "computer science": ("analytical", 0.8),
+    "economics": ("analytical", 0.7),
+    "biology": ("creative", 0.65),
+    "english": ("creative", 0.5),
+    "history": ("creative", 0.55),
+    "geography": ("creative", 0.5),
+}
+DEFAULT_PROFILE = ("general", 0.6)
+
+@dataclass(frozen=True)
+class StudyBlock:
+    """One work session of a subject"""
+    subject: str
+    minutes: int
+    kind: str
+    load: float
+    priority: str
+
+@dataclass(frozen=True)
+class PlanItem:
+    """A work session or a break, in plan order"""
+    session_type: str  # work, short_break or long_break
+    minutes: int
+    subject: Optional[str] = None
+
+class _PlanState(NamedTuple):
+    position: int = 0
+    previous: Optional[StudyBlock] = None
+    run: int = 0
+    sessions_since_long_break: int = 0
+    load_since_long_break: float = 0.0
+
+def split_sessions(minutes: int, session_minutes: int = WORK_SESSION_MINUTES,
+                   min_minutes: int = MIN_WORK_SESSION_MINUTES) -> List[int]:
+    """Split a subject's time into sessions of at most ``session_minutes``
+
+    Full sessions plus the remainder, unless the remainder would be a fragment shorter
+    than ``min_minutes``; then the time is spread evenly over the same number of sessions.
+    """
+    if minutes <= 0:
+        return []
+    count = -(-minutes // session_minutes)
+    remainder = minutes - (count - 1) * session_minutes
+    if count == 1 or remainder >= min_minutes:
+        return [session_minutes] * (count - 1) + [remainder]
+    base, extra = divmod(minutes, count)
+    return [base + 1] * extra + [base] * (count - extra)
+
+def subject_profile(subject: str) -> Tuple[str, float]:
+    return SUBJECT_PROFILES.get(subject.strip().lower(), DEFAULT_PROFILE)
+
+class StudyPlanOptimizer:
+    """Deterministic Pomodoro plan builder driven by an explicit cost model
+
+    A plan costs the cognitive load of each session scaled by fatigue since the last
+    long break, plus penalties for switching subjects (more for the same kind of
+    thinking back to back), long runs on one subject and delaying high-priority
+    subjects. Sessions are placed greedily by the cost of doing them now less the
+    cost of making them wait one more session (so heavy and urgent work goes first
+    while the student is fresh), and the request's own order is kept if the greedy
+    plan is not cheaper. Breaks follow every session;
+    a long break comes after ``long_break_interval`` sessions or enough load.
+    """
+
+    def __init__(self, session_minutes: int = WORK_SESSION_MINUTES, short_break_minutes: int = SHORT_BREAK_MINUTES,
+                 long_break_minutes: int = LONG_BREAK_MINUTES, long_break_interval: int = LONG_BREAK_INTERVAL):
+        self.session_minutes = session_minutes
+        self.short_break_minutes = short_break_minutes
+        self.long_break_minutes = long_break_minutes
+        self.long_break_interval = long_break_interval
+
+    @classmethod
+    def from_preferences(cls, break_preferences: Optional[Dict[str, Any]] = None) -> "StudyPlanOptimizer":
+        """Optimizer honouring the plan request's break preferences, ignoring invalid values"""
+        settings = {}
+        for key, low, high in (("session_minutes", 10, 60), ("short_break_minutes", 1, 15),
+                               ("long_break_minutes", 5, 45), ("long_break_interval", 2, 8)):
+            value = (break_preferences or {}).get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and low <= value <= high:
+                settings[key] = int(value)
+        return cls(**settings)
+
+    def blocks(self, subjects: List[Dict[str, Any]]) -> List[StudyBlock]:
+        """Work sessions for each requested subject, in request order"""
+        blocks = []
+        for item in subjects:
+            kind, load = subject_profile(item["subject"])
+            priority = item.get("priority") if item.get("priority") in PRIORITY_DELAY else "medium"
+            min_minutes = min(MIN_WORK_SESSION_MINUTES, self.session_minutes)
+            for minutes in split_sessions(int(item["duration_minutes"]), self.session_minutes, min_minutes):
+                blocks.append(StudyBlock(item["subject"], minutes, kind, load, priority))
+        return blocks
+
+    def _step(self, state: _PlanState, block: StudyBlock) -> Tuple[float, _PlanState]:
+        """Marginal cost of doing ``block`` next, and the state after it (including its break)"""
+        load = block.load * block.minutes / self.session_minutes
+        cost = load * (1 + FATIGUE_PER_SESSION * state.sessions_since_long_break)
+        cost += PRIORITY_DELAY[block.priority] * state.position
+
+        previous = state.previous
+        run = 1
+        if previous is not None:
+            if previous.subject != block.subject:
+                cost += SWITCH_PENALTY
+                if previous.kind == block.kind:
+                    cost += SAME_KIND_PENALTY
+            else:
+                run = state.run + 1
+                if run > MAX_SUBJECT_RUN:
+                    cost += MONOTONY_PENALTY
+
+        sessions = state.sessions_since_long_break + 1
+        accumulated = state.load_since_long_break + load
+        if sessions >= self.long_break_interval or accumulated >= LONG_BREAK_LOAD:
+            sessions, accumulated = 0, 0.0  # the break after this session is a long one
+        return cost, _PlanState(state.position + 1, block, run, sessions, accumulated)
+
+    def cost(self, order: List[StudyBlock]) -> float:
+        """Total cost of doing the sessions in this order"""
+        state, total = _PlanState(), 0.0
+        for block in order:
+            cost, state = self._step(state, block)
+            total += cost
+        return total
+
+    def order(self, blocks: List[StudyBlock]) -> List[StudyBlock]:
+        """Cheapest order found: greedy by marginal cost net of waiting, or the given order if that is no worse"""
+        queues: Dict[str, List[StudyBlock]] = {}
+        for block in blocks:
+            queues.setdefault(block.subject, []).append(block)
+
+        state, greedy = _PlanState(), []
+        while len(greedy) < len(blocks):
+            best = None
+            for subject, queue in queues.items():  # request order breaks ties
+                if queue:
+                    block = queue[0]
+                    cost, next_state = self._step(state, block)
+                    # Net of what the same block would cost one session later: heavy and urgent work wins
+                    load = block.load * block.minutes / self.session_minutes
+                    cost -= load * (1 + FATIGUE_PER_SESSION * (state.sessions_since_long_break + 1))
+                    cost -= PRIORITY_DELAY[block.priority] * (state.position + 1)
+                    if best is None or cost < best[0]:
+                        best = (cost, next_state, subject)
+            _, state, subject = best
+            greedy.append(queues[subject].pop(0))
+
+        return greedy if self.cost(greedy) < self.cost(blocks) else list(blocks)
+
+    def schedule(self, order: List[StudyBlock]) -> List[PlanItem]:
+        """Interleave breaks: after every session but the last, long ones where the cost model resets fatigue"""
+        items, state = [], _PlanState()
+        for index, block in enumerate(order):
+            _, state = self._step(state, block)
+            items.append(PlanItem("work", block.minutes, block.subject))
+            if index < len(order) - 1:
+                if state.sessions_since_long_break == 0:
+                    items.append(PlanItem("long_break", self.long_break_minutes))
+                else:
+                    items.append(PlanItem("short_break", self.short_break_minutes))
+        return items
+
+    def optimize(self, subjects: List[Dict[str, Any]]) -> List[PlanItem]:
+        """Plan items for the requested subjects"""
+        return self.schedule(self.order(self.blocks(subjects)))
@@ -0,0 +1,112 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from backend.utils.database import get_database, Collections
+
+logger = logging.getLogger(__name__)
+
+RECENT_EXCHANGES_LIMIT = 3  # exchanges quoted verbatim in the tutor prompt
+SUMMARY_POINTS_LIMIT = 10  # earlier questions kept in the rolling summary
+SUMMARY_POINT_CHARS = 120  # each summarized question is cut to this length
+
+DIRECT_ANSWER_PHRASES = ('what is', 'give me', 'tell me', 'answer is')
+STAT_FIELDS = ("exchanges", "direct_answer_requests", "question_chars")
+
+class TutorSessionService:
+    """Conversation state kept on each chat session and updated with every exchange
+
+    ``conversation_state`` holds the last few exchanges, a rolling summary of the
+    questions that scrolled out of them and learning-pattern counters, so building
+    the tutor context costs one session read however long the session runs.
+    """
+
+    @staticmethod
+    def exchange_stats(message: str) -> Dict[str, int]:
+        """Counter increments contributed by one student message"""
+        message_lower = message.lower()
+        return {
+            "exchanges": 1,
+            "direct_answer_requests": int(any(phrase in message_lower for phrase in DIRECT_ANSWER_PHRASES)),
+            "question_chars": len(message)
+        }
+
+    @staticmethod
+    def summary_point(message: str) -> str:
+        """Short form of a question for the rolling summary"""
+        message = " ".join(message.split())
+        return message if len(message) <= SUMMARY_POINT_CHARS else message[:SUMMARY_POINT_CHARS - 3] + "..."
+
+    @staticmethod
+    def build_context(session: Dict[str, Any]) -> Dict[str, Any]:
+        """Tutor context (recent exchanges, summary, counters) from a session document"""
+        state = session.get("conversation_state") or {}
+        return {
+            "learning_insights": [],
+            "conversation_history": state.get("recent_exchanges", []),
+            "summary_points": state.get("summary_points", []),
+            "learning_stats": {field: state.get(field, 0) for field in STAT_FIELDS}
+        }
+
+    @staticmethod
+    async def record_exchange(session: Dict[str, Any], message: str, response: str, timestamp: Optional[datetime] = None):
+        """Fold one exchange into the session state in the same write that bumps its activity
+
+        The window and summary are computed from the stored document inside the update,
+        so overlapping messages in one session neither lose nor repeat a summary point.
+        """
+        db = get_database()
+        exchange = {"user": message, "assistant": response, "summary": TutorSessionService.summary_point(message)}
+        exchanges = {"$concatArrays": [{"$ifNull": ["$conversation_state.recent_exchanges", []]}, [{"$literal": exchange}]]}
+        # Exchanges that scroll out of the verbatim window leave their question in the summary
+        scrolled = {"$cond": [
+            {"$gt": [{"$size": "$$exchanges"}, RECENT_EXCHANGES_LIMIT]},
+            {"$slice": ["$$exchanges", {"$subtract": [{"$size": "$$exchanges"}, RECENT_EXCHANGES_LIMIT]}]},
+            []
+        ]}
+        summary_points = {"$map": {
+            "input": scrolled,
+            "as": "exchange",
+            "in": {"$ifNull": ["$$exchange.summary", {"$substrCP": ["$$exchange.user", 0, SUMMARY_POINT_CHARS]}]}
+        }}
+
+        fields = {
+            f"conversation_state.{field}": {"$add": [{"$ifNull": [f"$conversation_state.{field}", 0]}, value]}
+            for field, value in TutorSessionService.exchange_stats(message).items()
+        }
+        fields["conversation_state.recent_exchanges"] = {"$let": {
+            "vars": {"exchanges": exchanges},
+            "in": {"$slice": ["$$exchanges", -RECENT_EXCHANGES_LIMIT]}
+        }}
+        fields["conversation_state.summary_points"] = {"$let": {
+            "vars": {"exchanges": exchanges},
+            "in": {"$slice": [
+                {"$concatArrays": [{"$ifNull": ["$conversation_state.summary_points", []]}, summary_points]},
+                -SUMMARY_POINTS_LIMIT
+            ]}
+        }}
+        await db[Collections.CHAT_SESSIONS].update_one(
+            {"id": session["id"]},
+            [{"$set": {
+                "last_activity": timestamp or datetime.utcnow(),
+                "message_count": {"$add": [{"$ifNull": ["$message_count", 0]}, 1]},
+                **fields
+            }}]
+        )
+
+    @staticmethod
+    def state_from_messages(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Conversation state for a session's messages in chronological order"""
+        exchanges = [
+            {"user": msg["message"], "assistant": msg["response"], "summary": TutorSessionService.summary_point(msg["message"])}
+            for msg in messages if msg.get("message") and msg.get("response")
+        ]
+        state: Dict[str, Any] = {field: 0 for field in STAT_FIELDS}
+        for exchange in exchanges:
+            for field, value in TutorSessionService.exchange_stats(exchange["user"]).items():
+                state[field] += value
+
+        earlier = exchanges[:-RECENT_EXCHANGES_LIMIT]
+        state["recent_exchanges"] = exchanges[-RECENT_EXCHANGES_LIMIT:]
+        state["summary_points"] = [TutorSessionService.summary_point(exchange["user"]) for exchange in earlier][-SUMMARY_POINTS_LIMIT:]
+        return state
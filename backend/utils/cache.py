@@ -0,0 +1,210 @@
+import logging
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from dotenv import load_dotenv
+
+from backend.utils.database import get_database, Collections
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "mongo")  # "memory" or "mongo" (memory + shared MongoDB tier)
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+CACHE_DURATION = timedelta(hours=int(os.getenv("LLM_CACHE_TTL_HOURS", "2")))
+
+class MemoryCacheBackend:
+    """Process-local LRU cache with per-entry TTL; every operation is O(1)"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: timedelta = CACHE_DURATION):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a live entry and mark it as most recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[timedelta] = None):
+        """Store an entry, evicting the least recently used ones past capacity"""
+        expires_at = time.monotonic() + (ttl or self.ttl).total_seconds()
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def delete(self, key: str):
+        """Remove an entry if present"""
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class MongoCacheBackend:
+    """Cache tier shared by every worker and restart, expired by a MongoDB TTL index"""
+
+    def __init__(self, ttl: timedelta = CACHE_DURATION):
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a live entry from the shared collection"""
+        db = get_database()
+        if db is None:
+            return None
+
+        try:
+            # The TTL monitor runs once a minute, so filter out entries it has not reaped yet
+            doc = await db[Collections.LLM_RESPONSE_CACHE].find_one({
+                "_id": key,
+                "expires_at": {"$gt": datetime.utcnow()}
+            })
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("Shared cache read failed: %s", e)
+            return None
+
+        if doc is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return doc["response"]
+
+    async def set(self, key: str, value: str, ttl: Optional[timedelta] = None):
+        """Upsert an entry into the shared collection"""
+        db = get_database()
+        if db is None:
+            return
+
+        now = datetime.utcnow()
+        try:
+            await db[Collections.LLM_RESPONSE_CACHE].update_one(
+                {"_id": key},
+                {"$set": {
+                    "response": value,
+                    "created_at": now,
+                    "expires_at": now + (ttl or self.ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("Shared cache write failed: %s", e)
+
+    async def delete(self, key: str):
+        """Remove an entry from the shared collection"""
+        db = get_database()
+        if db is None:
+            return
+
+        try:
+            await db[Collections.LLM_RESPONSE_CACHE].delete_one({"_id": key})
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("Shared cache delete failed: %s", e)
+
+class ResponseCache:
+    """Two-tier response cache: in-memory LRU in front of an optional shared tier"""
+
+    def __init__(self, memory: MemoryCacheBackend, shared: Optional[MongoCacheBackend] = None):
+        self.memory = memory
+        self.shared = shared
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up the memory tier first, then the shared tier, promoting shared hits"""
+        value = self.memory.get(key)
+        if value is not None or self.shared is None:
+            return value
+
+        value = await self.shared.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[timedelta] = None):
+        """Write through to every tier"""
+        self.memory.set(key, value, ttl)
+        if self.shared is not None:
+            await self.shared.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        """Remove an entry from every tier"""
+        self.memory.delete(key)
+        if self.shared is not None:
+            await self.shared.delete(key)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit, miss and eviction counters per tier"""
+        stats = {"memory": {**self.memory.stats, "size": len(self.memory)}}
+        if self.shared is not None:
+            stats["shared"] = dict(self.shared.stats)
+        return stats
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key onto one in-flight computation
+
+    The work runs as its own task, so a caller that goes away (a disconnected client)
+    does not cancel it for the others waiting on the same key.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    async def join(self, key: Hashable) -> Optional[Any]:
+        """Result of the call running under this key, or None when nothing is running"""
+        task = self._inflight.get(key)
+        if task is None:
+            return None
+        self.stats["shared"] += 1
+        return await asyncio.shield(task)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run ``func`` unless the same key is already running; returns (result, shared)"""
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.stats["shared"] += 1
+        else:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finished(key, done))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every caller went away
+
+def create_response_cache(backend: str = CACHE_BACKEND) -> ResponseCache:
+    """Build the response cache for the configured backend"""
+    shared = MongoCacheBackend() if backend == "mongo" else None
+    return ResponseCache(MemoryCacheBackend(), shared)
+
+# Global response cache instance
+response_cache = create_response_cache()
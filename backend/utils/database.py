@@ -1,37 +1,97 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime
+from typing import Any, Dict, List, Set
+import asyncio
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Database configuration
 MONGO_URL = os.getenv("MONGO_URL")
 DB_NAME = os.getenv("DB_NAME", "air_project_k")
+QUESTION_WRITE_BEHIND = os.getenv("QUESTION_WRITE_BEHIND", "false").lower() == "true"
 
 # Global database client
 client = None
 db = None
 
+# In-flight write-behind tasks (kept referenced until they finish)
+_background_writes: Set[asyncio.Task] = set()
+
 async def connect_to_database():
     """Initialize database connection"""
     global client, db
     client = AsyncIOMotorClient(MONGO_URL)
     db = client[DB_NAME]
-    print(f"Connected to MongoDB database: {DB_NAME}")
+    logger.info("Connected to MongoDB database: %s", DB_NAME)
 
 async def close_database_connection():
     """Close database connection"""
     global client
     if client:
         client.close()
-        print("Disconnected from MongoDB")
+        logger.info("Disconnected from MongoDB")
 
 def get_database():
     """Get database instance"""
     return db
 
+async def save_practice_questions(questions: List[Dict[str, Any]], write_behind: bool = QUESTION_WRITE_BEHIND):
+    """Persist generated practice questions with a single unordered bulk upsert
+    
+    Question IDs are content hashes, so a question that is already stored is left
+    as is instead of being inserted again. In write-behind mode the write is
+    scheduled in the background and this returns immediately, so callers can
+    respond before MongoDB acknowledges it.
+    """
+    if not questions:
+        return
+    
+    now = datetime.utcnow()
+    for question in questions:
+        question.setdefault("created_at", now)
+    # Write copies so the caller's dicts don't pick up an ObjectId _id; one per ID
+    documents = list({question["id"]: dict(question) for question in questions}.values())
+    
+    if write_behind:
+        task = asyncio.create_task(_upsert_practice_questions(documents, raise_errors=False))
+        _background_writes.add(task)
+        task.add_done_callback(_background_writes.discard)
+    else:
+        await _upsert_practice_questions(documents, raise_errors=True)
+
+async def _upsert_practice_questions(documents: List[Dict[str, Any]], raise_errors: bool):
+    """Insert questions whose ID is not stored yet, tolerating concurrent inserts of the same ID"""
+    operations = [
+        UpdateOne({"id": document["id"]}, {"$setOnInsert": document}, upsert=True)
+        for document in documents
+    ]
+    try:
+        await db[Collections.PRACTICE_QUESTIONS].bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in write_errors):
+            logger.error("Failed to save practice questions: %s", write_errors)
+            if raise_errors:
+                raise
+    except Exception as e:
+        logger.error("Failed to save practice questions: %s", e)
+        if raise_errors:
+            raise
+
+async def flush_background_writes():
+    """Wait for pending write-behind inserts to finish"""
+    if _background_writes:
+        await asyncio.gather(*list(_background_writes), return_exceptions=True)
+
 # Custom JSON encoder for MongoDB ObjectId
 def convert_objectid_to_str(data):
     """Convert MongoDB ObjectId to string for JSON serialization"""
@@ -61,41 +121,9 @@ class Collections:
     NOTIFICATIONS = "notifications"
     STUDY_PLANS = "study_plans"
     SCHEDULED_TESTS = "scheduled_tests"
-
-async def create_indexes():
-    """Create database indexes for better performance"""
-    # User indexes
-    await db[Collections.USERS].create_index("email", unique=True)
-    await db[Collections.USERS].create_index("user_type")
-    
-    # Profile indexes
-    await db[Collections.STUDENT_PROFILES].create_index("user_id", unique=True)
-    await db[Collections.TEACHER_PROFILES].create_index("user_id", unique=True)
-    
-    # Classroom indexes
-    await db[Collections.CLASSROOMS].create_index("join_code", unique=True)
-    await db[Collections.CLASSROOMS].create_index("teacher_id")
-    
-    # Chat indexes
-    await db[Collections.CHAT_SESSIONS].create_index([("user_id", 1), ("subject", 1)])
-    await db[Collections.CHAT_MESSAGES].create_index("session_id")
-    
-    # Practice test indexes
-    await db[Collections.PRACTICE_QUESTIONS].create_index([("subject", 1), ("topic", 1)])
-    await db[Collections.PRACTICE_ATTEMPTS].create_index("student_id")
-    
-    # Content indexes
-    await db[Collections.STUDENT_NOTES].create_index("user_id")
-    await db[Collections.CALENDAR_EVENTS].create_index([("user_id", 1), ("start_time", 1)])
-    await db[Collections.NOTIFICATIONS].create_index([("user_id", 1), ("created_at", -1)])
-    
-    # Study planner indexes
-    await db[Collections.STUDY_PLANS].create_index([("user_id", 1), ("created_at", -1)])
-    await db[Collections.STUDY_PLANS].create_index("plan_id", unique=True)
-    
-    # Scheduled tests indexes
-    await db[Collections.SCHEDULED_TESTS].create_index([("user_id", 1), ("scheduled_for", 1)])
-    await db[Collections.SCHEDULED_TESTS].create_index("id", unique=True)
-    await db[Collections.SCHEDULED_TESTS].create_index([("user_id", 1), ("is_completed", 1)])
-    
-    print("Database indexes created successfully")
\ No newline at end of file
+    LLM_RESPONSE_CACHE = "llm_response_cache"
+    SCHEMA_MIGRATIONS = "schema_migrations"
+    STUDENT_SUBJECT_STATS = "student_subject_stats"
+    CLASS_ANALYTICS_SNAPSHOTS = "class_analytics_snapshots"
+    TEACHER_ANALYTICS_SNAPSHOTS = "teacher_analytics_snapshots"
+    BACKGROUND_JOBS = "background_jobs"
@@ -1,11 +1,10 @@
 import hashlib
-from datetime import datetime, timedelta
+import unicodedata
+from datetime import datetime
 from typing import Any, Dict, Optional
 import json
 
-# Simple in-memory cache (in production, use Redis)
-api_cache = {}
-CACHE_DURATION = timedelta(hours=2)  # Reduced cache for better question variety
+from backend.utils.cache import response_cache
 
 class CacheUtils:
     @staticmethod
@@ -16,31 +15,19 @@ class CacheUtils:
         return hashlib.md5(cache_data.encode()).hexdigest()
     
     @staticmethod
-    def get_cached_response(cache_key: str) -> Optional[str]:
+    async def get_cached_response(cache_key: str) -> Optional[str]:
         """Get cached response if it exists and is valid"""
-        if cache_key in api_cache:
-            cached_item = api_cache[cache_key]
-            if datetime.utcnow() - cached_item['timestamp'] < CACHE_DURATION:
-                return cached_item['response']
-            else:
-                # Remove expired cache
-                del api_cache[cache_key]
-        return None
+        return await response_cache.get(cache_key)
     
     @staticmethod
-    def cache_response(cache_key: str, response: str):
-        """Cache a response"""
-        api_cache[cache_key] = {
-            'response': response,
-            'timestamp': datetime.utcnow()
-        }
-        
-        # Simple cache cleanup - remove old entries (keep last 1000)
-        if len(api_cache) > 1000:
-            oldest_keys = sorted(api_cache.keys(), 
-                               key=lambda k: api_cache[k]['timestamp'])[:100]
-            for key in oldest_keys:
-                del api_cache[key]
+    async def cache_response(cache_key: str, response: str):
+        """Cache a response in the local and shared tiers"""
+        await response_cache.set(cache_key, response)
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Dict[str, int]]:
+        """Get hit, miss and eviction counters for the response cache"""
+        return response_cache.get_stats()
 
 class ValidationUtils:
     @staticmethod
@@ -156,4 +143,27 @@ class DateUtils:
     @staticmethod
     def days_between(date1: datetime, date2: datetime) -> int:
         """Calculate days between two dates"""
-        return abs((date2 - date1).days)
\ No newline at end of file
+        return abs((date2 - date1).days)
+
+class QuestionUtils:
+    @staticmethod
+    def normalize_text(text: Any) -> str:
+        """Canonical form of question text: Unicode-normalized, case-folded, single-spaced"""
+        return " ".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+    
+    @staticmethod
+    def content_id(question: Dict[str, Any]) -> str:
+        """Stable question ID from its normalized subject, type, text, options and answer
+        
+        Identical questions get the same ID in every process and on every call,
+        whatever the option order or spacing.
+        """
+        normalize = QuestionUtils.normalize_text
+        canonical = json.dumps([
+            normalize(getattr(question.get("subject"), "value", question.get("subject") or "")),
+            normalize(getattr(question.get("question_type"), "value", question.get("question_type") or "")),
+            normalize(question.get("question_text", "")),
+            sorted(normalize(option) for option in question.get("options") or []),
+            normalize(question.get("correct_answer", ""))
+        ], ensure_ascii=False, separators=(",", ":"))
+        return "q_" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:24]
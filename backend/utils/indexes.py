@@ -0,0 +1,303 @@
+import logging
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, IndexModel, monitoring
+
+from backend.utils.database import get_database, Collections
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Explain every new query shape and report collection scans (dev/test only)
+QUERY_PLAN_CHECK_ENABLED = os.getenv("QUERY_PLAN_CHECK_ENABLED", "false").lower() == "true"
+# Drop indexes that exist in MongoDB but are no longer declared below
+DROP_UNDECLARED_INDEXES = os.getenv("DROP_UNDECLARED_INDEXES", "false").lower() == "true"
+
+IndexKeys = Tuple[Tuple[str, int], ...]
+
+@dataclass(frozen=True)
+class Index:
+    """One declared index; ``keys`` are (field, direction) pairs in index order"""
+    keys: IndexKeys
+    unique: bool = False
+    sparse: bool = False
+    expire_after_seconds: Optional[int] = None
+    partial_filter: Optional[Dict[str, Any]] = None
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    @property
+    def fields(self) -> List[str]:
+        return [field for field, _ in self.keys]
+
+    def to_model(self) -> IndexModel:
+        options: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.sparse:
+            options["sparse"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        if self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return IndexModel(list(self.keys), **options)
+
+def index(*keys, unique: bool = False, sparse: bool = False, expire_after_seconds: Optional[int] = None,
+          partial_filter: Optional[Dict[str, Any]] = None) -> Index:
+    """Declare an index from field names or (field, direction) pairs"""
+    pairs = tuple(key if isinstance(key, tuple) else (key, ASCENDING) for key in keys)
+    return Index(pairs, unique=unique, sparse=sparse, expire_after_seconds=expire_after_seconds, partial_filter=partial_filter)
+
+# Declared indexes per collection, shaped after the queries the routes and services run
+INDEXES: Dict[str, List[Index]] = {
+    Collections.USERS: [
+        index("email", unique=True),
+        index("id", unique=True),
+        index("user_type"),
+    ],
+    Collections.STUDENT_PROFILES: [
+        index("user_id", unique=True),
+        index("joined_classes"),  # multikey: class rosters and analytics
+    ],
+    Collections.TEACHER_PROFILES: [
+        index("user_id", unique=True),
+    ],
+    Collections.CLASSROOMS: [
+        index("join_code", unique=True),
+        index("class_id"),
+        index("teacher_id", "active"),
+    ],
+    Collections.CHAT_SESSIONS: [
+        index("id"),
+        index("user_id", "subject"),
+        index("user_id", ("last_activity", DESCENDING)),
+    ],
+    Collections.CHAT_MESSAGES: [
+        index("session_id", "timestamp"),
+    ],
+    Collections.PRACTICE_QUESTIONS: [
+        index("id", unique=True),  # content-addressed: one document per distinct question
+        index("subject", "topic", "difficulty", "question_type"),  # question pool lookups
+    ],
+    Collections.PRACTICE_ATTEMPTS: [
+        index("id"),
+        index("student_id", ("completed_at", DESCENDING)),
+    ],
+    Collections.STUDENT_QUESTION_HISTORY: [
+        index("student_id", "question_id", unique=True),
+        index("student_id", "subject", ("last_seen", DESCENDING)),
+    ],
+    Collections.STUDENT_SUBJECT_STATS: [
+        index("student_id", "subject", unique=True),  # also backs the backfill $merge
+    ],
+    Collections.CLASS_ANALYTICS_SNAPSHOTS: [
+        index("class_id", "subject", unique=True),
+    ],
+    Collections.TEACHER_ANALYTICS_SNAPSHOTS: [
+        index("teacher_id", "subject", unique=True),
+    ],
+    Collections.STUDENT_NOTES: [
+        index("id"),
+        index("user_id", ("created_at", DESCENDING)),
+    ],
+    Collections.CALENDAR_EVENTS: [
+        index("id"),
+        index("student_id", "start_time"),
+    ],
+    Collections.NOTIFICATIONS: [
+        index("user_id", ("created_at", DESCENDING)),
+    ],
+    Collections.STUDY_PLANS: [
+        index("plan_id", unique=True),
+        index("user_id", ("created_at", DESCENDING)),
+    ],
+    Collections.SCHEDULED_TESTS: [
+        index("id", unique=True),
+        index("user_id", "is_completed", "scheduled_for"),
+        # One pending review per student and topics; manually scheduled tests have no review_key
+        index("user_id", "review_key", unique=True,
+              partial_filter={"is_completed": False, "review_key": {"$exists": True}}),
+    ],
+    Collections.LLM_RESPONSE_CACHE: [
+        index("expires_at", expire_after_seconds=0),  # TTL expiry
+    ],
+    Collections.BACKGROUND_JOBS: [
+        index("id", unique=True),
+        index("dedupe_key", unique=True, sparse=True),  # only set while a job is queued
+        index("status", "run_after"),
+        index("expires_at", expire_after_seconds=0),  # finished jobs
+    ],
+}
+
+def index_supports(collection: str, filter_fields: Iterable[str], sort_fields: Sequence[str] = ()) -> bool:
+    """Whether a declared index can serve a query without a collection scan or in-memory sort
+
+    The index's leading fields must be filtered on, and any sort fields must
+    appear in order within or right after that prefix.
+    """
+    filter_fields = set(filter_fields)
+    sort_fields = list(sort_fields)
+    if "_id" in filter_fields and not sort_fields:
+        return True
+
+    for declared in INDEXES.get(collection, []):
+        fields = declared.fields
+        prefix = 0
+        while prefix < len(fields) and fields[prefix] in filter_fields:
+            prefix += 1
+        if not sort_fields:
+            if prefix:
+                return True
+        elif prefix or not filter_fields:
+            # The sort may start anywhere within or right after the equality prefix
+            if any(fields[start:start + len(sort_fields)] == sort_fields for start in range(prefix + 1)):
+                return True
+    return False
+
+async def reconcile_indexes():
+    """Create declared indexes that are missing and report (or drop) undeclared ones"""
+    db = get_database()
+    created = 0
+
+    for collection, declared in INDEXES.items():
+        existing = await db[collection].index_information()
+        existing_keys = {
+            tuple((field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in info["key"]): name
+            for name, info in existing.items()
+        }
+
+        missing = [item for item in declared if item.keys not in existing_keys]
+        if missing:
+            try:
+                await db[collection].create_indexes([item.to_model() for item in missing])
+                created += len(missing)
+            except Exception as e:
+                logger.error("Failed to create indexes on %s: %s", collection, e)
+
+        declared_keys = {item.keys for item in declared}
+        for keys, name in existing_keys.items():
+            if name == "_id_" or keys in declared_keys:
+                continue
+            if DROP_UNDECLARED_INDEXES:
+                await db[collection].drop_index(name)
+                logger.info("Dropped undeclared index %s.%s", collection, name)
+            else:
+                logger.warning("Undeclared index %s.%s (set DROP_UNDECLARED_INDEXES=true to drop)", collection, name)
+
+    logger.info("Database indexes reconciled (%s created)", created)
+
+# Commands whose query plans are checked, and the driver fields stripped before explaining them
+_EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+_SESSION_FIELDS = {"lsid", "txnNumber", "$clusterTime", "$db", "$readPreference", "readConcern", "writeConcern", "cursor", "batchSize", "singleBatch"}
+
+def _query_shape(command: Dict[str, Any]) -> Tuple:
+    """Reduce a command to the fields that decide its plan"""
+    name = next(iter(command))
+    if name == "aggregate":
+        first = (command.get("pipeline") or [{}])[0]
+        query = first.get("$match", {})
+    elif name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        query = statements[0].get("q", {})
+    else:
+        query = command.get("filter") or command.get("query") or {}
+    return (name, command[name], tuple(sorted(query)), tuple(command.get("sort") or ()))
+
+def _collscan_stages(plan: Any) -> List[Dict[str, Any]]:
+    """Find every COLLSCAN stage anywhere in an explain document"""
+    found = []
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            found.append(plan)
+        for value in plan.values():
+            found.extend(_collscan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            found.extend(_collscan_stages(value))
+    return found
+
+class QueryPlanMonitor(monitoring.CommandListener):
+    """Explains each new query shape once and records the ones that scan a whole collection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._pending: List[Dict[str, Any]] = []
+        self._worker: Optional[asyncio.Task] = None
+        self.collscans: List[Dict[str, Any]] = []
+
+    def started(self, event):
+        if event.command_name not in _EXPLAINABLE_COMMANDS:
+            return
+        command = {key: value for key, value in event.command.items() if key not in _SESSION_FIELDS}
+        try:
+            shape = _query_shape(command)
+        except Exception:
+            return
+        with self._lock:
+            if shape in self._seen:
+                return
+            self._seen.add(shape)
+            self._pending.append(command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def start(self):
+        """Start explaining recorded query shapes in the background"""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background explain loop"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self):
+        while True:
+            await self.check_pending()
+            await asyncio.sleep(1)
+
+    async def check_pending(self):
+        """Explain every query shape recorded since the last check"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        db = get_database()
+        for command in pending:
+            try:
+                plan = await db.command("explain", command, verbosity="queryPlanner")
+            except Exception as e:
+                logger.warning("Could not explain %s on %s: %s", next(iter(command)), command[next(iter(command))], e)
+                continue
+            if _collscan_stages(plan):
+                entry = {"collection": command[next(iter(command))], "command": command}
+                self.collscans.append(entry)
+                logger.warning("COLLSCAN on %s: %s", entry['collection'], command)
+
+def install_query_plan_monitor() -> Optional[QueryPlanMonitor]:
+    """Register the monitor with pymongo; must run before the client is created"""
+    if not QUERY_PLAN_CHECK_ENABLED:
+        return None
+    monitoring.register(query_plan_monitor)
+    logger.info("Query plan checking enabled - collection scans will be reported")
+    return query_plan_monitor
+
+# Global query plan monitor instance
+query_plan_monitor = QueryPlanMonitor()
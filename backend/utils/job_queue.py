@@ -0,0 +1,188 @@
+import logging
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.utils.database import get_database, Collections
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Background job configuration
+JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))  # jobs run at once per worker process
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))  # idle wait before checking for jobs from other processes
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))  # a running job not finished by then is picked up again
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))  # doubled per failed attempt
+JOB_RETENTION = timedelta(days=int(os.getenv("JOB_RETENTION_DAYS", "7")))  # finished jobs expire after this
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Registered job handlers by job type
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
+
+def job_handler(job_type: str):
+    """Register a coroutine ``handle(payload)`` for jobs of this type"""
+    def decorator(func):
+        if job_type in JOB_HANDLERS:
+            raise ValueError(f"Duplicate job handler {job_type}")
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+class JobQueue:
+    """Durable job queue in MongoDB, drained by workers started with the app
+
+    Jobs are claimed atomically with a lease, so several worker processes can share
+    the queue and a job whose worker died is retried once its lease runs out. Jobs
+    enqueued with a ``dedupe_key`` coalesce while still queued: the latest payload wins.
+    """
+
+    def __init__(self):
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"enqueued": 0, "coalesced": 0, "completed": 0, "retried": 0, "failed": 0}
+
+    def start(self):
+        """Start the background job workers"""
+        if not JOB_WORKER_ENABLED or self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._run()) for _ in range(JOB_WORKER_CONCURRENCY)]
+        logger.info("Background job workers started (%s)", JOB_WORKER_CONCURRENCY)
+
+    async def stop(self):
+        """Stop the background job workers; running jobs are retried after their lease"""
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._wakeup = None
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None,
+                      delay_seconds: float = 0) -> None:
+        """Persist a job for the workers; a queued job with the same dedupe key is updated instead"""
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"No handler registered for job type {job_type}")
+        db = get_database()
+        now = datetime.utcnow()
+        fields = {"payload": payload, "run_after": now + timedelta(seconds=delay_seconds), "updated_at": now}
+        new_job = {"id": str(uuid.uuid4()), "type": job_type, "status": QUEUED, "attempts": 0, "created_at": now}
+
+        if dedupe_key is None:
+            await db[Collections.BACKGROUND_JOBS].insert_one({**new_job, **fields})
+        else:
+            # dedupe_key is unique and only set while a job is queued, so concurrent upserts converge
+            for _ in range(2):
+                try:
+                    result = await db[Collections.BACKGROUND_JOBS].update_one(
+                        {"dedupe_key": dedupe_key},
+                        {"$set": fields, "$setOnInsert": new_job},
+                        upsert=True
+                    )
+                    break
+                except DuplicateKeyError:
+                    continue  # lost the insert race; the retry updates the winner's job
+            else:
+                raise RuntimeError(f"Could not enqueue {job_type} job {dedupe_key}")
+            if result.upserted_id is None:
+                self.stats["coalesced"] += 1
+
+        self.stats["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest due job: queued, or running with an expired lease"""
+        db = get_database()
+        now = datetime.utcnow()
+        return await db[Collections.BACKGROUND_JOBS].find_one_and_update(
+            {"status": {"$in": [QUEUED, RUNNING]}, "run_after": {"$lte": now}},
+            {
+                # While running, run_after is the lease expiry
+                "$set": {"status": RUNNING, "run_after": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                         "owner": self.owner, "updated_at": now},
+                "$inc": {"attempts": 1},
+                # Jobs enqueued from now on get a fresh job rather than merging into a running one
+                "$unset": {"dedupe_key": ""}
+            },
+            sort=[("run_after", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _finish(self, job: Dict[str, Any], error: Optional[Exception] = None):
+        """Record a job's outcome unless its lease was lost to another worker"""
+        db = get_database()
+        now = datetime.utcnow()
+        if error is None:
+            update = {"status": DONE, "updated_at": now, "expires_at": now + JOB_RETENTION}
+            self.stats["completed"] += 1
+        elif job["attempts"] >= JOB_MAX_ATTEMPTS:
+            update = {"status": FAILED, "last_error": str(error), "updated_at": now, "expires_at": now + JOB_RETENTION}
+            self.stats["failed"] += 1
+            logger.error("Background job %s %s failed after %s attempts: %s", job['type'], job['id'], job['attempts'], error)
+        else:
+            delay = JOB_RETRY_BACKOFF * (2 ** (job["attempts"] - 1))
+            update = {"status": QUEUED, "last_error": str(error), "updated_at": now, "run_after": now + timedelta(seconds=delay)}
+            self.stats["retried"] += 1
+            logger.warning("Background job %s %s failed (attempt %s), retrying in %ss: %s", job['type'], job['id'], job['attempts'], delay, error)
+        await db[Collections.BACKGROUND_JOBS].update_one(
+            {"id": job["id"], "attempts": job["attempts"], "status": RUNNING},
+            {"$set": update}
+        )
+
+    async def run_next(self) -> bool:
+        """Claim and run one due job; False when none is due"""
+        job = await self._claim()
+        if job is None:
+            return False
+        handler = JOB_HANDLERS.get(job["type"])
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job type {job['type']}")
+            await handler(job.get("payload") or {})
+        except asyncio.CancelledError:
+            raise  # left running; picked up again once the lease expires
+        except Exception as e:
+            await self._finish(job, e)
+        else:
+            await self._finish(job)
+        return True
+
+    async def _run(self):
+        """Worker loop: run due jobs, then sleep until woken by an enqueue or the poll interval"""
+        while True:
+            self._wakeup.clear()  # before claiming, so an enqueue during the claim is not missed
+            try:
+                if await self.run_next():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Background job worker error: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "workers": len(self._workers)}
+
+# Global job queue instance
+job_queue = JobQueue()
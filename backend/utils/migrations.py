@@ -0,0 +1,263 @@
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+from pymongo.errors import DuplicateKeyError
+
+from backend.utils.database import get_database, Collections
+from backend.utils.indexes import INDEXES
+from backend.services.student_stats_service import RECENT_ATTEMPTS_LIMIT
+from backend.services.tutor_session_service import TutorSessionService
+
+logger = logging.getLogger(__name__)
+
+# A migration that has been "running" this long is assumed to belong to a dead worker
+MIGRATION_LOCK_TIMEOUT = timedelta(minutes=int(os.getenv("MIGRATION_LOCK_TIMEOUT_MINUTES", "10")))
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[..., Awaitable[None]]
+
+# Registered data migrations, applied in version order. Every migration is declared in this
+# module so run_migrations sees it no matter which services the app happens to import.
+MIGRATIONS: List[Migration] = []
+
+def migration(version: int, name: str):
+    """Register a coroutine ``apply(db)`` as a one-shot data migration"""
+    def decorator(func):
+        if any(existing.version == version for existing in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, name, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+@migration(1, "fix_null_practice_attempt_subjects")
+async def fix_null_practice_attempt_subjects(db):
+    """Set subject='general' on practice attempts saved without a subject"""
+    result = await db[Collections.PRACTICE_ATTEMPTS].update_many(
+        {
+            "$or": [
+                {"subject": {"$exists": False}},
+                {"subject": None},
+                {"subject": ""}
+            ]
+        },
+        {"$set": {"subject": "general"}}
+    )
+    logger.info("Data Migration: Updated %s attempts with subject='general'", result.modified_count)
+
+@migration(2, "backfill_student_subject_stats")
+async def backfill_student_subject_stats(db):
+    """Fold the practice attempts recorded before subject rollups existed into the rollups
+
+    A rollup holds every attempt from its ``first_attempt_at`` on, so only earlier attempts
+    are added, and they are summed into rollups that record_attempt created meanwhile
+    rather than replacing them. Re-running the backfill adds nothing twice.
+    """
+    cutoff = datetime.utcnow()
+    attempted_at = {"$ifNull": ["$completed_at", "$created_at"]}
+    subject = {"$ifNull": ["$subject", "general"]}
+    # Older attempts store the question count under different fields
+    question_count = {"$ifNull": ["$total_questions", {"$ifNull": ["$questions_count", {"$size": {"$ifNull": ["$questions", []]}}]}]}
+
+    def added(field):
+        return {"$add": [{"$ifNull": [f"${field}", 0]}, f"$$new.{field}"]}
+
+    pipeline = [
+        {"$sort": {"completed_at": 1}},
+        {"$match": {"$expr": {"$lt": [attempted_at, cutoff]}}},
+        # Skip attempts the student's rollup for that subject already holds (a $lookup into the
+        # $merge target needs MongoDB 4.4)
+        {"$lookup": {
+            "from": Collections.STUDENT_SUBJECT_STATS,
+            "localField": "student_id",
+            "foreignField": "student_id",
+            "as": "rollups"
+        }},
+        {"$match": {"$expr": {"$not": [{"$anyElementTrue": [{"$map": {
+            "input": "$rollups",
+            "in": {"$and": [
+                {"$eq": ["$$this.subject", subject]},
+                {"$gte": [attempted_at, "$$this.first_attempt_at"]}
+            ]}
+        }}]}]}}},
+        {"$group": {
+            "_id": {"student_id": "$student_id", "subject": subject},
+            "count": {"$sum": 1},
+            "score_sum": {"$sum": "$score"},
+            "score_sum_sq": {"$sum": {"$multiply": ["$score", "$score"]}},
+            "total_questions": {"$sum": question_count},
+            "total_time": {"$sum": {"$ifNull": ["$time_taken", 0]}},
+            "best_score": {"$max": "$score"},
+            "worst_score": {"$min": "$score"},
+            "first_attempt_at": {"$min": attempted_at},
+            "last_attempt_at": {"$max": attempted_at},
+            "recent_attempts": {"$push": {
+                "id": "$id",
+                "score": "$score",
+                "total_questions": question_count,
+                "difficulty": {"$ifNull": ["$difficulty", "medium"]},
+                "completed_at": attempted_at
+            }}
+        }},
+        {"$project": {
+            "_id": 0,
+            "student_id": "$_id.student_id",
+            "subject": "$_id.subject",
+            "count": 1,
+            "score_sum": 1,
+            "score_sum_sq": 1,
+            "total_questions": 1,
+            "total_time": 1,
+            "best_score": 1,
+            "worst_score": 1,
+            "first_attempt_at": 1,
+            "last_attempt_at": 1,
+            "recent_attempts": {"$slice": ["$recent_attempts", -RECENT_ATTEMPTS_LIMIT]},
+            "updated_at": "$$NOW"
+        }},
+        {"$merge": {
+            "into": Collections.STUDENT_SUBJECT_STATS,
+            "on": ["student_id", "subject"],
+            # Backfilled attempts all precede the ones already in the rollup
+            "whenMatched": [{"$set": {
+                "count": added("count"),
+                "score_sum": added("score_sum"),
+                "score_sum_sq": added("score_sum_sq"),
+                "total_questions": added("total_questions"),
+                "total_time": added("total_time"),
+                "best_score": {"$max": ["$best_score", "$$new.best_score"]},
+                "worst_score": {"$min": ["$worst_score", "$$new.worst_score"]},
+                "first_attempt_at": {"$min": ["$first_attempt_at", "$$new.first_attempt_at"]},
+                "last_attempt_at": {"$max": ["$last_attempt_at", "$$new.last_attempt_at"]},
+                "recent_attempts": {"$slice": [
+                    {"$concatArrays": ["$$new.recent_attempts", {"$ifNull": ["$recent_attempts", []]}]},
+                    -RECENT_ATTEMPTS_LIMIT
+                ]},
+                "updated_at": "$$NOW"
+            }}],
+            "whenNotMatched": "insert"
+        }}
+    ]
+    await db[Collections.PRACTICE_ATTEMPTS].aggregate(pipeline, allowDiskUse=True).to_list(None)
+    logger.info("Data Migration: Folded earlier practice attempts into student subject stats")
+
+@migration(3, "backfill_chat_session_state")
+async def backfill_chat_session_state(db):
+    """Build conversation_state for chat sessions that predate it from their messages"""
+    pipeline = [
+        {"$sort": {"session_id": 1, "timestamp": 1}},
+        {"$group": {
+            "_id": "$session_id",
+            "messages": {"$push": {"message": "$message", "response": "$response"}}
+        }}
+    ]
+    updated = 0
+    async for group in db[Collections.CHAT_MESSAGES].aggregate(pipeline, allowDiskUse=True):
+        result = await db[Collections.CHAT_SESSIONS].update_one(
+            {"id": group["_id"], "conversation_state": {"$exists": False}},
+            {"$set": {"conversation_state": TutorSessionService.state_from_messages(group["messages"])}}
+        )
+        updated += result.modified_count
+    logger.info("Data Migration: Built conversation state for %s chat sessions", updated)
+
+@migration(4, "unique_practice_question_ids")
+async def unique_practice_question_ids(db):
+    """Remove practice questions stored twice under one ID and make the id index unique"""
+    collection = db[Collections.PRACTICE_QUESTIONS]
+    pipeline = [
+        {"$match": {"id": {"$ne": None}}},
+        {"$group": {"_id": "$id", "copies": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    removed = 0
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        result = await collection.delete_many({"_id": {"$in": group["copies"][1:]}})
+        removed += result.deleted_count
+
+    # Earlier releases built a non-unique index on the same key, which reconciliation keeps
+    declared = next(item for item in INDEXES[Collections.PRACTICE_QUESTIONS] if item.fields == ["id"])
+    existing = await collection.index_information()
+    if not existing.get(declared.name, {}).get("unique"):
+        if declared.name in existing:
+            await collection.drop_index(declared.name)
+        await collection.create_indexes([declared.to_model()])
+    logger.info("Data Migration: Removed %s duplicate practice questions and made question IDs unique", removed)
+
+@migration(5, "unique_pending_reviews")
+async def unique_pending_reviews(db):
+    """Keep the newest of duplicate pending reviews and build the unique pending-review index"""
+    collection = db[Collections.SCHEDULED_TESTS]
+    pipeline = [
+        {"$match": {"is_completed": False, "review_key": {"$exists": True}}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {"_id": {"user_id": "$user_id", "review_key": "$review_key"}, "copies": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    removed = 0
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        result = await collection.delete_many({"_id": {"$in": group["copies"][1:]}})
+        removed += result.deleted_count
+
+    # Index reconciliation runs first and cannot build the index while duplicates exist
+    declared = next(item for item in INDEXES[Collections.SCHEDULED_TESTS] if item.fields == ["user_id", "review_key"])
+    await collection.create_indexes([declared.to_model()])
+    logger.info("Data Migration: Removed %s duplicate pending reviews", removed)
+
+async def _acquire(db, item: Migration, owner: str) -> bool:
+    """Claim a migration for this worker; False if it is applied or held elsewhere"""
+    now = datetime.utcnow()
+    try:
+        await db[Collections.SCHEMA_MIGRATIONS].insert_one({
+            "_id": item.version,
+            "name": item.name,
+            "status": "running",
+            "owner": owner,
+            "started_at": now
+        })
+        return True
+    except DuplicateKeyError:
+        # Take over a lock left behind by a worker that died mid-migration
+        stale = await db[Collections.SCHEMA_MIGRATIONS].find_one_and_update(
+            {
+                "_id": item.version,
+                "status": "running",
+                "started_at": {"$lt": now - MIGRATION_LOCK_TIMEOUT}
+            },
+            {"$set": {"owner": owner, "started_at": now}}
+        )
+        return stale is not None
+
+async def run_migrations():
+    """Apply pending data migrations once, safely across concurrently starting workers"""
+    db = get_database()
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    for item in MIGRATIONS:
+        existing = await db[Collections.SCHEMA_MIGRATIONS].find_one({"_id": item.version})
+        if existing and existing.get("status") == "applied":
+            continue
+
+        if not await _acquire(db, item, owner):
+            # Another worker is applying it; later migrations may depend on it
+            logger.info("Migration %s (%s) is running on another worker", item.version, item.name)
+            return
+
+        try:
+            logger.info("Applying migration %s: %s", item.version, item.name)
+            await item.apply(db)
+        except Exception as e:
+            # Release the claim so the next startup retries
+            await db[Collections.SCHEMA_MIGRATIONS].delete_one({"_id": item.version, "owner": owner})
+            logger.error("Migration %s (%s) failed: %s", item.version, item.name, e)
+            return
+
+        await db[Collections.SCHEMA_MIGRATIONS].update_one(
+            {"_id": item.version},
+            {"$set": {"status": "applied", "applied_at": datetime.utcnow()}}
+        )
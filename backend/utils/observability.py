@@ -0,0 +1,322 @@
+import bisect
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Fraction of ordinary requests written to the request log; errors and slow requests are always logged
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.01"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+# Add a Server-Timing header with the per-stage durations of each request
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+
+# Route label for requests that matched no route, so unknown paths cannot grow the label set
+UNMATCHED_ROUTE = "unmatched"
+# Route label for stages timed outside any request (background jobs, startup)
+BACKGROUND_ROUTE = "background"
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; memory does not grow with the number of requests"""
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket, as Prometheus' histogram_quantile does"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if i == len(self.bounds):
+                    return self.bounds[-1]  # beyond the last finite bucket
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1]
+
+    def cumulative_counts(self) -> List[int]:
+        total, result = 0, []
+        for bucket_count in self.counts:
+            total += bucket_count
+            result.append(total)
+        return result
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_label_value(value)}"' for key, value in labels.items()) + "}"
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class RequestMetrics:
+    """Per-route latency histograms and status-code counters, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._status_counts: Dict[Tuple[str, str, int], int] = {}
+        self._stages: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._fallbacks: Dict[Tuple[str, str], int] = {}
+        self._model_calls: Dict[Tuple[str, str], List[int]] = {}  # (model, outcome) -> [calls, prompt chars, response chars]
+        self.started_at = time.time()
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float):
+        """Record one finished request"""
+        with self._lock:
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = LatencyHistogram()
+            histogram.observe(seconds)
+            key = (method, route, status_code)
+            self._status_counts[key] = self._status_counts.get(key, 0) + 1
+
+    def observe_stages(self, route: str, stages: Dict[str, List[float]], fallbacks: List[str]):
+        """Record the stage timings and fallbacks collected for one request"""
+        with self._lock:
+            for stage, durations in stages.items():
+                histogram = self._stages.get((route, stage))
+                if histogram is None:
+                    histogram = self._stages[(route, stage)] = LatencyHistogram()
+                for seconds in durations:
+                    histogram.observe(seconds)
+            for kind in fallbacks:
+                self._fallbacks[(route, kind)] = self._fallbacks.get((route, kind), 0) + 1
+
+    def observe_model_call(self, model: str, outcome: str, prompt_chars: int, response_chars: int):
+        """Record one model completion and the size of its prompt and response"""
+        with self._lock:
+            totals = self._model_calls.setdefault((model, outcome), [0, 0, 0])
+            totals[0] += 1
+            totals[1] += prompt_chars
+            totals[2] += response_chars
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            latency = sorted(self._latency.items())
+            status_counts = sorted(self._status_counts.items())
+            snapshots = [(key, h.cumulative_counts(), h.sum, h.count,
+                          [(q, h.quantile(q)) for q in LATENCY_QUANTILES]) for key, h in latency]
+            stages = [(key, h.cumulative_counts(), h.sum, h.count) for key, h in sorted(self._stages.items())]
+            fallbacks = sorted(self._fallbacks.items())
+            model_calls = sorted((key, list(totals)) for key, totals in self._model_calls.items())
+
+        lines = [
+            "# HELP http_requests_total Requests handled, by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status_code), count in status_counts:
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), cumulative, total, count, _ in snapshots:
+            bounds = [_number(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, cumulative):
+                lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {bucket_count}")
+            lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {_number(total)}")
+            lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {count}")
+
+        lines += [
+            "# HELP http_request_latency_seconds Request latency quantiles estimated from the histogram, by route.",
+            "# TYPE http_request_latency_seconds summary",
+        ]
+        for (method, route), _, total, count, quantiles in snapshots:
+            for q, value in quantiles:
+                lines.append(f"http_request_latency_seconds{_labels(method=method, route=route, quantile=q)} {_number(value)}")
+            lines.append(f"http_request_latency_seconds_sum{_labels(method=method, route=route)} {_number(total)}")
+            lines.append(f"http_request_latency_seconds_count{_labels(method=method, route=route)} {count}")
+
+        lines += [
+            "# HELP request_stage_duration_seconds Time spent per stage (database, prompt, model call, parsing) within a route.",
+            "# TYPE request_stage_duration_seconds histogram",
+        ]
+        for (route, stage), cumulative, total, count in stages:
+            bounds = [_number(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, cumulative):
+                lines.append(f"request_stage_duration_seconds_bucket{_labels(route=route, stage=stage, le=bound)} {bucket_count}")
+            lines.append(f"request_stage_duration_seconds_sum{_labels(route=route, stage=stage)} {_number(total)}")
+            lines.append(f"request_stage_duration_seconds_count{_labels(route=route, stage=stage)} {count}")
+
+        lines += [
+            "# HELP ai_model_calls_total Model completions, by model and outcome.",
+            "# TYPE ai_model_calls_total counter",
+        ]
+        lines += [f"ai_model_calls_total{_labels(model=model, outcome=outcome)} {calls}" for (model, outcome), (calls, _, _) in model_calls]
+        lines += [
+            "# HELP ai_prompt_chars_total Characters sent to the model in prompts.",
+            "# TYPE ai_prompt_chars_total counter",
+        ]
+        lines += [f"ai_prompt_chars_total{_labels(model=model, outcome=outcome)} {chars}" for (model, outcome), (_, chars, _) in model_calls]
+        lines += [
+            "# HELP ai_response_chars_total Characters received from the model.",
+            "# TYPE ai_response_chars_total counter",
+        ]
+        lines += [f"ai_response_chars_total{_labels(model=model, outcome=outcome)} {chars}" for (model, outcome), (_, _, chars) in model_calls]
+        lines += [
+            "# HELP ai_fallbacks_total Responses served from local fallbacks instead of the model.",
+            "# TYPE ai_fallbacks_total counter",
+        ]
+        lines += [f"ai_fallbacks_total{_labels(route=route, kind=kind)} {count}" for (route, kind), count in fallbacks]
+
+        lines += [
+            "# HELP process_start_time_seconds Start time of the process since the Unix epoch.",
+            "# TYPE process_start_time_seconds gauge",
+            f"process_start_time_seconds {_number(self.started_at)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+class RequestTrace:
+    """Stage timings, models used and fallbacks collected while one request is handled"""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.models: Dict[str, int] = {}
+        self.fallbacks: List[str] = []
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; repeated stages (e.g. several model calls) are summed"""
+        entries = []
+        for stage, durations in self.stages.items():
+            entry = f"{stage};dur={sum(durations) * 1000:.1f}"
+            if len(durations) > 1:
+                entry += f';desc="x{len(durations)}"'
+            entries.append(entry)
+        entries += [f'model;desc="{model} x{calls}"' for model, calls in self.models.items()]
+        entries += [f'fallback;desc="{kind}"' for kind in self.fallbacks]
+        return ", ".join(entries)
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+def start_trace() -> RequestTrace:
+    """Begin collecting stage timings for the current request"""
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+def record_stage(stage: str, seconds: float):
+    """Add a stage duration to the current request, or straight to the metrics outside a request"""
+    trace = _current_trace.get()
+    if trace is None:
+        request_metrics.observe_stages(BACKGROUND_ROUTE, {stage: [seconds]}, [])
+    else:
+        trace.stages.setdefault(stage, []).append(seconds)
+
+@contextmanager
+def span(stage: str):
+    """Time a block as one stage of the current request, e.g. ``with span("db.read"):``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+def record_model_call(model: str, prompt: str, response: Optional[str], outcome: str = "ok"):
+    """Record which model served a completion and the prompt and response sizes"""
+    request_metrics.observe_model_call(model, outcome, len(prompt), len(response or ""))
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.models[model] = trace.models.get(model, 0) + 1
+
+def record_fallback(kind: str):
+    """Record that a response came from a local fallback rather than the model"""
+    trace = _current_trace.get()
+    if trace is None:
+        request_metrics.observe_stages(BACKGROUND_ROUTE, {}, [kind])
+    else:
+        trace.fallbacks.append(kind)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``fields`` passed through ``extra``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **getattr(record, "fields", {})
+        }
+        return json.dumps(entry, default=str)
+
+class RequestLog:
+    """Sampled, structured request log written by a background thread through a queue"""
+
+    def __init__(self, sample_rate: float = REQUEST_LOG_SAMPLE_RATE, slow_ms: float = SLOW_REQUEST_MS):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.logger = logging.getLogger("backend.requests")
+        self._handler: Optional[QueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+
+    def start(self):
+        """Route the request logger through a queue so handlers never block the event loop"""
+        if self._listener is not None:
+            return
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        self._handler = QueueHandler(log_queue)
+        self.logger.addHandler(self._handler)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._listener = QueueListener(log_queue, handler)
+        self._listener.start()
+
+    def stop(self):
+        """Flush queued records and stop the writer thread"""
+        if self._listener is None:
+            return
+        self.logger.removeHandler(self._handler)
+        self._listener.stop()
+        self._handler = self._listener = None
+
+    def should_log(self, status_code: int, duration_ms: float) -> bool:
+        return status_code >= 500 or duration_ms >= self.slow_ms or random.random() < self.sample_rate
+
+    def record(self, method: str, path: str, route: str, status_code: int, duration_ms: float):
+        """Log a finished request if it is an error, slow, or falls in the sample"""
+        if not self.should_log(status_code, duration_ms):
+            return
+        level = logging.ERROR if status_code >= 500 else logging.WARNING if duration_ms >= self.slow_ms else logging.INFO
+        self.logger.log(level, "request", extra={"fields": {
+            "method": method,
+            "path": path,
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "sampled": level == logging.INFO
+        }})
+
+# Global request metrics and request log instances
+request_metrics = RequestMetrics()
+request_log = RequestLog()
@@ -1,31 +1,48 @@
 import jwt
 import bcrypt
+import asyncio
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 from dotenv import load_dotenv
 
+from backend.utils.cache import MemoryCacheBackend
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Security configuration
 JWT_SECRET = os.getenv("JWT_SECRET", "your-super-secret-jwt-key-change-in-production-2024")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "168"))  # 7 days
 
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # cost factor for new hashes
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))  # waiting jobs before new ones are rejected
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))  # seconds a job may wait for a worker
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))  # verified tokens kept in memory
+
 security = HTTPBearer()
 
 class SecurityUtils:
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash a password using bcrypt"""
-        salt = bcrypt.gensalt()
+        """Hash a password using bcrypt (blocking - use password_hasher from async code)"""
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
     @staticmethod
     def verify_password(password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash"""
+        """Verify a password against its hash (blocking - use password_hasher from async code)"""
         return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
     
     @staticmethod
@@ -64,54 +81,157 @@ class SecurityUtils:
                 detail="Could not validate credentials"
             )
 
-# Dependency to get current user from token
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Extract current user from JWT token"""
-    try:
-        print(f"🔍 AUTH DEBUG: Received credentials: {credentials}")
-        token = credentials.credentials
-        print(f"🔍 AUTH DEBUG: Token: {token[:50]}...")  # Only show first 50 chars for security
-        
-        payload = SecurityUtils.verify_token(token)
-        print(f"🔍 AUTH DEBUG: Token payload: {payload}")
-        
-        if payload is None:
-            print("❌ AUTH DEBUG: Payload is None")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"}
-            )
-        
-        print(f"✅ AUTH DEBUG: Authentication successful for user: {payload.get('sub', 'unknown')}")
-        return payload
-    except HTTPException:
-        # Re-raise HTTP exceptions (like 401) as-is
-        print("❌ AUTH DEBUG: HTTPException raised")
-        raise
-    except jwt.ExpiredSignatureError:
-        print("❌ AUTH DEBUG: Token has expired")
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so hashing never blocks the event loop
+
+    bcrypt releases the GIL while hashing, so worker threads run in parallel.
+    Jobs beyond the worker count wait in a bounded queue; when that queue is
+    full, or a job waits too long, the request is rejected with 503 so a login
+    storm only degrades authentication.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = None
+        self._waiting = 0
+        self._running = 0
+        self.stats = {"completed": 0, "rejected": 0, "timed_out": 0, "total_wait_ms": 0.0, "total_work_ms": 0.0}
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._slots
+
+    def _reject(self, reason: str):
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has expired",
-            headers={"WWW-Authenticate": "Bearer"}
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Authentication is busy, please retry shortly ({reason})",
+            headers={"Retry-After": "1"}
         )
-    except jwt.PyJWTError as e:
-        print(f"❌ AUTH DEBUG: JWT Error: {e}")
+
+    async def _run(self, func: Callable, *args) -> Any:
+        """Admit a job, wait for a free worker and run it off the event loop"""
+        slots = self._get_slots()
+        queued_at = time.perf_counter()
+        if slots.locked():
+            # Every worker is busy - queue only while there is room
+            if self._waiting >= self.max_queue:
+                self.stats["rejected"] += 1
+                self._reject("queue full")
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.stats["timed_out"] += 1
+                self._reject("queue timeout")
+            finally:
+                self._waiting -= 1
+        else:
+            await slots.acquire()
+
+        started_at = time.perf_counter()
+        self._running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._running -= 1
+            slots.release()
+            finished_at = time.perf_counter()
+            self.stats["completed"] += 1
+            self.stats["total_wait_ms"] += (started_at - queued_at) * 1000
+            self.stats["total_work_ms"] += (finished_at - started_at) * 1000
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured cost factor"""
+        return await self._run(SecurityUtils.hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash"""
+        return await self._run(SecurityUtils.verify_password, password, hashed_password)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, utilisation and latency counters"""
+        completed = self.stats["completed"]
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queue_depth": self._waiting,
+            "max_queue": self.max_queue,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "completed": completed,
+            "rejected": self.stats["rejected"],
+            "timed_out": self.stats["timed_out"],
+            "avg_wait_ms": round(self.stats["total_wait_ms"] / completed, 1) if completed else 0,
+            "avg_work_ms": round(self.stats["total_work_ms"] / completed, 1) if completed else 0
+        }
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
+
+def _token_digest(token: str) -> str:
+    """Cache key for a token; the raw token is never kept in memory longer than needed"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+# Verified token payloads, kept until each token's own expiry
+token_cache = MemoryCacheBackend(max_entries=AUTH_TOKEN_CACHE_SIZE)
+
+def authenticate_token(token: str) -> dict:
+    """Return the payload of a valid token, from the verified-token cache when possible"""
+    digest = _token_digest(token)
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return dict(payload)
+
+    payload = SecurityUtils.verify_token(token)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"}
         )
+
+    # Cache only until the token expires so expiry is still enforced
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        token_cache.set(digest, dict(payload), ttl=timedelta(seconds=expires_in))
+    return payload
+
+# Dependency to get current user from token
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Extract current user from JWT token"""
+    try:
+        payload = authenticate_token(credentials.credentials)
+    except HTTPException as e:
+        # Re-raise HTTP exceptions (like 401) as-is
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("auth rejected: %s %s", e.status_code, e.detail, extra={"status": e.status_code, "reason": e.detail})
+        raise
     except Exception as e:
         # Convert any other exception to 401 (not 500)
-        print(f"❌ AUTH DEBUG: Unexpected error: {e}")
+        logger.warning("auth failed unexpectedly: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("auth ok: %s (%s)", payload.get("sub"), payload.get("user_type"), extra={"user_id": payload.get("sub"), "user_type": payload.get("user_type")})
+    return payload
+
 # Role-based access dependencies
 async def get_current_student(current_user: dict = Depends(get_current_user)):
     """Ensure current user is a student"""
@@ -0,0 +1,205 @@
+import math
+import os
+import re
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+from backend.utils.cache import response_cache, ResponseCache
+from backend.utils.helpers import CacheUtils
+
+load_dotenv()
+
+# Cosine similarity (TF-IDF over words and word pairs) above which two questions share an answer
+TUTOR_CACHE_SIMILARITY = float(os.getenv("TUTOR_CACHE_SIMILARITY", "0.9"))
+# Cached questions indexed per subject for near-duplicate lookup (per worker)
+TUTOR_CACHE_INDEX_SIZE = int(os.getenv("TUTOR_CACHE_INDEX_SIZE", "2000"))
+
+# Word pairs keep "celsius to fahrenheit" apart from "fahrenheit to celsius"; weighted below single words
+BIGRAM_WEIGHT = 0.5
+
+# Function words that do not change what is being asked. Question words and negations are kept:
+# "why does ice float" and "how does ice float" are different questions.
+STOP_WORDS = frozenset("""
+a an the is are was were be been being am do does did doing have has had having
+i me my we our you your he she it its they them their this that these those
+of to in on at by for with about from into onto over under as and or so if then than
+can could would should will shall may might must please explain tell give show help what
+just really very some any kind sort
+""".split())
+
+_CONTRACTIONS = [
+    (re.compile(r"n['’]t\b"), " not"),
+    (re.compile(r"['’](s|re|ve|ll|d|m)\b"), ""),
+]
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def _stem(word: str) -> str:
+    """Light suffix stripping so plural and inflected forms meet"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("ing") and len(word) > 5:
+        return word[:-3]
+    if word.endswith("ed") and len(word) > 4:
+        return word[:-2]
+    if word.endswith("ly") and len(word) > 4:
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def normalize_question(text: str) -> List[str]:
+    """Lowercase, expand contractions, drop punctuation and stop words, and stem"""
+    text = text.lower()
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    return [_stem(token) for token in _TOKEN.findall(text) if token not in STOP_WORDS]
+
+def _anchors(tokens: List[str]) -> Tuple[str, ...]:
+    """Numbers and single-letter symbols, which must match exactly for two questions to share an answer"""
+    return tuple(sorted(token for token in tokens if len(token) == 1 or any(char.isdigit() for char in token)))
+
+def _features(tokens: List[str]) -> Counter:
+    features = Counter(tokens)
+    features.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    return features
+
+class SimilarityIndex:
+    """Bounded TF-IDF index of normalized questions with an inverted index for candidate lookup"""
+
+    def __init__(self, max_entries: int = TUTOR_CACHE_INDEX_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Counter]" = OrderedDict()
+        self._anchors: Dict[str, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str, tokens: List[str]):
+        """Index a question under its normalized key, evicting the oldest past capacity"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        features = _features(tokens)
+        self._entries[key] = features
+        self._anchors[key] = _anchors(tokens)
+        for feature in features:
+            self._postings.setdefault(feature, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, key: str):
+        features = self._entries.pop(key, None)
+        self._anchors.pop(key, None)
+        for feature in features or ():
+            keys = self._postings.get(feature)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[feature]
+
+    def _weight(self, feature: str) -> float:
+        idf = math.log((len(self._entries) + 1) / (len(self._postings.get(feature, ())) + 1)) + 1
+        return idf * (BIGRAM_WEIGHT if " " in feature else 1.0)
+
+    def _vector(self, features: Counter) -> Tuple[Dict[str, float], float]:
+        vector = {feature: count * self._weight(feature) for feature, count in features.items()}
+        return vector, math.sqrt(sum(value * value for value in vector.values()))
+
+    def nearest(self, tokens: List[str]) -> Tuple[Optional[str], float]:
+        """Most similar indexed question sharing at least one word, and its cosine similarity
+
+        Only questions with exactly the same numbers and single-letter symbols are
+        candidates: "a car of mass 1200 kg" and "... 1500 kg" are different problems.
+        """
+        query, query_norm = self._vector(_features(tokens))
+        if not query_norm:
+            return None, 0.0
+
+        anchors = _anchors(tokens)
+        candidates = set()
+        for token in set(tokens):
+            candidates.update(self._postings.get(token, ()))
+        candidates = {key for key in candidates if self._anchors[key] == anchors}
+
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            vector, norm = self._vector(self._entries[key])
+            score = sum(weight * vector.get(feature, 0.0) for feature, weight in query.items()) / (query_norm * norm)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key, best_score
+
+class TutorAnswerCache:
+    """Tutor answers keyed by the normalized question per subject, with near-duplicate lookup
+
+    Exact normalized matches are shared through the response cache tiers; the similarity
+    index that finds near-duplicates is local to each worker.
+    """
+
+    def __init__(self, cache: ResponseCache = response_cache, threshold: float = TUTOR_CACHE_SIMILARITY):
+        self.cache = cache
+        self.threshold = threshold
+        self._indexes: Dict[str, SimilarityIndex] = {}
+        self.stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "uncacheable": 0}
+
+    @staticmethod
+    def _cache_key(subject: str, normalized: str) -> str:
+        return CacheUtils.get_cache_key(f"tutor:{normalized}", subject)
+
+    def key(self, message: str, subject: str) -> Optional[str]:
+        """Cache key of the normalized question, or None when nothing is left to key on"""
+        tokens = normalize_question(message)
+        return self._cache_key(subject, " ".join(tokens)) if tokens else None
+
+    async def get(self, message: str, subject: str) -> Optional[str]:
+        """Cached answer for this question or a near-duplicate of it"""
+        tokens = normalize_question(message)
+        if not tokens:
+            self.stats["uncacheable"] += 1
+            return None
+        normalized = " ".join(tokens)
+
+        answer = await self.cache.get(self._cache_key(subject, normalized))
+        if answer is not None:
+            self.stats["exact_hits"] += 1
+            self._index(subject).add(normalized, tokens)
+            return answer
+
+        index = self._index(subject)
+        similar, score = index.nearest(tokens)
+        if similar is not None and score >= self.threshold:
+            answer = await self.cache.get(self._cache_key(subject, similar))
+            if answer is not None:
+                self.stats["similar_hits"] += 1
+                return answer
+            index.remove(similar)  # the answer expired from the cache
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, message: str, subject: str, answer: str):
+        """Cache an answer under the normalized question and index it for near-duplicates"""
+        tokens = normalize_question(message)
+        if not tokens:
+            return
+        normalized = " ".join(tokens)
+        await self.cache.set(self._cache_key(subject, normalized), answer)
+        self._index(subject).add(normalized, tokens)
+
+    def _index(self, subject: str) -> SimilarityIndex:
+        index = self._indexes.get(subject)
+        if index is None:
+            index = self._indexes[subject] = SimilarityIndex()
+        return index
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "indexed": sum(len(index) for index in self._indexes.values())}
+
+# Global tutor answer cache instance
+tutor_answer_cache = TutorAnswerCache()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized StudentAnalyticsService against the previous per-attempt loops
+
+Usage (from the repository root):
+    python -m benchmarks.analytics_benchmark [--sizes 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from backend.services.analytics_service import StudentAnalyticsService
+
+SUBJECTS = ["mathematics", "physics", "chemistry", "biology", "english", "history", "geography"]
+
+def generate_attempts(count: int, seed: int = 42) -> list:
+    """Synthetic practice attempts spread over the last 60 days"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(i),
+            "student_id": f"student_{rng.randint(1, 50)}",
+            "subject": rng.choice(SUBJECTS),
+            "score": round(rng.uniform(20, 100), 1),
+            "time_taken": rng.randint(60, 1800),
+            "completed_at": now - timedelta(days=rng.uniform(0, 60))
+        }
+        for i in range(count)
+    ]
+
+def legacy_analyze(practice_attempts: list) -> dict:
+    """The per-attempt loop implementation this benchmark compares against"""
+    subject_performance = defaultdict(list)
+    for attempt in practice_attempts:
+        subject_performance[attempt.get('subject', 'general')].append({
+            'score': attempt.get('score', 0),
+            'date': attempt.get('completed_at') or attempt.get('created_at'),
+            'time_taken': attempt.get('time_taken', 0)
+        })
+
+    results = {}
+    for subject, attempts in subject_performance.items():
+        attempts.sort(key=lambda x: x.get('date') or datetime.min)
+        scores = [a['score'] for a in attempts if isinstance(a['score'], (int, float))]
+        avg_score = statistics.mean(scores)
+        improvement = statistics.mean(scores[-3:]) - statistics.mean(scores[:3]) if len(scores) >= 6 else 0
+        std_dev = statistics.stdev(scores) if len(scores) >= 3 else 0
+        total_time = sum(a['time_taken'] for a in attempts if isinstance(a['time_taken'], (int, float)))
+        results[subject] = (round(avg_score, 1), improvement, std_dev, max(scores), min(scores), total_time)
+
+    all_scores = [attempt.get('score', 0) for attempt in practice_attempts]
+    results["overall"] = round(statistics.mean(all_scores), 1)
+    return results
+
+def legacy_trends(practice_attempts: list, days: int = 30) -> list:
+    """The per-attempt loop weekly bucketing this benchmark compares against"""
+    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    recent_attempts = [a for a in practice_attempts if a.get('completed_at') and a['completed_at'] >= cutoff_date]
+
+    weekly_performance = defaultdict(list)
+    for attempt in recent_attempts:
+        date = attempt['completed_at']
+        week_key = (date - timedelta(days=date.weekday())).strftime('%Y-%m-%d')
+        weekly_performance[week_key].append(attempt['score'])
+
+    return [
+        (week, round(statistics.mean(scores), 1), len(scores), max(scores), min(scores))
+        for week, scores in sorted(weekly_performance.items())
+    ]
+
+def best_of(func, repeat: int) -> float:
+    """Fastest wall-clock time of several runs, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'attempts':>10} {'operation':<22} {'loops (ms)':>12} {'vectorized (ms)':>16} {'speedup':>9}")
+    for size in args.sizes:
+        attempts = generate_attempts(size)
+        cases = [
+            ("strengths/weaknesses", lambda: legacy_analyze(attempts),
+             lambda: StudentAnalyticsService.analyze_strengths_weaknesses(attempts)),
+            ("performance trends", lambda: legacy_trends(attempts),
+             lambda: StudentAnalyticsService.get_performance_trends(attempts, 30))
+        ]
+        for name, legacy, vectorized in cases:
+            legacy_ms = best_of(legacy, args.repeat)
+            vectorized_ms = best_of(vectorized, args.repeat)
+            print(f"{size:>10} {name:<22} {legacy_ms:>12.1f} {vectorized_ms:>16.1f} {legacy_ms / vectorized_ms:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark the get_current_user dependency before and after the verified-token cache
+
+"before" decodes the JWT on every call and prints the same debug lines the old
+dependency did (to /dev/null, so terminal speed is not measured); "after" is the
+current dependency with its token cache.
+
+Usage (from the repository root):
+    python -m benchmarks.auth_benchmark [--requests 50000] [--tokens 100]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from backend.utils.security import SecurityUtils, get_current_user
+
+async def legacy_get_current_user(credentials: HTTPAuthorizationCredentials) -> dict:
+    """The dependency as it was: decode every time and print several debug lines"""
+    print(f"🔍 AUTH DEBUG: Received credentials: {credentials}")
+    token = credentials.credentials
+    print(f"🔍 AUTH DEBUG: Token: {token[:50]}...")
+    payload = SecurityUtils.verify_token(token)
+    print(f"🔍 AUTH DEBUG: Token payload: {payload}")
+    print(f"✅ AUTH DEBUG: Authentication successful for user: {payload.get('sub', 'unknown')}")
+    return payload
+
+async def measure(dependency, credentials: list, requests: int) -> float:
+    """Requests per second through a dependency, cycling over a set of users' tokens"""
+    start = time.perf_counter()
+    for i in range(requests):
+        await dependency(credentials[i % len(credentials)])
+    return requests / (time.perf_counter() - start)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--tokens", type=int, default=100, help="distinct users sending requests")
+    args = parser.parse_args()
+
+    credentials = [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=SecurityUtils.create_access_token({"sub": f"user_{i}", "email": f"user_{i}@example.com", "user_type": "student"})
+        )
+        for i in range(args.tokens)
+    ]
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        before = await measure(legacy_get_current_user, credentials, args.requests)
+    after = await measure(get_current_user, credentials, args.requests)
+
+    print(f"{'dependency':<28} {'requests/s':>12}")
+    print(f"{'before (decode + prints)':<28} {before:>12,.0f}")
+    print(f"{'after (verified-token cache)':<28} {after:>12,.0f}")
+    print(f"speedup: {after / before:.1f}x ({args.tokens} distinct tokens, {args.requests:,} requests)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark fallback question generation before and after the question bank catalog
+
+"before" rebuilds the banks as nested dict literals on every call, as the old
+fallback did (the literal is compiled from the data file so both sides serve the
+same questions), then matches topics exactly and samples; "after" is the current
+fallback served from the catalog.
+
+Usage (from the repository root):
+    python -m benchmarks.fallback_questions_benchmark [--calls 20000]
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+
+from backend.services.ai_service import ai_service
+from backend.services.question_bank import QUESTION_BANK_PATH
+
+REQUESTS = [
+    ("math", ["Real Numbers"]),
+    ("physics", ["Motion", "Gravitation"]),
+    ("chemistry", ["Acids, Bases and Salts"]),
+    ("biology", ["cell biology"]),  # no unit match: generic bank
+]
+
+def build_legacy_fallback():
+    """The old fallback: both banks as dict literals evaluated inside every call"""
+    with open(QUESTION_BANK_PATH, encoding="utf-8") as bank_file:
+        banks = json.load(bank_file)["banks"]
+    ncert, generic = {}, {}
+    for bank in banks:
+        target = generic if bank["tier"] == "generic" else ncert
+        target.setdefault(bank["subject"], {})[bank["unit"]] = bank["questions"]
+
+    source = f"""
+def legacy_generic(subject):
+    question_banks = {generic!r}
+    relevant_questions = []
+    for questions in question_banks.get(subject.lower(), {{}}).values():
+        relevant_questions.extend(questions)
+    return relevant_questions
+
+def legacy_fallback(subject, topics, question_count):
+    ncert_question_banks = {ncert!r}
+    matched_questions = []
+    for topic in topics:
+        if subject in ncert_question_banks and topic in ncert_question_banks[subject]:
+            matched_questions.extend(ncert_question_banks[subject][topic])
+    if not matched_questions:
+        matched_questions.extend(legacy_generic(subject))
+    selected_questions = random.sample(matched_questions, min(question_count, len(matched_questions)))
+    return [
+        {{
+            "id": str(uuid.uuid4())[:8],
+            "question_text": q["question"],
+            "question_type": "mcq",
+            "options": q["options"],
+            "correct_answer": q["correct"],
+            "explanation": q["explanation"],
+            "topic": topics[0] if topics else subject,
+            "subject": subject,
+            "difficulty": "medium",
+            "source": "fallback"
+        }}
+        for q in selected_questions
+    ]
+"""
+    namespace = {"random": random, "uuid": uuid}
+    exec(compile(source, "<legacy_fallback>", "exec"), namespace)
+    return namespace["legacy_fallback"]
+
+def measure(fallback, calls: int) -> float:
+    """Mean microseconds per fallback call over a mix of requests"""
+    start = time.perf_counter()
+    for i in range(calls):
+        subject, topics = REQUESTS[i % len(REQUESTS)]
+        fallback(subject, topics, 5)
+    return (time.perf_counter() - start) / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    legacy = build_legacy_fallback()
+    before = measure(legacy, args.calls)
+    after = measure(ai_service._generate_fallback_questions, args.calls)
+
+    print(f"{'fallback':<32} {'µs/call':>10}")
+    print(f"{'before (literal banks per call)':<32} {before:>10.1f}")
+    print(f"{'after (question bank catalog)':<32} {after:>10.1f}")
+    print(f"speedup: {before / after:.1f}x ({args.calls:,} calls)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark the local study-plan optimizer
+
+Plans used to wait on a full model round trip (typically one to several seconds)
+whose answer was discarded; this measures the optimizer that replaced it on random
+requests of one to six subjects.
+
+Usage (from the repository root):
+    python -m benchmarks.study_plan_benchmark [--plans 20000]
+"""
+
+import argparse
+import random
+import time
+
+from backend.services.study_plan_optimizer import StudyPlanOptimizer, SUBJECT_PROFILES
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    requests = [
+        [
+            {"subject": subject, "duration_minutes": rng.randint(15, 120), "priority": rng.choice(["high", "medium", "low"])}
+            for subject in rng.sample(list(SUBJECT_PROFILES), rng.randint(1, 6))
+        ]
+        for _ in range(1000)
+    ]
+    optimizer = StudyPlanOptimizer()
+
+    timings = []
+    for i in range(args.plans):
+        start = time.perf_counter()
+        optimizer.optimize(requests[i % len(requests)])
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    print(f"{'plans':<8} {'mean µs':>10} {'p50 µs':>10} {'p99 µs':>10}")
+    print(f"{args.plans:<8} {sum(timings) / len(timings) * 1e6:>10.1f} "
+          f"{timings[len(timings) // 2] * 1e6:>10.1f} {timings[int(len(timings) * 0.99)] * 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
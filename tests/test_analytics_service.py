@@ -0,0 +1,41 @@
+import unittest
+from datetime import datetime, timedelta
+
+from backend.services.analytics_service import StudentAnalyticsService
+from benchmarks.analytics_benchmark import legacy_analyze
+
+class TestAnalyzeStrengthsWeaknesses(unittest.TestCase):
+    """The vectorized analysis must report what the per-attempt loops reported"""
+
+    def setUp(self):
+        start = datetime(2026, 3, 2)
+        subjects = ["mathematics", "physics", None, "", "general", "mathematics"]
+        self.attempts = [
+            {"id": str(i), "subject": subject, "score": 50.0 + 7 * i, "time_taken": 60 * i, "completed_at": start + timedelta(days=i)}
+            for i, subject in enumerate(subjects)
+        ]
+        self.attempts.append({"id": "no-subject", "score": 70.0, "time_taken": 30, "completed_at": start})
+
+    def test_subjects_tested_counts_stored_subjects(self):
+        legacy = legacy_analyze(self.attempts)
+        result = StudentAnalyticsService.analyze_strengths_weaknesses(self.attempts)
+        self.assertEqual(result["overall_performance"]["subjects_tested"], len(legacy) - 1)  # minus "overall"
+        self.assertEqual(result["overall_performance"]["subjects_tested"], 5)
+
+    def test_named_subjects_match_the_loop_implementation(self):
+        legacy = legacy_analyze(self.attempts)
+        result = StudentAnalyticsService.analyze_strengths_weaknesses(self.attempts)
+        self.assertEqual(result["overall_performance"]["average_score"], legacy["overall"])
+        summaries = {summary["subject"]: summary for summary in StudentAnalyticsService._summarize_subjects(
+            StudentAnalyticsService.build_attempts_frame(self.attempts)
+        )}
+        for subject in ("mathematics", "physics"):
+            average, _, _, highest, lowest, total_time = legacy[subject]
+            summary = summaries[subject]
+            self.assertEqual(
+                (summary["average_score"], summary["highest_score"], summary["lowest_score"], summary["total_time"]),
+                (average, highest, lowest, total_time)
+            )
+
+if __name__ == "__main__":
+    unittest.main()
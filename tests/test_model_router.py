@@ -0,0 +1,167 @@
+import json
+import random
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.services.model_router import (
+    CircuitBreaker, GeminiRestClient, ModelContentBlocked, ModelEndpoint, ModelRouter,
+    ModelUnavailableError, TokenBucket
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class FakeModelServer:
+    """Local stand-in for the Gemini REST API; each model answers per ``behaviour[model]``"""
+
+    def __init__(self):
+        self.behaviour = {}
+        self.calls = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                model, _, method = self.path.split("?")[0].rsplit("/", 1)[-1].partition(":")
+                server.calls.append(model)
+                behaviour = server.behaviour.get(model, "ok")
+                if behaviour == "error":
+                    return self._reply(500, {"error": {"message": "internal"}})
+                if behaviour == "quota":
+                    return self._reply(429, {"error": {"message": "quota"}}, {"Retry-After": "60"})
+                if behaviour == "blocked":
+                    return self._reply(200, {"promptFeedback": {"blockReason": "SAFETY"}})
+                if method == "streamGenerateContent":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for word in ("Hello ", "from ", model):
+                        chunk = {"candidates": [{"content": {"parts": [{"text": word}]}}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+                    return
+                self._reply(200, {"candidates": [{"content": {"parts": [{"text": f"answer from {model}"}]}}]})
+
+            def _reply(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class TestModelRouter(unittest.IsolatedAsyncioTestCase):
+    """Failover, circuit breaking and quota handling against a local fake model server"""
+
+    def setUp(self):
+        self.server = FakeModelServer()
+        self.clock = FakeClock()
+
+    async def asyncTearDown(self):
+        await self.router.close()
+        self.server.close()
+
+    def make_router(self, *names, rpm=600, failures=2):
+        endpoints = [
+            ModelEndpoint(name, GeminiRestClient(name, self.server.url, api_key=None),
+                          TokenBucket(rpm, clock=self.clock), CircuitBreaker(failures, 30, clock=self.clock))
+            for name in names
+        ]
+        # Listed order wins ties: the first model gets an overwhelming latency edge
+        endpoints[0].latency = 0.001
+        for endpoint in endpoints[1:]:
+            endpoint.latency = 10.0
+        self.router = ModelRouter(endpoints, rng=random.Random(7), max_wait=0)
+        return self.router
+
+    async def test_fails_over_to_the_next_model(self):
+        router = self.make_router("model-a", "model-b")
+        self.server.behaviour["model-a"] = "error"
+        self.assertEqual(await router.generate("hi"), "answer from model-b")
+        self.assertEqual(self.server.calls, ["model-a", "model-b"])
+
+    async def test_breaker_opens_then_half_open_probe_recovers(self):
+        router = self.make_router("model-a", "model-b")
+        primary = router.endpoints[0]
+        self.server.behaviour["model-a"] = "error"
+        for _ in range(2):
+            await router.generate("hi")
+        self.assertEqual(primary.breaker.state, CircuitBreaker.OPEN)
+
+        self.server.calls.clear()
+        await router.generate("hi")
+        self.assertEqual(self.server.calls, ["model-b"])  # open circuit is skipped
+
+        self.clock.now += 31
+        self.server.behaviour["model-a"] = "ok"
+        self.assertEqual(await router.generate("hi"), "answer from model-a")
+        self.assertEqual(primary.breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_quota_cools_the_bucket_without_opening_the_circuit(self):
+        router = self.make_router("model-a", "model-b")
+        self.server.behaviour["model-a"] = "quota"
+        self.assertEqual(await router.generate("hi"), "answer from model-b")
+        primary = router.endpoints[0]
+        self.assertEqual(primary.breaker.state, CircuitBreaker.CLOSED)
+        self.assertFalse(primary.bucket.try_acquire())
+
+        self.server.calls.clear()
+        await router.generate("hi")
+        self.assertEqual(self.server.calls, ["model-b"])
+
+    async def test_rate_limit_exhaustion_raises_unavailable(self):
+        router = self.make_router("model-a", rpm=4)  # one-token burst
+        await router.generate("hi")
+        with self.assertRaises(ModelUnavailableError):
+            await router.generate("hi")
+        self.clock.now += 15
+        self.assertEqual(await router.generate("hi"), "answer from model-a")
+
+    async def test_blocked_content_is_not_retried_on_other_models(self):
+        router = self.make_router("model-a", "model-b")
+        self.server.behaviour["model-a"] = "blocked"
+        with self.assertRaises(ModelContentBlocked):
+            await router.generate("hi")
+        self.assertEqual(self.server.calls, ["model-a"])
+
+    async def test_rejected_answer_tries_the_next_model(self):
+        router = self.make_router("model-a", "model-b")
+        text = await router.generate("hi", accept=lambda answer: answer.endswith("model-b"))
+        self.assertEqual(text, "answer from model-b")
+
+    async def test_stream_fails_over_before_the_first_chunk(self):
+        router = self.make_router("model-a", "model-b")
+        self.server.behaviour["model-a"] = "error"
+        chunks = [chunk async for chunk in router.stream("hi")]
+        self.assertEqual("".join(chunks), "Hello from model-b")
+
+class TestLatencyWeighting(unittest.TestCase):
+    """Faster models take most of the traffic without starving the slower ones"""
+
+    def test_faster_model_is_ranked_first_most_often(self):
+        endpoints = [ModelEndpoint(name, None, TokenBucket(60), CircuitBreaker()) for name in ("fast", "slow")]
+        endpoints[0].latency, endpoints[1].latency = 0.5, 4.5
+        router = ModelRouter(endpoints, rng=random.Random(1))
+        first = [router._ranked(endpoints)[0].name for _ in range(2000)]
+        self.assertAlmostEqual(first.count("fast") / len(first), 0.9, delta=0.03)
+        self.assertGreater(first.count("slow"), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import ast
+import pathlib
+import unittest
+
+from backend.utils.indexes import INDEXES, index_supports
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent / "backend"
+SKIPPED_FILES = {"server_original.py"}  # legacy monolith, not mounted
+QUERY_METHODS = {
+    "find", "find_one", "count_documents", "distinct", "aggregate",
+    "update_one", "update_many", "delete_one", "delete_many",
+    "find_one_and_update", "find_one_and_delete", "replace_one"
+}
+
+def _collections_attr(node):
+    """Attribute name for a ``Collections.X`` expression"""
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "Collections":
+        return node.attr
+    return None
+
+def _collection(node):
+    """Attribute name for a ``db[Collections.X]`` expression"""
+    return _collections_attr(node.slice) if isinstance(node, ast.Subscript) else None
+
+def _filter_fields(node):
+    """Plain field names of a literal filter; None when the filter cannot be read statically"""
+    if not isinstance(node, ast.Dict):
+        return None
+    fields = [key.value for key in node.keys if isinstance(key, ast.Constant) and isinstance(key.value, str)]
+    plain = [field for field in fields if not field.startswith("$")]
+    # Pure $or/$and filters are not analyzed; an empty literal filter is a full scan
+    return plain if plain or not fields else None
+
+def _dict_value(node, key):
+    if isinstance(node, ast.Dict):
+        for k, v in zip(node.keys, node.values):
+            if isinstance(k, ast.Constant) and k.value == key:
+                return v
+    return None
+
+def _collection_name(attr):
+    from backend.utils.database import Collections
+    return getattr(Collections, attr)
+
+class QueryShapeCollector(ast.NodeVisitor):
+    """Collect (location, collection, filter fields, sort fields) for literal queries"""
+
+    def __init__(self, path):
+        self.path = path
+        self.shapes = []
+        self._assignments = {}
+        self._item_assignments = {}
+        self._parents = {}
+
+    def collect(self, tree):
+        for node in ast.walk(tree):
+            for child in ast.iter_child_nodes(node):
+                self._parents[child] = node
+            if isinstance(node, ast.Assign) and len(node.targets) == 1:
+                target = node.targets[0]
+                if isinstance(target, ast.Name):
+                    self._assignments[(self._function(node), target.id)] = node.value
+                elif (isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name)
+                      and isinstance(target.slice, ast.Constant) and isinstance(target.slice.value, str)):
+                    # Filters built up key by key, e.g. query["student_id"] = ...
+                    key = (self._function(node), target.value.id)
+                    self._item_assignments.setdefault(key, []).append(target.slice.value)
+        self.visit(tree)
+        return self.shapes
+
+    def _function(self, node):
+        while node is not None and not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            node = self._parents.get(node)
+        return node
+
+    def _resolve(self, node):
+        if isinstance(node, ast.Name):
+            return self._assignments.get((self._function(node), node.id), node)
+        return node
+
+    def _query_fields(self, node):
+        fields = _filter_fields(self._resolve(node))
+        if fields is not None and isinstance(node, ast.Name):
+            fields = fields + self._item_assignments.get((self._function(node), node.id), [])
+        return fields
+
+    def _add(self, node, collection, fields, sort=()):
+        if fields is not None:
+            self.shapes.append((f"{self.path.name}:{node.lineno}", _collection_name(collection), fields, list(sort)))
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if not (isinstance(node.func, ast.Attribute) and node.func.attr in QUERY_METHODS):
+            return
+        collection = _collection(node.func.value)
+        if collection is None:
+            return
+
+        method = node.func.attr
+        if method == "aggregate":
+            self._add_pipeline(node, collection, self._resolve(node.args[0]) if node.args else None)
+            return
+
+        query = node.args[1] if method == "distinct" and len(node.args) > 1 else (node.args[0] if node.args else None)
+        if method == "distinct" and len(node.args) < 2:
+            return  # distinct over the whole collection
+        fields = self._query_fields(query) if query is not None else []
+
+        sort = []
+        parent = self._parents.get(node)
+        if isinstance(parent, ast.Attribute) and parent.attr == "sort":
+            sort_call = self._parents.get(parent)
+            if sort_call.args and isinstance(sort_call.args[0], ast.Constant):
+                sort = [sort_call.args[0].value]
+        self._add(node, collection, fields, sort)
+
+    def _add_pipeline(self, node, collection, pipeline):
+        if not isinstance(pipeline, ast.List) or not pipeline.elts:
+            return
+        match = _dict_value(pipeline.elts[0], "$match")
+        if match is not None:
+            self._add(node, collection, self._query_fields(match))
+
+        # Every $lookup probes the joined collection by its foreignField
+        for stage in ast.walk(pipeline):
+            lookup = _dict_value(stage, "$lookup")
+            if lookup is None:
+                continue
+            source = _collections_attr(_dict_value(lookup, "from"))
+            foreign = _dict_value(lookup, "foreignField")
+            if source and isinstance(foreign, ast.Constant):
+                self._add(stage, source, [foreign.value])
+
+def collect_query_shapes():
+    shapes = []
+    for path in sorted(BACKEND_DIR.rglob("*.py")):
+        if path.name in SKIPPED_FILES or "__pycache__" in path.parts:
+            continue
+        shapes.extend(QueryShapeCollector(path).collect(ast.parse(path.read_text())))
+    return shapes
+
+class TestIndexSupports(unittest.TestCase):
+    """Unit tests for the index matching rule"""
+
+    def test_leading_field_must_be_filtered(self):
+        self.assertTrue(index_supports("practice_attempts", ["student_id"]))
+        self.assertFalse(index_supports("practice_attempts", ["subject"]))
+
+    def test_sort_must_follow_the_filtered_prefix(self):
+        self.assertTrue(index_supports("practice_attempts", ["student_id"], ["completed_at"]))
+        self.assertTrue(index_supports("practice_attempts", ["student_id", "completed_at"], ["completed_at"]))
+        self.assertFalse(index_supports("practice_attempts", ["student_id"], ["score"]))
+
+    def test_id_lookups_are_always_supported(self):
+        self.assertTrue(index_supports("schema_migrations", ["_id"]))
+
+    def test_every_declared_collection_is_a_known_collection(self):
+        from backend.utils.database import Collections
+        known = {value for key, value in vars(Collections).items() if key.isupper()}
+        self.assertLessEqual(set(INDEXES), known)
+
+class TestRouteQueriesAreIndexed(unittest.TestCase):
+    """Every statically readable query in the backend must have a supporting index"""
+
+    def test_collector_finds_queries(self):
+        self.assertGreater(len(collect_query_shapes()), 50)
+
+    def test_route_queries_have_supporting_indexes(self):
+        unsupported = [
+            f"{location}: {collection} filter={fields} sort={sort}"
+            for location, collection, fields, sort in collect_query_shapes()
+            if not index_supports(collection, fields, sort)
+        ]
+        self.assertEqual(unsupported, [], "Queries without a supporting index:\n" + "\n".join(unsupported))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import random
+import unittest
+from collections import Counter
+
+from backend.services.question_bank import (
+    QUESTION_BANK_PATH, QuestionBankCatalog, get_question_catalog, normalize_unit, sample_without_replacement
+)
+
+class TestQuestionBankData(unittest.TestCase):
+    """The shipped data file is well formed"""
+
+    def test_every_question_has_its_answer_among_the_options(self):
+        with open(QUESTION_BANK_PATH, encoding="utf-8") as bank_file:
+            data = json.load(bank_file)
+        self.assertEqual(data["version"], 1)
+        for bank in data["banks"]:
+            self.assertIn(bank["tier"], ("ncert", "generic"))
+            for question in bank["questions"]:
+                self.assertIn(question["correct"], question["options"], question["question"])
+
+    def test_unsupported_version_is_rejected(self):
+        with self.assertRaises(ValueError):
+            QuestionBankCatalog({"version": 99, "banks": []})
+
+class TestUnitMatching(unittest.TestCase):
+    def setUp(self):
+        self.catalog = get_question_catalog()
+
+    def test_normalization_drops_numbering_and_punctuation(self):
+        self.assertEqual(normalize_unit("Chapter 2: Acids, Bases & Salts"), "acids bases and salts")
+
+    def test_close_names_resolve_to_the_unit(self):
+        self.assertEqual(self.catalog.resolve_unit("math", "real numbers"), "Real Numbers")
+        self.assertEqual(self.catalog.resolve_unit("math", "Polynomial"), "Polynomials")
+        self.assertEqual(self.catalog.resolve_unit("math", "Trigonometry"), "Introduction to Trigonometry")
+        self.assertEqual(self.catalog.resolve_unit("physics", "Motion"), "Motion")
+
+    def test_unrelated_topics_fall_back_to_the_generic_bank(self):
+        self.assertIsNone(self.catalog.resolve_unit("math", "Probability"))
+        self.assertEqual(self.catalog.questions_for("math", ["Probability"]), self.catalog.generic_questions("math"))
+
+    def test_catalog_is_immutable(self):
+        questions = self.catalog.questions_for("math", ["Real Numbers"])
+        self.assertIsInstance(questions, tuple)
+        with self.assertRaises(TypeError):
+            self.catalog._index[("math", "Real Numbers", "mcq", "medium")] = ()
+
+class TestSampling(unittest.TestCase):
+    def test_samples_are_distinct_and_bounded(self):
+        rng = random.Random(5)
+        for k in range(12):
+            picked = sample_without_replacement(range(10), k, rng)
+            self.assertEqual(len(picked), min(k, 10))
+            self.assertEqual(len(set(picked)), len(picked))
+
+    def test_samples_are_uniform(self):
+        rng = random.Random(11)
+        counts = Counter(item for _ in range(20000) for item in sample_without_replacement("abcde", 2, rng))
+        for count in counts.values():
+            self.assertAlmostEqual(count / 40000, 0.2, delta=0.01)
+
+if __name__ == "__main__":
+    unittest.main()
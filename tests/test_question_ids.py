@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from backend.utils.helpers import QuestionUtils
+
+QUESTION = {
+    "subject": "math",
+    "question_type": "mcq",
+    "question_text": "What is the HCF of 12 and 18?",
+    "options": ["2", "3", "6", "36"],
+    "correct_answer": "6",
+    "topic": "Real Numbers",
+}
+
+class TestQuestionContentId(unittest.TestCase):
+    def test_formatting_and_option_order_do_not_change_the_id(self):
+        reformatted = dict(
+            QUESTION,
+            question_text="  what is the HCF of 12   and 18? ",
+            options=["36", "6", "3", "2"],
+            topic="Chapter 1",
+            difficulty="hard",
+        )
+        self.assertEqual(QuestionUtils.content_id(reformatted), QuestionUtils.content_id(QUESTION))
+
+    def test_different_content_gets_a_different_id(self):
+        for field, value in (("question_text", "What is the LCM of 12 and 18?"), ("correct_answer", "3"), ("subject", "physics")):
+            self.assertNotEqual(QuestionUtils.content_id(dict(QUESTION, **{field: value})), QuestionUtils.content_id(QUESTION), field)
+
+    def test_id_is_stable_across_processes(self):
+        script = f"from backend.utils.helpers import QuestionUtils; print(QuestionUtils.content_id({QUESTION!r}))"
+        ids = {
+            subprocess.run(
+                [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                env=dict(os.environ, PYTHONHASHSEED=seed)
+            ).stdout.strip()
+            for seed in ("1", "2")
+        }
+        self.assertEqual(ids, {QuestionUtils.content_id(QUESTION)})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import random
+import re
+import unittest
+
+from backend.services.question_templates import (
+    TEMPLATES, QuestionTemplateEngine, discriminant, newtons_second_law, point_distance
+)
+
+class TestTemplates(unittest.TestCase):
+    def test_every_template_offers_four_distinct_options_with_the_answer(self):
+        rng = random.Random(3)
+        for subject, units in TEMPLATES.items():
+            for unit, templates in units.items():
+                for template in templates:
+                    for scale in (1, 2, 3):
+                        for _ in range(200):
+                            question = template(rng, scale)
+                            self.assertEqual(len(set(question.options)), 4, question)
+                            self.assertIn(question.correct, question.options, question)
+
+    def test_computed_answers_are_correct(self):
+        rng = random.Random(8)
+        for _ in range(100):
+            question = discriminant(rng, 2)
+            a, b, c = self._quadratic_coefficients(question.question)
+            self.assertEqual(int(question.correct), b * b - 4 * a * c)
+
+            question = point_distance(rng, 2)
+            x1, y1, x2, y2 = map(int, re.findall(r"-?\d+", question.question))
+            self.assertEqual(question.correct, f"{round(((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5)} units")
+
+            question = newtons_second_law(rng, 2)
+            numbers = [int(n) for n in re.findall(r"\d+", question.question.replace("m/s²", ""))]
+            expected = f"{numbers[0] * numbers[1]} N" if "force?" in question.question else f"{numbers[0] // numbers[1]} m/s²"
+            self.assertEqual(question.correct, expected)
+
+    @staticmethod
+    def _quadratic_coefficients(text):
+        match = re.search(r"(-?\d*)x² ([+-]) (\d*)x ([+-]) (\d+) = 0", text)
+        a = int(match.group(1)) if match.group(1) not in ("", "-") else (-1 if match.group(1) == "-" else 1)
+        b = int(match.group(3) or 1) * (-1 if match.group(2) == "-" else 1)
+        c = int(match.group(5)) * (-1 if match.group(4) == "-" else 1)
+        return a, b, c
+
+class TestQuestionTemplateEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = QuestionTemplateEngine()
+
+    def test_topics_resolve_to_template_units(self):
+        self.assertEqual(self.engine.resolve_unit("math", "Trigonometry"), "Introduction to Trigonometry")
+        self.assertEqual(self.engine.resolve_unit("physics", "laws of motion"), "Laws of Motion")
+        self.assertIsNone(self.engine.resolve_unit("biology", "Tissues"))
+
+    def test_generation_is_deterministic_under_a_seed(self):
+        first = self.engine.generate("physics", ["Motion", "Work and Energy"], 20, rng=random.Random(42))
+        second = self.engine.generate("physics", ["Motion", "Work and Energy"], 20, rng=random.Random(42))
+        self.assertEqual(first, second)
+
+    def test_generated_questions_are_unique(self):
+        questions = self.engine.generate("math", ["Quadratic Equations", "Coordinate Geometry"], 1000, "hard", random.Random(1))
+        self.assertEqual(len(questions), 1000)
+        self.assertEqual(len({question.question for _, question in questions}), 1000)
+        self.assertEqual({unit for unit, _ in questions}, {"Quadratic Equations", "Coordinate Geometry"})
+
+if __name__ == "__main__":
+    unittest.main()
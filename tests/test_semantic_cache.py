@@ -0,0 +1,57 @@
+import unittest
+
+from backend.utils.semantic_cache import SimilarityIndex, TUTOR_CACHE_SIMILARITY, normalize_question
+
+class TestNormalizeQuestion(unittest.TestCase):
+    """Phrasings of the same question share a key; different questions do not"""
+
+    def test_phrasings_of_one_question_normalize_alike(self):
+        self.assertEqual(normalize_question("what is photosynthesis?"), normalize_question("What's photosynthesis"))
+        self.assertEqual(normalize_question("How do plants make their food?"), normalize_question("how do plant make food"))
+
+    def test_question_words_and_negations_are_kept(self):
+        self.assertNotEqual(normalize_question("why does ice float"), normalize_question("how does ice float"))
+        self.assertIn("not", normalize_question("why doesn't ice sink"))
+
+    def test_prefix_no_longer_decides_the_key(self):
+        prefix = "in chapter three of the class ten science textbook, "
+        self.assertNotEqual(normalize_question(prefix + "what is diffusion"), normalize_question(prefix + "what is osmosis"))
+
+class TestSimilarityIndex(unittest.TestCase):
+    """Near-duplicate lookup must stay conservative"""
+
+    def setUp(self):
+        self.index = SimilarityIndex()
+        for question in ["convert celsius to fahrenheit", "what is newton's second law of motion",
+                         "what is mitosis", "define velocity", "laws of motion", "what is a cell"]:
+            tokens = normalize_question(question)
+            self.index.add(" ".join(tokens), tokens)
+
+    def score(self, question):
+        return self.index.nearest(normalize_question(question))[1]
+
+    def test_reordered_or_different_questions_do_not_match(self):
+        self.assertLess(self.score("convert fahrenheit to celsius"), TUTOR_CACHE_SIMILARITY)
+        self.assertLess(self.score("what is newton's third law of motion"), TUTOR_CACHE_SIMILARITY)
+
+    def test_same_question_matches(self):
+        self.assertGreaterEqual(self.score("Newton's second law of motion?"), TUTOR_CACHE_SIMILARITY)
+
+    def test_questions_differing_only_in_numbers_do_not_match(self):
+        question = "A car of mass 1200 kg accelerates at 2 m/s2. What force acts on the car?"
+        tokens = normalize_question(question)
+        self.index.add(" ".join(tokens), tokens)
+        self.assertIsNone(self.index.nearest(normalize_question(question.replace("1200", "1500")))[0])
+        self.assertIsNone(self.index.nearest(normalize_question(question.replace("2 m/s2", "3 m/s2")))[0])
+        self.assertGreaterEqual(self.score("a car of mass 1200 kg accelerates at 2 m/s2, what force acts on it"), TUTOR_CACHE_SIMILARITY)
+
+    def test_index_is_bounded(self):
+        index = SimilarityIndex(max_entries=2)
+        for question in ["a cell", "mitosis", "meiosis"]:
+            tokens = normalize_question(question)
+            index.add(" ".join(tokens), tokens)
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.nearest(normalize_question("cell"))[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from backend.services.student_stats_service import StudentStatsService
+from backend.utils.database import Collections
+from backend.utils.migrations import backfill_student_subject_stats
+
+def _path(doc, path):
+    for part in path.split("."):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc
+
+def _present(values):
+    return [value for value in values if value is not None]
+
+class Expressions:
+    """The aggregation expressions the backfill pipeline uses, evaluated in Python"""
+
+    def __init__(self, variables):
+        self.variables = variables
+
+    def __call__(self, expr, doc):
+        if isinstance(expr, str) and expr.startswith("$$"):
+            name, _, rest = expr[2:].partition(".")
+            value = self.variables[name]
+            return _path(value, rest) if rest else value
+        if isinstance(expr, str) and expr.startswith("$"):
+            return _path(doc, expr[1:])
+        if isinstance(expr, list):
+            return [self(item, doc) for item in expr]
+        if not isinstance(expr, dict):
+            return expr
+        if len(expr) != 1 or not next(iter(expr)).startswith("$"):
+            return {key: self(value, doc) for key, value in expr.items()}
+
+        op, args = next(iter(expr.items()))
+        if op == "$map":
+            return [
+                Expressions({**self.variables, "this": item})(args["in"], doc)
+                for item in self(args["input"], doc) or []
+            ]
+        values = self(args, doc)
+        if op == "$ifNull":
+            return next((value for value in values if value is not None), None)
+        if op == "$size":
+            return len(values)
+        if op == "$multiply":
+            return values[0] * values[1]
+        if op == "$add":
+            return sum(values)
+        if op == "$max":
+            return max(_present(values), default=None)
+        if op == "$min":
+            return min(_present(values), default=None)
+        if op == "$eq":
+            return values[0] == values[1]
+        if op == "$lt":
+            return values[1] is not None and (values[0] is None or values[0] < values[1])
+        if op == "$gte":
+            return values[1] is None or (values[0] is not None and values[0] >= values[1])
+        if op == "$and":
+            return all(values)
+        if op == "$not":
+            return not values[0]
+        if op == "$anyElementTrue":
+            return any(values[0])
+        if op == "$concatArrays":
+            return [item for value in values for item in value]
+        if op == "$slice":
+            return values[0][values[1]:] if values[1] < 0 else values[0][:values[1]]
+        raise NotImplementedError(op)
+
+class FakeCursor:
+    def __init__(self, run):
+        self.run = run
+
+    async def to_list(self, length):
+        return await self.run()
+
+class FakeCollection:
+    """In-memory collection supporting the backfill pipeline and the rollup update"""
+
+    def __init__(self, db):
+        self.db = db
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    def _find(self, query):
+        return next((doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())), None)
+
+    async def find_one(self, query, projection=None):
+        doc = self._find(query)
+        return dict(doc) if doc is not None else None
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self._find(query)
+        if doc is None:
+            doc = dict(query)
+            self.docs.append(doc)
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+        for field, value in update.get("$max", {}).items():
+            doc[field] = max(_present([doc.get(field), value]))
+        for field, value in update.get("$min", {}).items():
+            doc[field] = min(_present([doc.get(field), value]))
+        for field, value in update.get("$push", {}).items():
+            doc[field] = (doc.get(field, []) + value["$each"])[value["$slice"]:]
+        doc.update(update.get("$set", {}))
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        return FakeCursor(lambda: self._aggregate(pipeline))
+
+    async def _aggregate(self, pipeline):
+        evaluate = Expressions({"NOW": datetime.utcnow()})
+        docs = [dict(doc) for doc in self.docs]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$sort":
+                (field, direction), = spec.items()
+                docs.sort(key=lambda doc: doc.get(field) or datetime.min, reverse=direction < 0)
+            elif name == "$match":
+                docs = [doc for doc in docs if evaluate(spec["$expr"], doc)]
+            elif name == "$lookup":
+                source = self.db[spec["from"]].docs
+                for doc in docs:
+                    doc[spec["as"]] = [dict(other) for other in source if other.get(spec["foreignField"]) == doc.get(spec["localField"])]
+            elif name == "$group":
+                docs = self._group(spec, docs, evaluate)
+            elif name == "$project":
+                docs = [
+                    {field: doc.get(field) if value == 1 else evaluate(value, doc) for field, value in spec.items() if value != 0}
+                    for doc in docs
+                ]
+            elif name == "$merge":
+                if self.db.before_merge:
+                    await self.db.before_merge()
+                self._merge(spec, docs)
+                docs = []
+            else:
+                raise NotImplementedError(name)
+        return docs
+
+    @staticmethod
+    def _group(spec, docs, evaluate):
+        groups = {}
+        for doc in docs:
+            key = evaluate(spec["_id"], doc)
+            group = groups.setdefault(repr(key), {"_id": key})
+            for field, accumulator in spec.items():
+                if field == "_id":
+                    continue
+                (op, expr), = accumulator.items()
+                value = evaluate(expr, doc)
+                if op == "$sum":
+                    group[field] = group.get(field, 0) + value
+                elif op == "$push":
+                    group.setdefault(field, []).append(value)
+                elif op == "$max":
+                    group[field] = max(_present([group.get(field), value]))
+                elif op == "$min":
+                    group[field] = min(_present([group.get(field), value]))
+        return list(groups.values())
+
+    def _merge(self, spec, docs):
+        target = self.db[spec["into"]]
+        for new in docs:
+            existing = target._find({field: new[field] for field in spec["on"]})
+            if existing is None:
+                target.docs.append(new)
+                continue
+            evaluate = Expressions({"NOW": datetime.utcnow(), "new": new})
+            for stage in spec["whenMatched"]:
+                existing.update({field: evaluate(expr, existing) for field, expr in stage["$set"].items()})
+
+class FakeDatabase(dict):
+    def __init__(self):
+        super().__init__()
+        self.before_merge = None
+
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection(self)
+        return collection
+
+class TestSubjectStatsBackfill(unittest.IsolatedAsyncioTestCase):
+    """The backfill adds earlier attempts to rollups that record_attempt is writing at the same time"""
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.start = datetime(2026, 1, 1)
+        patcher = patch("backend.services.student_stats_service.get_database", return_value=self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def submit(self, attempt_id, score, completed_at, record=True):
+        """Save an attempt like the submit endpoint; old releases did not record rollups"""
+        await self.db[Collections.PRACTICE_ATTEMPTS].insert_one({
+            "id": attempt_id, "student_id": "s1", "subject": "math", "score": score,
+            "questions_count": 5, "time_taken": 60, "difficulty": "easy", "completed_at": completed_at
+        })
+        if record:
+            await StudentStatsService.record_attempt("s1", "math", attempt_id, score, 5, 60, "easy", completed_at)
+
+    async def test_backfill_adds_history_to_rollups_written_concurrently(self):
+        await self.submit("old-1", 40.0, self.start, record=False)
+        await self.submit("old-2", 90.0, self.start + timedelta(days=1), record=False)
+        # A worker on the new release records an attempt before the migration runs ...
+        await self.submit("new-1", 60.0, self.start + timedelta(days=2))
+
+        # ... and another one while the backfill is running
+        async def concurrent_submission():
+            await self.submit("new-2", 20.0, datetime.utcnow())
+        self.db.before_merge = concurrent_submission
+        await backfill_student_subject_stats(self.db)
+
+        rollup = await StudentStatsService.get_subject_rollup("s1", "math")
+        self.assertEqual(rollup["count"], 4)
+        self.assertEqual(rollup["score_sum"], 210.0)
+        self.assertEqual(rollup["score_sum_sq"], 40.0 ** 2 + 90.0 ** 2 + 60.0 ** 2 + 20.0 ** 2)
+        self.assertEqual(rollup["total_questions"], 20)
+        self.assertEqual(rollup["total_time"], 240)
+        self.assertEqual((rollup["best_score"], rollup["worst_score"]), (90.0, 20.0))
+        self.assertEqual(rollup["first_attempt_at"], self.start)
+        self.assertEqual([a["id"] for a in rollup["recent_attempts"]], ["old-1", "old-2", "new-1", "new-2"])
+
+        # Re-running the backfill (a retried migration) adds nothing twice
+        self.db.before_merge = None
+        await backfill_student_subject_stats(self.db)
+        self.assertEqual((await StudentStatsService.get_subject_rollup("s1", "math"))["count"], 4)
+
+    async def test_backfill_creates_missing_rollups(self):
+        await self.submit("old-1", 50.0, self.start, record=False)
+        await backfill_student_subject_stats(self.db)
+        rollup = await StudentStatsService.get_subject_rollup("s1", "math")
+        self.assertEqual((rollup["count"], rollup["total_questions"]), (1, 5))
+
+if __name__ == "__main__":
+    unittest.main()
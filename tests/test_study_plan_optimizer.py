@@ -0,0 +1,102 @@
+import random
+import unittest
+from collections import Counter
+
+from backend.services.study_plan_optimizer import StudyPlanOptimizer, SUBJECT_PROFILES, split_sessions
+
+SUBJECTS = list(SUBJECT_PROFILES) + ["art", "music"]
+
+def random_request(rng):
+    """A plan request of 1-6 distinct subjects with random durations and priorities"""
+    return [
+        {"subject": subject, "duration_minutes": rng.randint(1, 150), "priority": rng.choice(["high", "medium", "low", None])}
+        for subject in rng.sample(SUBJECTS, rng.randint(1, 6))
+    ]
+
+def random_optimizer(rng):
+    return StudyPlanOptimizer(
+        session_minutes=rng.choice([20, 25, 30, 45]),
+        short_break_minutes=rng.choice([3, 5]),
+        long_break_minutes=rng.choice([10, 15, 20]),
+        long_break_interval=rng.choice([2, 3, 4, 5])
+    )
+
+class TestSplitSessions(unittest.TestCase):
+    def test_splits_keep_the_time_within_bounds(self):
+        for minutes in range(1, 300):
+            parts = split_sessions(minutes)
+            self.assertEqual(sum(parts), minutes)
+            self.assertTrue(all(0 < part <= 25 for part in parts))
+            if minutes >= 10:
+                self.assertGreaterEqual(min(parts), 10)
+
+class TestStudyPlanProperties(unittest.TestCase):
+    """Invariants of optimized plans over many random requests"""
+
+    CASES = 500
+
+    def cases(self):
+        rng = random.Random(2024)
+        for _ in range(self.CASES):
+            yield random_optimizer(rng), random_request(rng)
+
+    def test_every_requested_minute_is_planned_exactly_once(self):
+        for optimizer, request in self.cases():
+            planned = Counter()
+            for item in optimizer.optimize(request):
+                if item.session_type == "work":
+                    self.assertLessEqual(item.minutes, optimizer.session_minutes)
+                    planned[item.subject] += item.minutes
+            self.assertEqual(planned, Counter({subject["subject"]: subject["duration_minutes"] for subject in request}))
+
+    def test_sessions_and_breaks_alternate(self):
+        for optimizer, request in self.cases():
+            kinds = [item.session_type for item in optimizer.optimize(request)]
+            self.assertEqual(kinds[0], "work")
+            self.assertEqual(kinds[-1], "work")
+            for current, following in zip(kinds, kinds[1:]):
+                self.assertNotEqual(current == "work", following == "work")
+
+    def test_long_break_at_least_every_interval(self):
+        for optimizer, request in self.cases():
+            since_long_break = 0
+            for item in optimizer.optimize(request):
+                if item.session_type == "work":
+                    since_long_break += 1
+                    self.assertLessEqual(since_long_break, optimizer.long_break_interval)
+                elif item.session_type == "long_break":
+                    since_long_break = 0
+
+    def test_never_costlier_than_the_requested_order(self):
+        for optimizer, request in self.cases():
+            blocks = optimizer.blocks(request)
+            self.assertLessEqual(optimizer.cost(optimizer.order(blocks)), optimizer.cost(blocks))
+
+    def test_plans_are_deterministic(self):
+        for optimizer, request in self.cases():
+            self.assertEqual(optimizer.optimize(request), optimizer.optimize(list(request)))
+
+class TestStudyPlanChoices(unittest.TestCase):
+    def test_demanding_subject_goes_first_when_fresh(self):
+        plan = StudyPlanOptimizer().optimize([
+            {"subject": "english", "duration_minutes": 25},
+            {"subject": "math", "duration_minutes": 25}
+        ])
+        self.assertEqual(plan[0].subject, "math")
+
+    def test_alternates_kinds_of_thinking(self):
+        plan = StudyPlanOptimizer().optimize([
+            {"subject": "math", "duration_minutes": 25},
+            {"subject": "physics", "duration_minutes": 25},
+            {"subject": "english", "duration_minutes": 25}
+        ])
+        self.assertEqual([item.subject for item in plan if item.session_type == "work"], ["math", "english", "physics"])
+
+    def test_break_preferences_are_validated(self):
+        optimizer = StudyPlanOptimizer.from_preferences({"session_minutes": 50, "short_break_minutes": 0, "long_break_interval": "3"})
+        self.assertEqual(optimizer.session_minutes, 50)
+        self.assertEqual(optimizer.short_break_minutes, 5)
+        self.assertEqual(optimizer.long_break_interval, 4)
+
+if __name__ == "__main__":
+    unittest.main()